@@ -0,0 +1,204 @@
+#! /usr/bin/env python
+# -*- coding: ASCII -*-
+
+"""
+Script to compare the loading rate (rows/sec.) of the csv2sqlite loader
+with the row by row loader of the previous version,
+on a synthetic FEATURES csv file of several days.
+@author: Xavier Bonnin (CNRS, LESIA)
+"""
+
+import sys
+import os
+import argparse
+import sqlite3
+import csv
+import time
+import random
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+
+from csv2sqlite import csv2sqlite, get_columns
+
+__version__ = "1.0.0"
+__license__ = "GPL"
+__author__ = "Xavier Bonnin (CNRS, LESIA)"
+__credit__ = "Xavier Bonnin"
+__maintainer__ = ["Xavier Bonnin", "Christian Renie"]
+__email__ = "xavier.bonnin@obspm.fr"
+__date__ = "18-OCT-2026"
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+SCHEMA_FILE = os.path.join(CURRENT_DIR, "make_rabat3_hfc_db.sql")
+
+
+def make_database(sqlite_file, schema_file=SCHEMA_FILE):
+    conn = sqlite3.connect(sqlite_file)
+    with open(schema_file) as fr:
+        conn.executescript(fr.read())
+    conn.close()
+
+
+def make_features_csv(csv_file, columns, ndays=30, nfeat=500):
+    """
+    Write a FEATURES csv file (with header) of ndays days,
+    with nfeat type III bursts per day.
+    """
+    starttime = datetime(2000, 1, 1)
+    ids = 0
+    with open(csv_file, 'wb') as fw:
+        writer = csv.writer(fw, delimiter=";")
+        writer.writerow([column[0] for column in columns])
+        for day in range(ndays):
+            for i in range(nfeat):
+                ids += 1
+                row = []
+                for name, column_type, pk in columns:
+                    if (pk):
+                        row.append(ids)
+                    elif (name == "OBSERVATIONS_ID"):
+                        row.append(day + 1)
+                    elif ("int" in column_type):
+                        row.append(random.randint(0, 4096))
+                    elif ("real" in column_type):
+                        row.append("%.4f" % random.uniform(0.0, 14.0))
+                    elif (name.endswith("_UTC") or name.startswith("TIME_")):
+                        time_value = starttime + timedelta(days=day, seconds=random.randint(0, 86399))
+                        row.append(time_value.strftime("%Y-%m-%dT%H:%M:%S"))
+                    elif (name.endswith("CC")):
+                        row.append("".join([str(random.randint(0, 7)) for j in range(64)]))
+                    else:
+                        row.append("NULL")
+                writer.writerow(row)
+    return ids
+
+
+def legacy_csv2sqlite(csv_file, sqlite_file, sqlite_table,
+                      delimiter=",",
+                      quotechar="\"", Header=False):
+    """
+    Row by row loader of csv2sqlite 1.0.0
+    (one INSERT statement per row, values quoted by hand).
+    """
+    with open(csv_file, 'rb') as csvfile:
+        content = csv.reader(csvfile,
+                             delimiter=delimiter,
+                             quotechar=quotechar)
+        csvData = []
+        for row in content:
+            csvData.append(row)
+    if (Header):
+        header = csvData[0]
+        csvData = csvData[1:]
+
+    conn = sqlite3.connect(sqlite_file)
+    cur = conn.cursor()
+    for row in csvData:
+        if (Header):
+            cmd = "INSERT INTO %s (%s) VALUES (" % (sqlite_table, ",".join(header))
+        else:
+            cmd = "INSERT INTO %s VALUES (" % (sqlite_table)
+        for i, value in enumerate(row):
+            try:
+                float(value)
+                cmd += value
+            except ValueError:
+                if (value == "NULL"):
+                    cmd += value
+                else:
+                    cmd += "\'" + value + "\'"
+            if (i < len(row) - 1):
+                cmd += ","
+        cmd += ")"
+        print cmd
+        cur.execute(cmd)
+        conn.commit()
+    conn.close()
+    return len(csvData)
+
+
+def benchmark(ndays=30, nfeat=500, batch_size=10000,
+              legacy_rows=None):
+    """
+    Load the same csv file with both loaders, and print the rows/sec.
+    The legacy loader commits every row, it can be run on the first
+    legacy_rows rows only.
+    """
+    work_dir = tempfile.mkdtemp(prefix="benchmark_csv2sqlite_")
+    try:
+        template_file = os.path.join(work_dir, "template.sqlite")
+        make_database(template_file)
+        conn = sqlite3.connect(template_file)
+        columns = get_columns(conn, "FEATURES")
+        conn.close()
+
+        csv_file = os.path.join(work_dir, "rabat3_features.csv")
+        nrow = make_features_csv(csv_file, columns, ndays=ndays, nfeat=nfeat)
+        print "%i rows written in %s" % (nrow, csv_file)
+
+        legacy_file = csv_file
+        if (legacy_rows is not None) and (legacy_rows < nrow):
+            legacy_file = os.path.join(work_dir, "rabat3_features_legacy.csv")
+            with open(csv_file, 'rb') as fr:
+                with open(legacy_file, 'wb') as fw:
+                    for i, line in enumerate(fr):
+                        if (i > legacy_rows):
+                            break
+                        fw.write(line)
+
+        results = []
+        sqlite_file = os.path.join(work_dir, "legacy.sqlite")
+        shutil.copy(template_file, sqlite_file)
+        devnull = open(os.devnull, 'w')
+        stdout = sys.stdout
+        t0 = time.time()
+        try:
+            sys.stdout = devnull
+            n = legacy_csv2sqlite(legacy_file, sqlite_file, "FEATURES",
+                                  delimiter=";", Header=True)
+        finally:
+            sys.stdout = stdout
+            devnull.close()
+        results.append(("csv2sqlite 1.0.0 (row by row)", n, time.time() - t0))
+
+        sqlite_file = os.path.join(work_dir, "batch.sqlite")
+        shutil.copy(template_file, sqlite_file)
+        t0 = time.time()
+        n = csv2sqlite(csv_file, sqlite_file, "FEATURES",
+                       delimiter=";", Header=True,
+                       batch_size=batch_size)
+        results.append(("csv2sqlite %s (batch_size=%i)" % ("1.1.0", batch_size),
+                        n, time.time() - t0))
+
+        for label, n, elapsed in results:
+            print "%-40s %8i rows in %8.2f sec. -> %10.0f rows/sec." % \
+                (label, n, elapsed, n / max(elapsed, 1.0e-6))
+        rate = [n / max(elapsed, 1.0e-6) for label, n, elapsed in results]
+        print "Speed-up: x%.1f" % (rate[1] / rate[0])
+    finally:
+        shutil.rmtree(work_dir)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+                                     description="Compare the loading rate of csv2sqlite with the row by row loader",
+                                     add_help=True)
+    parser.add_argument("-n", "--ndays", nargs="?", type=int,
+                        help="Number of days in the csv file",
+                        default=30)
+    parser.add_argument("-f", "--nfeat", nargs="?", type=int,
+                        help="Number of features per day",
+                        default=500)
+    parser.add_argument("-b", "--batch_size", nargs="?", type=int,
+                        help="Number of rows inserted per transaction",
+                        default=10000)
+    parser.add_argument("-l", "--legacy_rows", nargs="?", type=int,
+                        help="Number of rows loaded by the row by row loader (all by default)",
+                        default=None)
+
+    args = parser.parse_args()
+    benchmark(ndays=args.ndays, nfeat=args.nfeat,
+              batch_size=args.batch_size,
+              legacy_rows=args.legacy_rows)
@@ -0,0 +1,117 @@
+#! /usr/bin/env python
+# -*- coding: latin-1 -*-
+
+"""
+Python script to compare the timing of the python and IDL
+rabat3 detection engines on a list of Wind/Waves data files
+(e.g., a year of nasa/gsfc RAD2 daily files).
+The IDL timing includes the reading and the preprocessing of the data,
+which are thus given separately for the python engine.
+@author: X.Bonnin (LESIA)
+"""
+
+__author__="Xavier Bonnin"
+__date__="18-OCT-2026"
+__version__="1.00"
+
+import os, sys, time
+import glob
+import argparse, subprocess, tempfile
+import numpy as np
+
+from waves import wind
+from frc_toolkit import parse_configfile
+from rabat3_detection import rabat3_detection
+
+# IDL executable path
+IDL_EXE_PATH = "idl"
+
+# Method to time the python engine on a data file
+def time_python(reader,filename,args):
+    t0 = time.time()
+    data = reader.get_data(filename=filename,
+                           data_directory=os.path.dirname(filename),
+                           download_file=False,verbose=False,
+                           prep=True,dB=True,interpolate=True)
+    if (data is None): return None
+    t1 = time.time()
+    intensity = data.get_parameter("intensity")
+    burst_indices, lvl_trust, burst_delay = \
+        rabat3_detection(intensity,data.get_parameter("time"),
+                         1.0e-3*data.get_parameter("frequency"),args,
+                         missing=~np.isfinite(intensity))
+    t2 = time.time()
+    return t1 - t0, t2 - t1, len(burst_indices)
+
+# Method to time the IDL engine on a data file
+def time_idl(idl_exe,idl_bin_file,filename,config_file):
+    output_file = tempfile.mktemp(suffix=".csv")
+    idl_cmd = [idl_exe,"-quiet","-rt="+idl_bin_file,"-args",
+               filename,config_file,"output_file="+output_file]
+    t0 = time.time()
+    idl_process = subprocess.Popen(idl_cmd,
+                                   stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE)
+    idl_process.communicate()
+    elapsed = time.time() - t0
+    if (os.path.isfile(output_file)): os.remove(output_file)
+    if (idl_process.returncode != 0): return None
+    return elapsed
+
+def benchmark(filelist,config_file,
+              idl_bin_file=None,
+              idl_exe=IDL_EXE_PATH):
+
+    args = parse_configfile(config_file)
+    reader = wind(provider="gsfc",verbose=False)
+
+    total = {"read":0.0,"detect":0.0,"idl":0.0,"nburst":0,"nfile":0,"nidl":0}
+    for filename in filelist:
+        py_time = time_python(reader,filename,args)
+        if (py_time is None):
+            print "%s: can not be read!" % (os.path.basename(filename))
+            continue
+        read_time, detect_time, nburst = py_time
+        total["read"] += read_time ; total["detect"] += detect_time
+        total["nburst"] += nburst ; total["nfile"] += 1
+        line = "%s: %i burst(s), python %.3f sec. (read %.3f sec., detection %.3f sec.)" % \
+            (os.path.basename(filename),nburst,read_time + detect_time,read_time,detect_time)
+        if (idl_bin_file is not None):
+            idl_time = time_idl(idl_exe,idl_bin_file,filename,config_file)
+            if (idl_time is not None):
+                total["idl"] += idl_time ; total["nidl"] += 1
+                line += ", IDL %.3f sec." % (idl_time)
+            else:
+                line += ", IDL failed"
+        print line
+
+    if (total["nfile"] > 0):
+        print "%s method, %i file(s), %i burst(s)" % (args.get("METHOD"),total["nfile"],total["nburst"])
+        print "Python: %.3f sec. (read %.3f sec., detection %.3f sec.)" % \
+            (total["read"] + total["detect"],total["read"],total["detect"])
+        if (total["nidl"] > 0):
+            print "IDL: %.3f sec. for %i file(s)" % (total["idl"],total["nidl"])
+    return total
+
+if (__name__ == "__main__"):
+
+    parser = argparse.ArgumentParser(add_help=True)
+    parser.add_argument('config_file',nargs=1,help="Pathname of the configuration file to load.")
+    parser.add_argument('data_files',nargs='+',
+                        help="Pathnames (or patterns) of the data files to process.")
+    parser.add_argument('-i','--idl_bin_file',nargs='?',default=None,
+                        help="Pathname of the IDL binary file used to run rabat3 (python engine only if not set).")
+    parser.add_argument('--idl_exe',nargs='?',default=IDL_EXE_PATH,
+                        help="IDL executable.")
+    Namespace = parser.parse_args()
+
+    filelist = []
+    for pattern in Namespace.data_files:
+        filelist.extend(sorted(glob.glob(pattern)))
+    if not (filelist):
+        print "Empty file set!"
+        sys.exit(1)
+
+    benchmark(filelist,Namespace.config_file[0],
+              idl_bin_file=Namespace.idl_bin_file,
+              idl_exe=Namespace.idl_exe)
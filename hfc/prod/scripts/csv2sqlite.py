@@ -11,66 +11,185 @@ import os
 import argparse
 import sqlite3
 import csv
+import time
 
-__version__ = "1.0.0"
+__version__ = "1.1.0"
 __license__ = "GPL"
 __author__ = "Xavier Bonnin (CNRS, LESIA)"
 __credit__ = "Xavier Bonnin"
 __maintainer__ = ["Xavier Bonnin", "Christian Renie"]
 __email__ = "xavier.bonnin@obspm.fr"
-__date__ = "05-MAY-2014"
+__date__ = "18-OCT-2026"
 
+# Number of rows inserted per transaction
+BATCH_SIZE = 10000
 
-def csv2sqlite(csv_file, sqlite_file, sqlite_table,
-               delimiter=",",
-               quotechar="\"", Header=False):
+# Pragmas used during the load
+JOURNAL_MODE = "WAL"
+SYNCHRONOUS = "OFF"
 
-    if not (os.path.isfile(sqlite_file)):
-        sys.exit("%s does not exist!", sqlite_file)
-    if not (os.path.isfile(csv_file)):
-        sys.exit("%s does not exist!", csv_file)
+# Value written for the missing values in the hfc csv files
+NULL_VALUE = "NULL"
 
-    # Read the csv file
-    try:
-        with open(csv_file, 'rb') as csvfile:
-            content = csv.reader(csvfile,
-                                delimiter=delimiter,
-                                quotechar=quotechar)
 
-            data = []
-            for row in content:
-                data.append(row)
+def get_columns(conn, sqlite_table):
+    """
+    Return the list of (name, type, primary key) of the columns
+    of a sqlite table, as defined in make_rabat3_hfc_db.sql.
+    """
+    rows = conn.execute("PRAGMA table_info(%s)" % sqlite_table).fetchall()
+    return [(row[1], row[2].lower(), bool(row[5])) for row in rows]
 
-    except csv.Error as e:
-        sys.exit("Error raised with %s: \n %s"  % (csv_file, e))
+
+def get_converter(column_type):
+    """
+    Return the method converting a csv value
+    into the type of a column.
+    """
+    if ("int" in column_type):
+        cast = int
+    elif (("real" in column_type) or ("floa" in column_type) or
+          ("doub" in column_type)):
+        cast = float
     else:
+        cast = None
+
+    def convert(value):
+        if (value == NULL_VALUE):
+            return None
+        if (cast is None):
+            return value
+        if (value == ""):
+            return None
+        try:
+            return cast(value)
+        except ValueError:
+            # Values which can not be converted are stored as text
+            return value
+    return convert
+
+
+def read_rows(csv_file, columns, delimiter=",", quotechar="\"",
+              Header=False, auto_id=False):
+    """
+    Read a csv file row by row, and yield the values
+    converted into the types of the table columns.
+    If Header is True, csv columns are matched by name with
+    the table columns, otherwise by position.
+    """
+    with open(csv_file, 'rb') as csvfile:
+        content = csv.reader(csvfile,
+                             delimiter=delimiter,
+                             quotechar=quotechar)
         if (Header):
-            data = data[1:]
+            header = [name.strip().upper() for name in next(content, [])]
+            names = [column[0].upper() for column in columns]
+            indices = []
+            for name in header:
+                if (name not in names):
+                    raise csv.Error("Unknown column %s in %s" % (name, csv_file))
+                indices.append(names.index(name))
+        else:
+            indices = range(len(columns))
+        # The primary key is assigned by sqlite if auto_id is set
+        kept = [(i, index) for i, index in enumerate(indices)
+                if not (auto_id and columns[index][2])]
+        converters = [(i, get_converter(columns[index][1])) for i, index in kept]
+
+        yield [columns[index][0] for i, index in kept]
+        for row in content:
+            if not (row):
+                continue
+            yield [convert(row[i]) if (i < len(row)) else None
+                   for i, convert in converters]
+
+
+def csv2sqlite(csv_file, sqlite_file, sqlite_table,
+               delimiter=",",
+               quotechar="\"", Header=False,
+               batch_size=BATCH_SIZE,
+               journal_mode=JOURNAL_MODE,
+               synchronous=SYNCHRONOUS,
+               auto_id=False,
+               schema_file=None,
+               verbose=False):
+    """
+    Import one or several csv files into a sqlite table,
+    using batches of batch_size rows per transaction.
+    Returns the number of rows inserted.
+    """
+    if (isinstance(csv_file, basestring)):
+        csv_file = [csv_file]
+
+    if not (os.path.isfile(sqlite_file)):
+        if (schema_file is None):
+            sys.exit("%s does not exist!" % sqlite_file)
+        conn = sqlite3.connect(sqlite_file)
+        with open(schema_file) as fr:
+            conn.executescript(fr.read())
+        conn.close()
+    for current_file in csv_file:
+        if not (os.path.isfile(current_file)):
+            sys.exit("%s does not exist!" % current_file)
 
     # Insert into sqlite
+    nrow = 0
+    t0 = time.time()
     try:
         conn = sqlite3.connect(sqlite_file)
-        c = conn.cursor()
-        for i, row in enumerate(data):
-            for j, col in enumerate(row):
-                if (type(col) == str):
-                    data[i][j] = "\"" + col + "\""
-
-            cmd = "INSERT INTO %s VALUES(%s)" % (sqlite_table, ",".join(row))
-            print cmd
-            c.execute(cmd)
+        conn.text_factory = str
+        # The journal mode of the database is persistent, it is restored when done
+        initial_journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        initial_synchronous = conn.execute("PRAGMA synchronous").fetchone()[0]
+        conn.execute("PRAGMA journal_mode=%s" % journal_mode)
+        conn.execute("PRAGMA synchronous=%s" % synchronous)
+        conn.execute("PRAGMA temp_store=MEMORY")
+        columns = get_columns(conn, sqlite_table)
+        if not (columns):
+            sys.exit("Table %s does not exist in %s!" % (sqlite_table, sqlite_file))
+
+        for current_file in csv_file:
+            rows = read_rows(current_file, columns,
+                             delimiter=delimiter, quotechar=quotechar,
+                             Header=Header, auto_id=auto_id)
+            names = next(rows)
+            cmd = "INSERT INTO %s (%s) VALUES (%s)" % (sqlite_table, ",".join(names),
+                                                       ",".join(["?"] * len(names)))
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if (len(batch) >= batch_size):
+                    with conn:
+                        conn.executemany(cmd, batch)
+                    nrow += len(batch)
+                    batch = []
+            if (batch):
+                with conn:
+                    conn.executemany(cmd, batch)
+                nrow += len(batch)
+            if (verbose):
+                print "%s loaded (%i rows in total)" % (current_file, nrow)
+    except csv.Error as e:
+        sys.exit("Error raised with %s: \n %s" % (current_file, e))
     except sqlite3.Error as e:
         sys.exit("Error raised with %s: \n %s" % (sqlite_file, e))
     else:
-        conn.commit()
+        conn.execute("PRAGMA journal_mode=%s" % initial_journal_mode)
+        conn.execute("PRAGMA synchronous=%s" % initial_synchronous)
         conn.close()
 
+    elapsed = time.time() - t0
+    if (verbose):
+        print "%i rows inserted into %s in %.2f sec. (%.0f rows/sec.)" % \
+            (nrow, sqlite_table, elapsed, nrow / max(elapsed, 1.0e-6))
+    return nrow
+
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(
-                                     description="Import a csv file into a sqlite table",
+                                     description="Import csv files into a sqlite table",
                                      add_help=True)
-    parser.add_argument("csv_file", nargs=1, help="Path of the csv file")
+    parser.add_argument("csv_file", nargs="+", help="Path of the csv file(s)")
     parser.add_argument("sqlite_file", nargs=1,
                         help="Path of the sqlite database file")
     parser.add_argument("sqlite_table", nargs=1,
@@ -83,9 +202,25 @@ if __name__ == '__main__':
                         default="\"")
     parser.add_argument("-H", "--Header", action="store_true",
                         help="Flag to indicate if the first line of the csv file is the header")
+    parser.add_argument("-b", "--batch_size", nargs="?", type=int,
+                        help="Number of rows inserted per transaction",
+                        default=BATCH_SIZE)
+    parser.add_argument("-j", "--journal_mode", nargs="?",
+                        help="Sqlite journal mode used during the load",
+                        default=JOURNAL_MODE)
+    parser.add_argument("-y", "--synchronous", nargs="?",
+                        help="Sqlite synchronous mode used during the load",
+                        default=SYNCHRONOUS)
+    parser.add_argument("-s", "--schema_file", nargs="?",
+                        help="Sql script used to create the database if it does not exist (e.g. make_rabat3_hfc_db.sql)",
+                        default=None)
+    parser.add_argument("-A", "--Auto_id", action="store_true",
+                        help="Flag to let sqlite assign the primary key ids (with -H only)")
+    parser.add_argument("-V", "--Verbose", action="store_true",
+                        help="Verbose mode")
 
     args = parser.parse_args()
-    csv_file = args.csv_file[0]
+    csv_file = args.csv_file
     sqlite_file = args.sqlite_file[0]
     sqlite_table = args.sqlite_table[0]
     delimiter = args.delimiter
@@ -93,4 +228,10 @@ if __name__ == '__main__':
     Header = args.Header
 
     csv2sqlite(csv_file, sqlite_file, sqlite_table, delimiter=delimiter,
-               quotechar=quotechar, Header=Header)
+               quotechar=quotechar, Header=Header,
+               batch_size=args.batch_size,
+               journal_mode=args.journal_mode,
+               synchronous=args.synchronous,
+               auto_id=args.Auto_id,
+               schema_file=args.schema_file,
+               verbose=args.Verbose)
@@ -0,0 +1,336 @@
+#! /usr/bin/env python
+# -*- coding: latin-1 -*-
+
+"""
+Local ftp/http servers standing in for the GSFC and LESIA data archives,
+which serve the files of a local directory. They can run in a thread of
+the calling process, e.g.:
+    server = ftp_archive_server("/tmp/archive").start()
+    ... download server.url + "/wind_rad2/rad2a/20010101.R2.Z" ...
+    server.stop()
+or as a script:
+    python fake_archive_server.py /tmp/archive --ftp 2121 --http 8080
+
+A delay (sec.) can be added before each transfer with the delay attribute,
+transfers can be cut after a given number of octets with the cut attribute
+(to test the resumed transfers), and a fraction of the transfers can fail
+with a server error with the fail_rate attribute (to test the failover,
+1.0 for an unavailable server). The http server can name the files
+with the disposition attribute (sent as Content-Disposition filename),
+and the size of the files is not sent if the hide_size attribute is True.
+Resumed transfers (ftp REST/http Range) are supported.
+@author: X.Bonnin (LESIA)
+"""
+
+__author__="Xavier Bonnin"
+__date__="18-OCT-2026"
+__version__="1.00"
+
+import os, sys
+import time, socket, random
+import threading
+import argparse
+import posixpath, urllib
+import SocketServer
+import BaseHTTPServer, SimpleHTTPServer
+
+# Size (octets) of the chunks sent by the servers
+CHUNK_SIZE = 65536
+
+# Method to convert an url path into a local path of the root directory
+def get_local_path(root_directory,path):
+    path = posixpath.normpath(urllib.unquote(path.split("?",1)[0]))
+    words = [word for word in path.split("/") if word and word not in (".","..")]
+    return os.path.join(root_directory,*words)
+
+# Base class of the stand-in servers
+class archive_server():
+
+    def __init__(self,root_directory,
+                 host="127.0.0.1",port=0,
+                 delay=0.0,cut=0,fail_rate=0.0,
+                 disposition=None,hide_size=False):
+
+        self.root_directory = os.path.abspath(root_directory)
+        self.host = host
+        self.port = port
+        self.delay = delay
+        self.cut = cut
+        self.fail_rate = fail_rate
+        self.disposition = disposition
+        self.hide_size = hide_size
+        self.nfailure = 0
+        self.server = None
+        self.thread = None
+        self.ntransfer = 0
+        self.nconnection = 0
+        self.nbytes = 0
+
+    def start(self):
+        self.server = self.server_class((self.host,self.port),self.handler_class)
+        self.server.archive = self
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if (self.server is not None):
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    # Method called before each transfer.
+    # Returns False if the transfer must fail.
+    def wait(self):
+        if (self.delay > 0.0): time.sleep(self.delay)
+        if (self.fail_rate > 0.0) and (random.random() < self.fail_rate):
+            self.nfailure += 1
+            return False
+        self.ntransfer += 1
+        return True
+
+    # Method to send a file from offset, by chunks.
+    # Returns False if the transfer has been cut.
+    def send_file(self,path,write,offset=0):
+        nbytes = 0
+        with open(path,'rb') as fr:
+            fr.seek(offset)
+            while (True):
+                chunk = fr.read(CHUNK_SIZE)
+                if not (chunk): break
+                if (self.cut > 0) and (nbytes + len(chunk) > self.cut):
+                    chunk = chunk[0:self.cut - nbytes]
+                    write(chunk)
+                    self.nbytes += len(chunk)
+                    return False
+                write(chunk)
+                nbytes += len(chunk)
+                self.nbytes += len(chunk)
+        return True
+
+    @property
+    def url(self):
+        return "%s://%s:%i" % (self.scheme,self.host,self.port)
+
+class threading_tcp_server(SocketServer.ThreadingMixIn,SocketServer.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+# Minimal ftp server (passive mode only)
+class ftp_handler(SocketServer.StreamRequestHandler):
+
+    def reply(self,message):
+        self.wfile.write(message + "\r\n")
+        self.wfile.flush()
+
+    def open_data(self):
+        if (self.data_socket is None):
+            self.reply("425 Use PASV first.")
+            return None
+        self.reply("150 Opening BINARY mode data connection.")
+        conn, address = self.data_socket.accept()
+        self.data_socket.close()
+        self.data_socket = None
+        return conn
+
+    def handle(self):
+        archive = self.server.archive
+        archive.nconnection += 1
+        self.cwd = "/"
+        self.data_socket = None
+        self.rest = 0
+        self.reply("220 RABAT3 fake archive ready.")
+        while (True):
+            line = self.rfile.readline()
+            if not (line): break
+            line = line.rstrip("\r\n")
+            command, arg = (line.split(" ",1) + [""])[0:2]
+            command = command.upper()
+            path = get_local_path(archive.root_directory,posixpath.join(self.cwd,arg))
+
+            if (command == "USER"):
+                self.reply("331 Password required.")
+            elif (command == "PASS"):
+                self.reply("230 Logged in.")
+            elif (command == "REST"):
+                self.rest = int(arg)
+                self.reply("350 Restarting at %i." % (self.rest))
+            elif (command in ("TYPE","MODE","STRU")):
+                self.reply("200 OK.")
+            elif (command == "SYST"):
+                self.reply("215 UNIX Type: L8")
+            elif (command == "NOOP"):
+                self.reply("200 OK.")
+            elif (command == "PWD"):
+                self.reply("257 \"%s\"" % (self.cwd))
+            elif (command == "CWD"):
+                if (os.path.isdir(path)):
+                    self.cwd = posixpath.normpath(posixpath.join(self.cwd,arg))
+                    self.reply("250 OK.")
+                else:
+                    self.reply("550 No such directory.")
+            elif (command == "PASV"):
+                self.data_socket = socket.socket(socket.AF_INET,socket.SOCK_STREAM)
+                self.data_socket.bind((archive.host,0))
+                self.data_socket.listen(1)
+                host, port = self.data_socket.getsockname()
+                self.reply("227 Entering Passive Mode (%s,%i,%i)." %
+                           (host.replace(".",","),port//256,port%256))
+            elif (command == "SIZE"):
+                if (archive.hide_size):
+                    self.reply("502 Command not implemented.")
+                elif (os.path.isfile(path)):
+                    self.reply("213 %i" % (os.path.getsize(path)))
+                else:
+                    self.reply("550 No such file.")
+            elif (command == "RETR"):
+                if not (os.path.isfile(path)):
+                    self.reply("550 No such file.")
+                    continue
+                if not (archive.wait()):
+                    self.reply("421 Service not available.")
+                    continue
+                conn = self.open_data()
+                if (conn is None): continue
+                offset = self.rest ; self.rest = 0
+                complete = archive.send_file(path,conn.sendall,offset=offset)
+                conn.close()
+                if (complete):
+                    self.reply("226 Transfer complete.")
+                else:
+                    self.reply("426 Connection closed; transfer aborted.")
+            elif (command in ("LIST","NLST")):
+                directory = path if not (arg.startswith("-")) else \
+                    get_local_path(archive.root_directory,self.cwd)
+                if not (os.path.isdir(directory)):
+                    self.reply("550 No such directory.")
+                    continue
+                conn = self.open_data()
+                if (conn is None): continue
+                for name in sorted(os.listdir(directory)):
+                    if (command == "NLST"):
+                        conn.sendall(name + "\r\n")
+                    else:
+                        filepath = os.path.join(directory,name)
+                        mode = "drwxr-xr-x" if (os.path.isdir(filepath)) else "-rw-r--r--"
+                        mtime = time.strftime("%b %d %H:%M",time.localtime(os.path.getmtime(filepath)))
+                        conn.sendall("%s 1 ftp ftp %12i %s %s\r\n" %
+                                     (mode,os.path.getsize(filepath),mtime,name))
+                conn.close()
+                self.reply("226 Transfer complete.")
+            elif (command == "QUIT"):
+                self.reply("221 Goodbye.")
+                break
+            else:
+                self.reply("502 Command not implemented.")
+
+        if (self.data_socket is not None): self.data_socket.close()
+
+class ftp_archive_server(archive_server):
+    scheme = "ftp"
+    server_class = threading_tcp_server
+    handler_class = ftp_handler
+
+# Http server (with keep-alive connections)
+class http_handler(SimpleHTTPServer.SimpleHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+
+    def translate_path(self,path):
+        return get_local_path(self.server.archive.root_directory,path)
+
+    def setup(self):
+        SimpleHTTPServer.SimpleHTTPRequestHandler.setup(self)
+        self.server.archive.nconnection += 1
+
+    def do_GET(self):
+        archive = self.server.archive
+        path = self.translate_path(self.path)
+        if not (os.path.isfile(path)):
+            SimpleHTTPServer.SimpleHTTPRequestHandler.do_GET(self)
+            return
+        if not (archive.wait()):
+            self.send_error(503,"Service not available")
+            return
+
+        size = os.path.getsize(path)
+        offset = 0
+        byte_range = self.headers.get("Range","")
+        if (byte_range.startswith("bytes=")) and (byte_range[6:].endswith("-")):
+            offset = int(byte_range[6:-1])
+            if (offset >= size):
+                self.send_response(416)
+                self.send_header("Content-Range","bytes */%i" % (size))
+                self.send_header("Content-Length","0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            total = "*" if (archive.hide_size) else str(size)
+            self.send_header("Content-Range","bytes %i-%i/%s" % (offset,size-1,total))
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type","application/octet-stream")
+        if (archive.hide_size):
+            # The end of the file is given by the end of the connection
+            self.send_header("Connection","close")
+            self.close_connection = 1
+        else:
+            self.send_header("Content-Length",str(size - offset))
+        if (archive.disposition is not None):
+            self.send_header("Content-Disposition",
+                             "attachment; filename=\"%s\"" % (archive.disposition))
+        self.end_headers()
+        if not (archive.send_file(path,self.wfile.write,offset=offset)):
+            self.close_connection = 1
+
+    def do_HEAD(self):
+        path = self.translate_path(self.path)
+        if not (self.server.archive.hide_size) or not (os.path.isfile(path)):
+            SimpleHTTPServer.SimpleHTTPRequestHandler.do_HEAD(self)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type","application/octet-stream")
+        self.end_headers()
+
+    def log_message(self,format,*args):
+        pass
+
+class threading_http_server(SocketServer.ThreadingMixIn,BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+class http_archive_server(archive_server):
+    scheme = "http"
+    server_class = threading_http_server
+    handler_class = http_handler
+
+if (__name__ == "__main__"):
+
+    parser = argparse.ArgumentParser(add_help=True)
+    parser.add_argument('root_directory',nargs=1,help="Directory of the files to serve.")
+    parser.add_argument('--ftp',nargs='?',default=2121,type=int,help="Port of the ftp server.")
+    parser.add_argument('--http',nargs='?',default=8080,type=int,help="Port of the http server.")
+    parser.add_argument('--delay',nargs='?',default=0.0,type=float,
+                        help="Delay (sec.) before each transfer.")
+    parser.add_argument('--cut',nargs='?',default=0,type=int,
+                        help="If > 0, cut each transfer after this number of octets.")
+    parser.add_argument('--fail_rate',nargs='?',default=0.0,type=float,
+                        help="Fraction of the transfers which fail with a server error.")
+    Namespace = parser.parse_args()
+
+    root_directory = Namespace.root_directory[0]
+    servers = [ftp_archive_server(root_directory,port=Namespace.ftp,
+                                  delay=Namespace.delay,cut=Namespace.cut,
+                                  fail_rate=Namespace.fail_rate),
+               http_archive_server(root_directory,port=Namespace.http,
+                                   delay=Namespace.delay,cut=Namespace.cut,
+                                   fail_rate=Namespace.fail_rate)]
+    for server in servers:
+        server.start()
+        print "Serving %s on %s" % (root_directory,server.url)
+    try:
+        while (True): time.sleep(1)
+    except KeyboardInterrupt:
+        for server in servers: server.stop()
@@ -0,0 +1,62 @@
+#! /usr/bin/env python
+# -*- coding: latin-1 -*-
+
+"""
+Stand-in for an IDL session running rabat3_worker.sav,
+which speaks the same line protocol (see src/rabat3_worker.pro).
+It can be used to test the persistent IDL sessions of the wrapper
+without an IDL licence, e.g.:
+    rabat3_hfc_processing.py config_file -w 2 --idl_exe "python fake_idl.py"
+
+A job writes an output file with the feature header only,
+except if the data file name contains:
+    CRASH - the session exits abruptly (to test the worker restart),
+    FAIL  - the job returns an error status.
+@author: X.Bonnin (LESIA)
+"""
+
+import sys, time
+
+TAG = "@RABAT3@ "
+
+FEAT_HEADER = ["CC_X_PIX","CC_Y_PIX","CC_X_UTC","CC_Y_MHZ","CC",
+               "SKE_CC_X_PIX","SKE_CC_Y_PIX","SKE_CC_X_UTC","SKE_CC_Y_MHZ","SKE_CC",
+               "BR_X0_PIX","BR_Y0_PIX","BR_X3_PIX","BR_Y3_PIX",
+               "BR_X0_UTC","BR_Y0_MHZ","BR_X3_UTC","BR_Y3_MHZ",
+               "TIME_START","TIME_END","FEAT_MAX_INT","FEAT_MEAN_INT",
+               "FIT_A0","FIT_A1","DRIFT_START","DRIFT_END","LVL_TRUST"]
+
+# Simulated processing time of a job (sec.)
+JOB_TIME = 0.0
+
+def reply(message):
+    sys.stdout.write(TAG + message + "\n")
+    sys.stdout.flush()
+
+def main():
+    reply("READY")
+    while (True):
+        line = sys.stdin.readline()
+        if not (line): break
+        fields = line.rstrip("\n").split("\t")
+        command = fields[0].strip().upper()
+        if (command == "QUIT"): break
+        if (command != "RUN") or (len(fields) < 4):
+            print "Unknown command: " + line.strip()
+            reply("DONE 1")
+            continue
+
+        data_file, config_file, output_file = fields[1:4]
+        print "Processing %s with %s" % (data_file,config_file)
+        if ("CRASH" in data_file): sys.exit(139)
+        if ("FAIL" in data_file):
+            print "Error running rabat3_processing: %s" % (data_file)
+            reply("DONE 1")
+            continue
+        time.sleep(JOB_TIME)
+        with open(output_file,'w') as fw:
+            fw.write(";".join(FEAT_HEADER) + "\n")
+        reply("DONE 0")
+
+if (__name__ == "__main__"):
+    main()
@@ -59,6 +59,103 @@ CREATE TABLE `PROCESSING_HISTORY` (
   `FEAT_RUN_DATE` text, -- Date and time when the fr code was run
   `STATUS`  text, -- Processing status
   `COMMENT` text, -- Comment on the last processing status
+  `RUN_ID` text, -- Run (hostname:pid) which has set the processing status
   FOREIGN KEY(OBSERVAT_ID) REFERENCES OBSERVATORY(ID_OBSERVAT),
   FOREIGN KEY(FRC_INFO_ID) REFERENCES FRC_INFO(ID_FRC_INFO)
-);
\ No newline at end of file
+);
+CREATE UNIQUE INDEX `IDX_HISTORY_FILE_ID` ON `PROCESSING_HISTORY` (`FILE_ID`);
+CREATE INDEX `IDX_HISTORY_DATE_OBS` ON `PROCESSING_HISTORY` (`DATE_OBS`);
+
+--
+-- Table structure for table `OBSERVATIONS`
+--
+
+DROP TABLE IF EXISTS `OBSERVATIONS`;
+CREATE TABLE `OBSERVATIONS` (
+  `ID_OBSERVATIONS` integer primary key, -- Primary id
+  `OBSERVATORY_ID` integer, -- Pointing to ID_OBSERVAT in OBSERVATORY table
+  `DATE_OBS` text, -- Date and time of the beginning of the observation
+  `DATE_END` text, -- Date and time of the end of the observation
+  `JDINT` integer, -- Integer part of the julian day of DATE_OBS
+  `JDFRAC` real, -- Fractional part of the julian day of DATE_OBS
+  `C_ROTATION` integer, -- Carrington rotation of DATE_OBS
+  `BSCALE` real, -- Scaling factor of the data
+  `BZERO` real, -- Offset of the data
+  `BITPIX` integer, -- Number of bits per data value
+  `EXP_TIME` real, -- Exposure time
+  `NAXIS1` integer, -- Number of time samples
+  `NAXIS2` integer, -- Number of frequency channels
+  `CDELT1` real, -- Time resolution
+  `CDELT2` real, -- Frequency resolution
+  `R_SUN` real, -- Not used for radio dynamical spectra
+  `CENTER_X` real, -- Center of the spectrum along time axis
+  `CENTER_Y` real, -- Center of the spectrum along frequency axis
+  `QUALITY` text, -- Quality of the observation
+  `FILENAME` text, -- Name of the data file
+  `FILE_FORMAT` text, -- Format of the data file
+  `COMMENT` text, -- Any additional comment
+  `LOC_FILENAME` text, -- Local path of the data file
+  `URL` text, -- Url of the data file
+  `QCLK_FNAME` text, -- Name of the quicklook image
+  `QCLK_URL` text, -- Url of the quicklook image
+  FOREIGN KEY(OBSERVATORY_ID) REFERENCES OBSERVATORY(ID_OBSERVAT)
+);
+CREATE INDEX `IDX_OBSERVATIONS_DATE_OBS` ON `OBSERVATIONS` (`DATE_OBS`);
+
+--
+-- Table structure for table `FEATURES`
+--
+
+DROP TABLE IF EXISTS `FEATURES`;
+CREATE TABLE `FEATURES` (
+  `ID_TYPE_III` integer primary key, -- Primary id
+  `FRC_INFO_ID` integer, -- Pointing to ID_FRC_INFO in FRC_INFO table
+  `OBSERVATIONS_ID` integer, -- Pointing to ID_OBSERVATIONS in OBSERVATIONS table
+  `CC_X_PIX` integer, -- Time index of the chain code start pixel
+  `CC_Y_PIX` integer, -- Frequency index of the chain code start pixel
+  `CC_X_UTC` text, -- Time of the chain code start pixel
+  `CC_Y_MHZ` real, -- Frequency of the chain code start pixel
+  `CC` text, -- Chain code of the feature contour
+  `CC_LENGTH` integer, -- Length of the chain code
+  `SKE_CC_X_PIX` integer, -- Time index of the skeleton chain code start pixel
+  `SKE_CC_Y_PIX` integer, -- Frequency index of the skeleton chain code start pixel
+  `SKE_CC_X_UTC` text, -- Time of the skeleton chain code start pixel
+  `SKE_CC_Y_MHZ` real, -- Frequency of the skeleton chain code start pixel
+  `SKE_CC` text, -- Chain code of the feature skeleton
+  `SKE_CC_LENGTH` integer, -- Length of the skeleton chain code
+  `BR_X0_PIX` integer, -- Bounding rectangle corners (pixels)
+  `BR_Y0_PIX` integer,
+  `BR_X1_PIX` integer,
+  `BR_Y1_PIX` integer,
+  `BR_X2_PIX` integer,
+  `BR_Y2_PIX` integer,
+  `BR_X3_PIX` integer,
+  `BR_Y3_PIX` integer,
+  `BR_X0_UTC` text, -- Bounding rectangle corners (time, frequency)
+  `BR_Y0_MHZ` real,
+  `BR_X1_UTC` text,
+  `BR_Y1_MHZ` real,
+  `BR_X2_UTC` text,
+  `BR_Y2_MHZ` real,
+  `BR_X3_UTC` text,
+  `BR_Y3_MHZ` real,
+  `TIME_START` text, -- Start time of the feature
+  `TIME_END` text, -- End time of the feature
+  `FEAT_MAX_INT` real, -- Maximal intensity of the feature
+  `FEAT_MEAN_INT` real, -- Mean intensity of the feature
+  `FIT_A0` real, -- Drift rate fit parameters
+  `FIT_A1` real,
+  `DRIFT_START` real, -- Drift rate at the start of the feature
+  `DRIFT_END` real, -- Drift rate at the end of the feature
+  `LVL_TRUST` real, -- Level of trust of the detection
+  `MULTIPLE` integer, -- Number of features in the same group
+  `SNAPSHOT_FN` text, -- Name of the snapshot image
+  `SNAPSHOT_PATH` text, -- Path of the snapshot image
+  `FEAT_FILENAME` text, -- Name of the feat. output file
+  `HELIO_ID` text, -- HELIO id of the feature
+  `RUN_DATE` text, -- Date and time when the fr code was run
+  FOREIGN KEY(FRC_INFO_ID) REFERENCES FRC_INFO(ID_FRC_INFO),
+  FOREIGN KEY(OBSERVATIONS_ID) REFERENCES OBSERVATIONS(ID_OBSERVATIONS)
+);
+CREATE INDEX `IDX_FEATURES_OBSERVATIONS_ID` ON `FEATURES` (`OBSERVATIONS_ID`);
+CREATE INDEX `IDX_FEATURES_TIME_START` ON `FEATURES` (`TIME_START`);
@@ -20,7 +20,7 @@ ENDTIME=$3
 OUTPUT_DIR=$SRC_DIR/products
 DATA_DIR=$SRC_DIR/data
 LOG_FILE=$SRC_DIR/products/rabat3_hfc_processing.log
-HISTORY_FILE=$SRC_DIR/products/rabat3_hfc_processing.history
+HISTORY_FILE=$SRC_DIR/products/rabat3_hfc_processing.sqlite
 IDL_BIN_FILE=$SRC_DIR/lib/idl/bin/rabat3_processing.sav
 
 python $SCRIPT -V -Q -D -s $STARTTIME -e $ENDTIME \
@@ -4,10 +4,20 @@
 import os,sys
 import subprocess
 import time, logging
+from collections import namedtuple
+import numpy as np
 from datetime import datetime, timedelta
-from waves import waves,swaves
+from waves import wind
 from frc_toolkit import ordered_dict, parse_configfile, write_csv
 from ssw import tim2jd, tim2carr
+from spectrum_cache import spectrum_cache
+from rabat3_idl_worker import idl_worker_pool
+from download_manager import download_manager
+from remote_catalog import remote_catalog
+from provider_router import provider_router
+from hfc_sink import open_sink, make_record
+from hfc_table import hfc_table, observations_table, features_table
+from rabat3_detection import rabat3_detection, rabat3_stream
 
 # Institut information
 CODE = "RABAT3"
@@ -30,16 +40,47 @@ OUTPUT_TFORMAT = '%Y%m%dT%H%M%S'
 # IDL executable path
 IDL_EXE_PATH = "idl"
 
+# Detection engines
+ENGINES = ["idl","python"]
+
+# IDL binary file of the persistent rabat3 sessions
+IDL_WORKER_BIN_FILE = "rabat3_worker.sav"
+
 # Open logger
 RABAT3_HFC_LOGGER="rabat3_hfc_processing"
 LOG=logging.getLogger(RABAT3_HFC_LOGGER)
 
+# Method to return the part of the default output filenames
+# which identifies the data file (runs of the same second must not share a file)
+def get_file_key(data_file):
+	if (data_file is None): return str(os.getpid())
+	return os.path.splitext(os.path.basename(data_file))[0]
+
+# Result of a run of the rabat3 code on a data file (immutable).
+# status is the exit status of the run (None if it could not be started),
+# output and errors the messages it has printed.
+class run_result(namedtuple("run_result",["data_file","output_file","success","status",
+					  "start_time","elapsed","output","errors"])):
+	__slots__ = ()
+
+	# A result is true if the run has succeeded
+	def __nonzero__(self):
+		return self.success
+
+# Method to return the result of a run started at start_time
+def make_result(data_file,output_file,success,start_time,
+		status=None,output="",errors=""):
+	return run_result(data_file,output_file,bool(success),status,
+			  start_time,time.time() - start_time,output,errors)
+
 class processing():
 	
 	def __init__(self,idl_bin_file,
                  code=CODE,version=VERSION,
                  data_directory=DATA_DIRECTORY,
-                 output_directory=OUTPUT_DIRECTORY):
+                 output_directory=OUTPUT_DIRECTORY,
+                 cache_directory=None,
+                 engine="idl"):
 	
 		self.code = code
 		self.version = version
@@ -48,9 +89,22 @@ class processing():
 		self.config_file=""
 		self.args = dict()
 		self.dataset = None
-		self.output_file=""
 		self.data_directory = data_directory
 		self.output_directory = output_directory
+		# Cache of the preprocessed spectra (if any)
+		self.cache = None
+		if (cache_directory is not None):
+			self.cache = spectrum_cache(cache_directory)
+		# Detection engine (idl or python)
+		self.engine = engine.lower()
+		# Stream of days for the multi-day python detection (if any)
+		self.stream = None
+		# Pool of persistent IDL sessions (if any)
+		self.idl_workers = None
+		# Concurrent downloads of the next data files (if any)
+		self.downloads = None
+		# Sizes of the files to download (if known)
+		self.file_sizes = {}
 		
 	def load_config(self,config_file):
 		self.args = parse_configfile(config_file)
@@ -58,16 +112,11 @@ class processing():
 		
 		if (observatory == "wind"):
 			self.observatory="win"
-			self.data_set = waves(receiver="rad2")
-		elif (observatory == "stereo_a"):
-			self.observatory="sta"
-			self.data_set = swaves(receiver="hfr")
-		elif (observatory == "stereo_b"):
-			self.observatory="stb"
-			self.data_set = swaves(receiver="hfr")
-		elif (observatory == "nancay"):
-			self.observatory="nan"
-			self.data_set = nda()
+			self.data_set = wind(receiver="rad2")
+		else:
+			# Only the Wind/Waves data reader is implemented (see waves.py)
+			LOG.error("Observatory %s is not supported!",self.args["OBSERVATORY"])
+			return False
 		
 		if (len(self.args) > 0):
 			self.config_file=config_file
@@ -75,8 +124,11 @@ class processing():
 		else:
 			return False
 
-	# Method to build the list of data files to process			
-	def build_filelist(self,starttime,endtime):
+	# Method to build the list of data files to process.
+	# If a remote_catalog instance is given, the files which are neither
+	# in the data directory nor on the server are removed from the list.
+	def build_filelist(self,starttime,endtime,
+			   catalog=None):
 		data_set = self.data_set
 		data_directory = self.data_directory
 		
@@ -86,29 +138,173 @@ class processing():
 			next_date = dateList[-1] + timedelta(days=1)
 			fileList.append(os.path.join(data_directory,data_set.get_filename(next_date)))
 			dateList.append(next_date)			
+		if (catalog is not None):
+			fileList = self.check_filelist(fileList,catalog)
 		return fileList
 
-# Method to execute the RABAT3 code in a IDL session
+	# Method to check a list of data files against the listings
+	# of the server directories (each directory is listed only once).
+	def check_filelist(self,fileList,catalog):
+		self.file_sizes = {}
+		checkedList = [] ; missing = 0 ; nbytes = 0
+		for current_file in fileList:
+			if (os.path.isfile(current_file)):
+				checkedList.append(current_file)
+				continue
+			if (getattr(self.data_set,"router",None) is not None):
+				urls = [url for url, filename in self.data_set.get_mirrors(filename=current_file)]
+			else:
+				urls = [self.data_set.get_url(filename=current_file)]
+			exists = False ; url = None
+			for current_url in urls:
+				status = catalog.exists(current_url)
+				if (status is True):
+					exists = True ; url = current_url
+					break
+				elif (status is None):
+					exists = None
+			if (exists is False):
+				LOG.debug("%s is not available on the server",os.path.basename(current_file))
+				missing += 1
+				continue
+			# Files are kept if the directory can not be listed
+			checkedList.append(current_file)
+			size = catalog.get_size(url) if (url is not None) else None
+			if (size is not None):
+				self.file_sizes[current_file] = size
+				nbytes += size
+		if (missing > 0):
+			LOG.warning("%i file(s) not available on the server",missing)
+		if (self.file_sizes):
+			LOG.info("%i file(s) to download (%.1f Mo)",
+				 len(self.file_sizes),nbytes/1048576.0)
+		return checkedList
+
+	# Method to download the data files from the fastest available
+	# provider/mirror server (e.g., providers=["gsfc","lesia"],
+	# mirrors={"gsfc":["ftp://mirror.host"]}), with failover.
+	def start_router(self,providers=None,mirrors=None,**options):
+		data_set = self.data_set
+		if (providers is not None): data_set.providers = providers
+		if (mirrors is not None): data_set.mirrors = mirrors
+		data_set.router = provider_router(username=data_set.username,
+						  password=data_set.password,
+						  **options)
+		LOG.info("Downloading from %s",", ".join(data_set.providers))
+		return data_set.router
+
+	def stop_router(self):
+		if (getattr(self.data_set,"router",None) is not None):
+			self.data_set.router.report()
+
+	# Method to create the catalog of the server directories,
+	# whose listings are cached in cache_directory for ttl seconds
+	def get_catalog(self,cache_directory=None,ttl=None):
+		if (cache_directory is None): cache_directory = self.data_directory
+		options = {}
+		if (ttl is not None): options["ttl"] = ttl
+		return remote_catalog(cache_directory=cache_directory,
+				      username=self.data_set.username,
+				      password=self.data_set.password,
+				      **options)
+
+	# Method to start a pool of persistent IDL sessions,
+	# which are used by run_idl instead of one idl -rt process per file.
+	# idl_exe can be a list, e.g. ["python","fake_idl.py"] for tests.
+	def start_idl_workers(self,nworker,
+			      idl_worker_bin_file=None,
+			      idl_exe=IDL_EXE_PATH):
+
+		if (idl_worker_bin_file is None):
+			idl_worker_bin_file = os.path.join(os.path.dirname(self.idl_bin_file),
+							   IDL_WORKER_BIN_FILE)
+		if (isinstance(idl_exe,basestring)) and \
+			not (os.path.isfile(idl_worker_bin_file)):
+			LOG.error("%s does not exist, please check!",idl_worker_bin_file)
+			return False
+
+		self.stop_idl_workers()
+		self.idl_workers = idl_worker_pool(idl_worker_bin_file,
+						   nworker=nworker,
+						   idl_exe=idl_exe)
+		LOG.info("%i persistent IDL session(s) available",nworker)
+		return True
+
+	def stop_idl_workers(self):
+		if (self.idl_workers is not None):
+			self.idl_workers.stop()
+			self.idl_workers = None
+
+	# Method to start the concurrent downloads of the data files,
+	# in order to prefetch the next days while the current ones are processed.
+	def start_downloads(self,nworker):
+		self.stop_downloads()
+		self.downloads = download_manager(max_workers=nworker,
+						  username=self.data_set.username,
+						  password=self.data_set.password)
+		LOG.info("%i concurrent download(s) available",nworker)
+		return True
+
+	def stop_downloads(self):
+		if (self.downloads is not None):
+			self.downloads.shutdown()
+			self.downloads = None
+
+	# Method to queue the download of a list of data files
+	def prefetch(self,fileList):
+		if (self.downloads is None): return []
+		futures = []
+		for current_file in fileList:
+			if (os.path.isfile(current_file)): continue
+			if (getattr(self.data_set,"router",None) is not None):
+				futures.append(self.downloads.submit_call(current_file,
+									  self.data_set.get_file,
+									  filename=current_file,
+									  data_directory=os.path.dirname(current_file),
+									  verbose=False))
+				continue
+			url = self.data_set.get_url(filename=current_file)
+			if (url is None): continue
+			futures.append(self.downloads.submit(url,
+							     target_directory=os.path.dirname(current_file),
+							     output_filename=os.path.basename(current_file)))
+		return futures
+
+	# Method to wait for the download of a data file, if it has been prefetched
+	def wait_download(self,file):
+		if (self.downloads is None): return None
+		return self.downloads.wait(file)
+
+# Method to execute the RABAT3 code in a IDL session.
+# Returns a run_result; the processing instance is not modified,
+# so that several files can be processed at the same time.
 	def run_idl(self,data_file,
 		    output_file=None):
 		
+		start_time = time.time()
 		if not (os.path.isfile(data_file)):
 			LOG.error("%s does not exist, please check!",data_file)
-			return None
+			return make_result(data_file,output_file,False,start_time,
+					   errors="%s does not exist" % (data_file))
 
 		rabat3_idl_bin=self.idl_bin_file
 		if not (os.path.isfile(rabat3_idl_bin)):
 			LOG.error("%s does not exist, please check!",rabat3_idl_bin)
-			return None
+			return make_result(data_file,output_file,False,start_time,
+					   errors="%s does not exist" % (rabat3_idl_bin))
 
 		if (output_file is None):
 			filename = "_".join(["rabat3",
 					     "".join(str(self.version).split(".")),
 					     str(long(time.time())),
+					     get_file_key(data_file),
 					     self.observatory,"feat"])+".csv"
 			output_file = os.path.join(self.output_directory,
 						   filename)
 
+		if (self.idl_workers is not None):
+			return self.run_idl_worker(data_file,output_file,start_time=start_time)
+
 		idl_args = [data_file,self.config_file,
 			    "output_file="+output_file]
 		idl_args.append("/VERBOSE")	
@@ -120,33 +316,155 @@ class processing():
 					       stdout=subprocess.PIPE,
 					       stderr=subprocess.PIPE)
 		output, errors = idl_process.communicate()
-		if (idl_process.wait() == 0):
+		status = idl_process.wait()
+		if (status == 0):
 			if not (os.path.isfile(output_file)):
 				LOG.error("%s has not been saved correclty, please check!",output_file)
 				LOG.error("Error running idl command %s, output: %s, errors: %s" %
 				  (' '.join(idl_cmd), str(output), str(errors)))
-				return False
-			self.output_file=output_file
-			return True
+				return make_result(data_file,output_file,False,start_time,
+						   status=status,output=output,errors=errors)
+			return make_result(data_file,output_file,True,start_time,
+					   status=status,output=output,errors=errors)
 		else:
 			LOG.error("Error running idl command %s, output: %s, errors: %s" %
 				  (' '.join(idl_cmd), str(output), str(errors)))
-			return False
+			return make_result(data_file,output_file,False,start_time,
+					   status=status,output=output,errors=errors)
+
+	# Method to execute the RABAT3 code in one of the persistent IDL sessions
+	def run_idl_worker(self,data_file,output_file,
+			   start_time=None):
+
+		if (start_time is None): start_time = time.time()
+		LOG.info("Running --> rabat3_worker %s %s %s",
+			 data_file,self.config_file,output_file)
+		status, output = self.idl_workers.run(data_file,self.config_file,
+						      output_file)
+		output = "\n".join(output)
+		if (status == 0):
+			if not (os.path.isfile(output_file)):
+				LOG.error("%s has not been saved correclty, please check!",output_file)
+				LOG.error("Error running rabat3_worker on %s, output: %s" %
+					  (data_file, output))
+				return make_result(data_file,output_file,False,start_time,
+						   status=status,output=output)
+			return make_result(data_file,output_file,True,start_time,
+					   status=status,output=output)
+		else:
+			LOG.error("Error running rabat3_worker on %s, output: %s" %
+				  (data_file, output))
+			return make_result(data_file,output_file,False,start_time,
+					   status=status,output=output)
 	
+	# Method to execute the RABAT3 detection in python on a loaded spectrum
+	# (contours are not extracted, only the detections are saved)
+	def run_python(self,data,
+		       output_file=None,
+		       data_file=None):
+
+		start_time = time.time()
+		intensity = data.get_parameter("intensity")
+		# Frequencies must be in MHz
+		freq = 1.0e-3*data.get_parameter("frequency")
+		LOG.info("Running --> rabat3_detection (%s)",self.args.get("METHOD"))
+		try:
+			burst_indices, lvl_trust, burst_delay = \
+			    rabat3_detection(intensity,data.get_parameter("time"),freq,
+					     self.args,missing=~np.isfinite(intensity))
+		except (ValueError,NotImplementedError), why:
+			LOG.error("Error running rabat3_detection: %s",why)
+			return make_result(data_file,output_file,False,start_time,
+					   errors=str(why))
+
+		return self.write_bursts(data,burst_indices,lvl_trust,burst_delay,
+					 output_file=output_file,data_file=data_file,
+					 start_time=start_time)
+
+	# Method to start a stream of contiguous days for the python detection
+	def start_stream(self,margin=None):
+		self.stream = rabat3_stream(self.args,margin=margin)
+		return self.stream
+
+	# Method to add a loaded spectrum to the detection stream.
+	# Returns the list of (key, burst_indices, lvl_trust, burst_delay)
+	# of the days that are completed.
+	def push_stream(self,key,data,first_date):
+		intensity = data.get_parameter("intensity")
+		freq = 1.0e-3*data.get_parameter("frequency")
+		day = datetime(data.date_obs.year,data.date_obs.month,data.date_obs.day)
+		offset = (day - first_date).total_seconds()
+		time_obs = offset + np.asarray(data.get_parameter("time"),dtype=np.float64)
+		return self.stream.push(key,intensity,time_obs,freq,
+					missing=~np.isfinite(intensity))
+
+	# Method to write the python detections of a day in a csv file
+	def write_bursts(self,data,burst_indices,lvl_trust,burst_delay,
+			 output_file=None,data_file=None,
+			 start_time=None):
+
+		if (start_time is None): start_time = time.time()
+		if (output_file is None):
+			filename = "_".join(["rabat3",
+					     "".join(str(self.version).split(".")),
+					     str(long(time.time())),
+					     get_file_key(data_file),
+					     self.observatory,"burst"])+".csv"
+			output_file = os.path.join(self.output_directory,
+						   filename)
+
+		time_obs = data.get_parameter("time")
+		rows = []
+		for i,index in enumerate(burst_indices):
+			index = min(index,len(time_obs)-1)
+			burst_time = data.date_obs + timedelta(seconds=float(time_obs[index] - time_obs[0]))
+			rows.append({"BURST_INDEX":index,
+				     "BURST_TIME":burst_time.strftime(HELIO_TFORMAT),
+				     "BURST_DELAY":burst_delay[i],
+				     "LVL_TRUST":lvl_trust[i]})
+		fieldnames = ["BURST_INDEX","BURST_TIME","BURST_DELAY","LVL_TRUST"]
+		if not (write_csv(rows,output_file,fieldnames=fieldnames)):
+			LOG.error("%s has not been saved correclty, please check!",output_file)
+			return make_result(data_file,output_file,False,start_time,
+					   errors="%s has not been saved" % (output_file))
+		LOG.info("%i burst(s) detected",len(rows))
+		return make_result(data_file,output_file,True,start_time,
+				   output="%i burst(s) detected" % (len(rows)))
+
 # Class to deal with the HFC outputs 	
 class hfc():
 	
-	def __init__(self):
+	def __init__(self,sink=None):
 		self.observatory=[]
 		self.frc_info=[]
-		self.observations=[]
-		self.features=[]
+		# Typed tables of the observations and features (see hfc_table)
+		self.observations=observations_table()
+		self.features=features_table()
+		# Output sink of the observations and features (see hfc_sink)
+		self.sink=sink
+
+	# The sink is not copied with the instance given to each run
+	def __getstate__(self):
+		state = self.__dict__.copy()
+		state["sink"] = None
+		return state
+
+	# Method to return a new instance with the same meta-data,
+	# and empty observations and features tables (one per run)
+	def copy(self):
+		new_instance = hfc()
+		new_instance.observatory = self.observatory
+		new_instance.frc_info = self.frc_info
+		return new_instance
 
         # Fill a HFC table list
 	def add_row(self,table_name,**kwarg):
 		table = table_name.lower()
 		
 		if (table in self.__dict__):
+			if (isinstance(self.__dict__[table],hfc_table)):
+				self.__dict__[table].append(**kwarg)
+				return True
 			current_dict = dict()
 			for key,value in kwarg.iteritems(): 
 				current_dict[key.upper()] = value
@@ -154,4 +472,34 @@ class hfc():
 			return True
 		else:
 			return False
-					
+
+	# Fill a HFC table with several rows given column by column
+	def add_rows(self,table_name,**columns):
+		table = self.__dict__.get(table_name.lower())
+		if not (isinstance(table,hfc_table)):
+			return False
+		table.extend(**columns)
+		return True
+
+	# Method to return the observation and features of a run as a record of the output sink
+	def get_record(self,init_file=None,feat_file=None):
+		if (len(self.observations) == 0):
+			return None
+		return make_record(self.observations.take([len(self.observations)-1]),self.features,
+				   init_file=init_file,feat_file=feat_file)
+
+	# Method to send a record to the output sink.
+	# Returns a Future whose result is the output of the record.
+	def write(self,record):
+		if (self.sink is None):
+			self.sink = open_sink()
+		return self.sink.submit(record)
+
+	# Method to wait for the records sent so far
+	def flush(self):
+		if (self.sink is not None):
+			self.sink.flush()
+
+	def close(self):
+		if (self.sink is not None):
+			self.sink.close()
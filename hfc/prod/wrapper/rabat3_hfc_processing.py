@@ -14,13 +14,17 @@ import os, sys, subprocess, socket
 from datetime import datetime, timedelta
 import time, threading
 import logging, copy
-import argparse, csv
+import argparse, csv, functools
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, \
+    wait, FIRST_COMPLETED
 	
-from rabat3_hfc_job import processing, hfc
-from frc_toolkit import ordered_dict, setup_logging, write_csv, \
-    check_history
+from rabat3_hfc_job import processing, hfc, IDL_EXE_PATH, ENGINES
+from frc_toolkit import ordered_dict, write_csv
+from setup_logging import setup_logging
+from history_store import open_history, QUEUED, RUNNING, DONE, FAILED
+from hfc_sink import open_sink
 from ssw import tim2jd, tim2carr
-from waves import split_time
+from hfc_table import get_times
 	
 # Code information
 FRC_META={}
@@ -51,6 +55,9 @@ DATA_DIRECTORY=CURRENT_DIRECTORY
 # Hostname
 HOSTNAME = socket.gethostname()
 
+# IDL binary file used to run rabat3
+IDL_BIN_FILE = os.path.join(CURRENT_DIRECTORY,"rabat3_processing.sav")
+
 RABAT3_HFC_LOGGER="rabat3_hfc_processing"
 
 # Wind/Waves Rad2 meta-data
@@ -116,34 +123,81 @@ def setup_rabat3(idl_bin_file,config_file,
                  code=FRC_META['CODE'],
                  version=FRC_META['VERSION'],
                  data_directory=DATA_DIRECTORY,
-                 output_directory=OUTPUT_DIRECTORY):
+                 output_directory=OUTPUT_DIRECTORY,
+                 cache_directory=None,
+                 engine="idl"):
 		     	 
 	rabat3_instance = processing(idl_bin_file,
                                  code=code,version=version,
                                  data_directory=data_directory,
-                                 output_directory=output_directory)
+                                 output_directory=output_directory,
+                                 cache_directory=cache_directory,
+                                 engine=engine)
 	if (rabat3_instance.load_config(config_file)):
 		LOG.info("Configuration file loaded: %s",config_file)
 	else:
 		LOG.error("Can not read the configuration file: %s!",config_file)
+		return None
 	
 	return rabat3_instance
 
-# Class to run the RABAT3 IDL code
-class run_rabat3(threading.Thread):
+# Method to add the observation of a data file to the OBSERVATIONS table of
+# hfc (ids are assigned by the output sink). Returns the csv file of the
+# observation, if written by the output sink, or None if it can not be added.
+def add_observation(hfc,job,file,data,url=None,qclk_path="NULL"):
+    obs = job.observatory ; code = job.code.lower()
+    ver = "".join(str(job.version).split("."))
+    if (url is None): url = job.data_set.get_url(filename=file)
+
+    jdint,jdfrac = tim2jd(data.date_obs)
+    c_rotation = int(tim2carr(data.date_obs,DC=True))
+    table_name = "OBSERVATIONS"
+    if not (hfc.add_row(table_name,
+                        observatory_id=1,
+                        date_obs=data.date_obs.strftime(HELIO_TFORMAT),
+                        date_end=data.date_end.strftime(HELIO_TFORMAT),
+                        jdint=jdint,jdfrac=jdfrac,
+                        c_rotation=c_rotation,
+                        cdelt1=data.cdelt[0],cdelt2=data.cdelt[1],
+                        naxis1=data.naxis[0],naxis2=data.naxis[1],
+                        center_x=data.naxis[0]/2,center_y=data.naxis[1]/2,
+                        url=url,filename=os.path.basename(file),
+                        loc_filename=file,
+                        qclk_fname=os.path.basename(qclk_path),
+                        comment=data.comment,
+                        bscale="NULL",bzero="NULL",
+                        bitpix="NULL",exp_time="NULL",
+                        quality="NULL",r_sun="NULL")):
+        LOG.error("hfc_instance has no attribute %s!",table_name)
+        return None
+
+    output_filename = "_".join([code,ver,obs,data.date_obs.strftime(OUTPUT_TFORMAT),"init"])+".csv"
+    return os.path.join(job.output_directory,output_filename)
+
+# Class to run the RABAT3 IDL code on a data file
+class run_rabat3():
 
     def __init__(self,file,job,hfc,
                  output_file=None,
                  thread_id=1,
                  quicklook=True,
                  download_data=True,
-                 remove_data=False):
-		
-        threading.Thread.__init__(self)
+                 remove_data=False,
+                 history=None):
+
         self.terminated =False
         self.success=False
-        self._stopevent = threading.Event()
-	
+        # Output files written by the run
+        self.date_obs=None
+        self.init_file=None
+        self.feat_file=None
+        # Observation and features to write (see hfc.get_record)
+        self.record=None
+        # Result of the rabat3 code (see processing.run_idl)
+        self.result=None
+        # Processing history (threads only)
+        self.history=history
+
         self.thread_id = thread_id
         self.file = file
         self.job = job
@@ -152,37 +206,42 @@ class run_rabat3(threading.Thread):
         self.quicklook = quicklook
         self.download_data=download_data
         self.remove_data=remove_data
-				 
-	def run(self):
-	
-		file = self.file
-		job = self.job
-		hfc = self.hfc
-		output_file = self.output_file 
-		
-		obs = job.observatory ; code = job.code.lower()
+
+    def run(self):
+
+        file = self.file
+        job = self.job
+        hfc = self.hfc
+        output_directory = job.output_directory
+
+        obs = job.observatory ; code = job.code.lower()
         version = job.version
         ver = "".join(str(version).split("."))
 
-		# Get url of the data provider
+        # Get url of the data provider
         url = job.data_set.get_url(filename=file)
 
-		# Read data file
+        # Wait for the data file if it is being prefetched
+        if (self.download_data): job.wait_download(file)
+
+        # Read data file
         LOG.info("Loading data file %s...",file)
         data = job.data_set.get_data(filename=file,
                                      data_directory=self.job.data_directory,
                                      download_file=self.download_data,
                                      delete_file=False,
                                      verbose=False,prep=True,
-                                     dB=True,interpolate=True)
+                                     dB=True,interpolate=True,
+                                     cache=job.cache)
         if (data is None):
             LOG.error("Can not load %s!",file)
             self.terminated = True
             return False
         else:
             LOG.info("Loading data file %s...done",file)
+            self.date_obs = data.date_obs
 
-		# Write quicklook file is asked
+        # Write quicklook file is asked
         if (self.quicklook):
             LOG.info("Saving quicklook image...")
             qclk_path = job.data_set.write_img(filename=file,data=data,
@@ -192,162 +251,338 @@ class run_rabat3(threading.Thread):
                                                download_file=False,
                                                verbose=False,prep=False)
             if (os.path.isfile(qclk_path)):
-				LOG.info("%s saved",qclk_path)
-				LOG.info("Saving quicklook image...done")
+                LOG.info("%s saved",qclk_path)
+                LOG.info("Saving quicklook image...done")
             else:
-				LOG.warning("Quicklook has not been saved correctly!",qclk_path)
+                LOG.warning("Quicklook has not been saved correctly!",qclk_path)
         else:
-			qclk_path="NULL"
-				
-		
-		# Writing a CSV format file containing the observations meta-data
-        jdint,jdfrac = tim2jd(data.date_obs)
-        c_rotation = int(tim2carr(data.date_obs,DC=True))
-        table_name = "OBSERVATIONS"
-        if not (hfc.add_row(table_name,
-                            id_observations=1,observatory_id=1,
-                            date_obs=data.date_obs.strftime(HELIO_TFORMAT),
-                            date_end=data.date_end.strftime(HELIO_TFORMAT),
-                            jdint=jdint,jdfrac=jdfrac,
-                            c_rotation=c_rotation,
-                            cdelt1=data.cdelt[0],cdelt2=data.cdelt[1],
-                            naxis1=data.naxis[0],naxis2=data.naxis[1],
-                            center_x=data.naxis[0]/2,center_y=data.naxis[1]/2,
-                            url=url,filename=os.path.basename(file),
-                            loc_filename=file,
-                            qclk_fname=os.path.basename(qclk_path),
-                            comment=data.comment,
-                            bscale="NULL",bzero="NULL",
-                            bitpix="NULL",exp_time="NULL",
-                            quality="NULL",r_sun="NULL")):
-			LOG.error("hfc_instance has no attribute %s!",table_name)
-			sys.exit(1)
+            qclk_path="NULL"
 
-        fieldnames = ["ID_OBSERVATIONS","OBSERVATORY_ID","DATE_OBS","DATE_END","JDINT",
-                      "JDFRAC","C_ROTATION","BSCALE","BZERO","BITPIX","EXP_TIME",
-                      "NAXIS1","NAXIS2","CDELT1","CDELT2","R_SUN","CENTER_X","CENTER_Y",
-                      "QUALITY","FILENAME","FILE_FORMAT","COMMENT","LOC_FILENAME","URL",
-                      "QCLK_FNAME","QCLK_URL"]
+        # Observations meta-data (ids are assigned by the output sink)
+        self.init_file = add_observation(hfc,job,file,data,url=url,qclk_path=qclk_path)
+        if (self.init_file is None):
+            self.terminated = True
+            return False
 
-        output_filename = "_".join([code,ver,obs,data.date_obs.strftime(OUTPUT_TFORMAT),"init"])+".csv"
-        output_path = os.path.join(output_directory,output_filename)
-        if not (write_csv(hfc.observations,output_path,fieldnames=fieldnames)):
-			LOG.error("%s has not been written correctly!",output_path)
-			sys.exit(1)
-        else:
-			LOG.info("%s saved",output_path)
-			
+        # Run rabat3 in python on the loaded data,
+        # or in a IDL session
+        if (job.engine == "python"):
+            LOG.info("Running rabat3 code in python...")
+            output_filename= "_".join([code,ver,obs,data.date_obs.strftime(OUTPUT_TFORMAT),"burst"])+".csv"
+            output_path = os.path.join(output_directory,output_filename)
+            result = job.run_python(data,output_file=output_path,data_file=file)
+            LOG.info("Running rabat3 code in python...done (%.1f sec.)",result.elapsed)
+            self.result = result
+            success = result.success
+            if (success): self.feat_file = result.output_file
+            # Feature contours are only extracted by the IDL code,
+            # only the observation is sent to the output sink
+            return self.finish(file,success)
 
-		# Run rabat3 in a IDL session using pidly
         LOG.info("Running rabat3 code in IDL...")
         output_filename= "_".join([code,ver,obs,data.date_obs.strftime(OUTPUT_TFORMAT),"feat"])+".csv"
         output_path = os.path.join(output_directory,output_filename)
-        success = job.run_idl(file,output_file=output_path)
-        LOG.info("Running rabat3 code in IDL...done")
+        result = job.run_idl(file,output_file=output_path)
+        LOG.info("Running rabat3 code in IDL...done (%.1f sec.)",result.elapsed)
+        # The result of the run is kept by the run (and not by the shared job)
+        self.result = result
+        success = result.success
 
-		# Write rabat3 detection results in a CSV format file
+        # Read rabat3 detection results (ids are assigned by the output sink)
         table_name = "FEATURES"
-        if (success) and (os.path.isfile(job.output_file)):
-            nfeat=0
-			with open(job.output_file) as fr:
-				reader = csv.DictReader(fr, delimiter=';')
-				for i,current_row in enumerate(reader):
-					if ((current_row['CC'] != "NULL") and
-					    (len(current_row['CC']) != 0)):
-						hh_start, mm_start, ss_start=split_time(current_row['TIME_START'])
-						hh_end, mm_end, ss_end=split_time(current_row['TIME_END'])
-						time_start="T".join([data.date_obs.split("T")[0],hms_start])
-						time_end="T".join([data.date_obs.split("T")[0],hms_end])
-						if not (hfc.add_row(table_name,
-								    id_type_iii=i+1,
-								    frc_info_id=1,
-								    observations_id=1,
-								    cc_x_pix=current_row['CC_X_PIX'],
-								    cc_y_pix=current_row['CC_Y_PIX'],
-								    cc_x_utc=current_row['CC_X_UTC'],
-								    cc_y_utc=current_row['CC_Y_MHZ'],
-								    cc=current_row['CC'],
-								    cc_length=len(current_row['CC']),
-								    ske_cc_x_pix=current_row['SKE_CC_X_PIX'],
-								    ske_cc_y_pix=current_row['SKE_CC_Y_PIX'],
-								    ske_cc_x_utc=current_row['SKE_CC_X_UTC'],
-								    ske_cc_y_utc=current_row['SKE_CC_Y_MHZ'],
-								    ske_cc=current_row['SKE_CC'],
-								    ske_cc_length=len(current_row['SKE_CC']),
-								    br_x0_pix=current_row['BR_X0_PIX'],
-								    br_y0_pix=current_row['BR_Y0_PIX'],
-								    br_x1_pix=current_row['BR_X0_PIX'],
-								    br_y1_pix=current_row['BR_Y3_PIX'],
-								    br_x2_pix=current_row['BR_X3_PIX'],
-								    br_y2_pix=current_row['BR_Y0_PIX'],
-								    br_x3_pix=current_row['BR_X3_PIX'],
-								    br_y3_pix=current_row['BR_Y3_PIX'],
-								    br_x0_utc=current_row['BR_X0_UTC'],
-								    br_y0_utc=current_row['BR_Y0_MHZ'],
-								    br_x1_utc=current_row['BR_X0_UTC'],
-								    br_y1_utc=current_row['BR_Y3_MHZ'],
-								    br_x2_utc=current_row['BR_X3_UTC'],
-								    br_y2_utc=current_row['BR_Y0_MHZ'],
-								    br_x3_utc=current_row['BR_X3_UTC'],
-								    br_y3_utc=current_row['BR_Y3_MHZ'],
-								    time_start=time_start,
-								    time_end=time_end,
-								    feat_max_int=current_row['FEAT_MAX_INT'],
-								    feat_mean_int=current_row['FEAT_MEAN_INT'],
-								    fit_a0=current_row['FIT_A0'],
-								    fit_a1=current_row['FIT_A1'],
-								    drift_start=current_row['DRIFT_START'],
-								    drift_end=current_row['DRIFT_END'],
-								    lvl_trust=current_row['LVL_TRUST'],
-								    mulitple=1,
-								    snapshot_fn="NULL",
-								    snapshot_path="NULL",
-								    feat_filename=output_path,
-								    helio_id="NULL",
-								    run_date=TODAY.strftime(HELIO_TFORMAT))):
-								LOG.error("hfc_instance has no attribute %s!",table_name)
-								sys.exit(1)
-						else:
-							nfeat+=1
-                                                        
-                        ## List of the feature parameters to save into a csv format file
- 			fieldnames=["ID_TYPE_III","FRC_INFO_ID","OBSERVATIONS_ID","CC_X_PIX","CC_Y_PIX","CC_X_UTC","CC_Y_MHZ",
-				    "CC","CC_LENGTH","SKE_CC_X_PIX","SKE_CC_Y_PIX","SKE_CC_X_UTC","SKE_CC_Y_MHZ",
-				    "SKE_CC","SKE_CC_LENGTH","BR_X0_PIX","BR_Y0_PIX","BR_X1_PIX","BR_Y1_PIX",
-				    "BR_X2_PIX","BR_Y2_PIX","BR_X3_PIX","BR_Y3_PIX","BR_X0_UTC","BR_Y0_MHZ",
-				    "BR_X1_UTC","BR_Y1_MHZ","BR_X2_UTC","BR_Y2_MHZ","BR_X3_UTC","BR_Y3_MHZ",
-				    "TIME_START","TIME_END","FEAT_MAX_INT","FEAT_MEAN_INT","FIT_A0","FIT_A1",
-				    "DRIFT_START","DRIFT_END","LVL_TRUST","MULTIPLE","SNAPSHOT_FN","SNAPSHOT_PATH",
-				    "FEAT_FILENAME","HELIO_ID","RUN_DATE"]
-			
-			if (nfeat > 0):
-				if not (write_csv(hfc.features,output_path,fieldnames=fieldnames)):
-					LOG.error("%s has not been written correctly!",output_path)
-					sys.exit(1)
-				else:
-					LOG.info("%s saved",output_path)
-			else:
-				LOG.info("No feature extracted from %s",file)
-				os.remove(job.output_file)
-				
-
-		if (self.remove_data):
-			if (os.path.isfile(file)): 
-				os.remove(file)
-				LOG.info("%s deleted",file)
-
-		time.sleep(0.1)
-		self.success=success
-		self.terminated = True	
-		
-	def stop(self):
-		self._stopevent.set()
-    	
-	def setTerminated(self,terminated):
-		self.terminated = terminated
+        if (success) and (os.path.isfile(result.output_file)):
+            with open(result.output_file) as fr:
+                reader = csv.DictReader(fr, delimiter=';')
+                rows = [current_row for current_row in reader
+                        if ((current_row['CC'] != "NULL") and
+                            (len(current_row['CC']) != 0))]
+            nfeat = len(rows)
+            if (nfeat > 0):
+                columns = dict([(name,[current_row[name] for current_row in rows])
+                                for name in reader.fieldnames])
+                del rows
+                day = data.date_obs.strftime("%Y-%m-%d")
+                if not (hfc.add_rows(table_name,
+                                     frc_info_id=1,
+                                     cc_x_pix=columns['CC_X_PIX'],
+                                     cc_y_pix=columns['CC_Y_PIX'],
+                                     cc_x_utc=columns['CC_X_UTC'],
+                                     cc_y_mhz=columns['CC_Y_MHZ'],
+                                     cc=columns['CC'],
+                                     ske_cc_x_pix=columns['SKE_CC_X_PIX'],
+                                     ske_cc_y_pix=columns['SKE_CC_Y_PIX'],
+                                     ske_cc_x_utc=columns['SKE_CC_X_UTC'],
+                                     ske_cc_y_mhz=columns['SKE_CC_Y_MHZ'],
+                                     ske_cc=columns['SKE_CC'],
+                                     br_x0_pix=columns['BR_X0_PIX'],
+                                     br_y0_pix=columns['BR_Y0_PIX'],
+                                     br_x1_pix=columns['BR_X0_PIX'],
+                                     br_y1_pix=columns['BR_Y3_PIX'],
+                                     br_x2_pix=columns['BR_X3_PIX'],
+                                     br_y2_pix=columns['BR_Y0_PIX'],
+                                     br_x3_pix=columns['BR_X3_PIX'],
+                                     br_y3_pix=columns['BR_Y3_PIX'],
+                                     br_x0_utc=columns['BR_X0_UTC'],
+                                     br_y0_mhz=columns['BR_Y0_MHZ'],
+                                     br_x1_utc=columns['BR_X0_UTC'],
+                                     br_y1_mhz=columns['BR_Y3_MHZ'],
+                                     br_x2_utc=columns['BR_X3_UTC'],
+                                     br_y2_mhz=columns['BR_Y0_MHZ'],
+                                     br_x3_utc=columns['BR_X3_UTC'],
+                                     br_y3_mhz=columns['BR_Y3_MHZ'],
+                                     time_start=get_times(day,columns['TIME_START']),
+                                     time_end=get_times(day,columns['TIME_END']),
+                                     feat_max_int=columns['FEAT_MAX_INT'],
+                                     feat_mean_int=columns['FEAT_MEAN_INT'],
+                                     fit_a0=columns['FIT_A0'],
+                                     fit_a1=columns['FIT_A1'],
+                                     drift_start=columns['DRIFT_START'],
+                                     drift_end=columns['DRIFT_END'],
+                                     lvl_trust=columns['LVL_TRUST'],
+                                     multiple=1,
+                                     feat_filename=output_path,
+                                     run_date=TODAY.strftime(HELIO_TFORMAT))):
+                    LOG.error("hfc_instance has no attribute %s!",table_name)
+                    self.terminated = True
+                    return False
+                # Chain code lengths are derived from the chain codes
+                hfc.features.set_lengths('CC','CC_LENGTH')
+                hfc.features.set_lengths('SKE_CC','SKE_CC_LENGTH')
+
+            if (nfeat > 0):
+                # Csv file of the features, if written by the output sink
+                self.feat_file = output_path
+            else:
+                LOG.info("No feature extracted from %s",file)
+                os.remove(result.output_file)
+
+        return self.finish(file,success)
+
+    # Method to build the record of the run (written by the output sink),
+    # and to remove the data file if required
+    def finish(self,file,success):
+        if (success):
+            self.record = self.hfc.get_record(init_file=self.init_file,
+                                              feat_file=self.feat_file)
+
+        if (self.remove_data):
+            if (os.path.isfile(file)):
+                os.remove(file)
+                LOG.info("%s deleted",file)
+
+        self.success=success
+        self.terminated = True
+        return success
+
+# Method called by the workers of the pool to process a data file.
+# Returns the status of the run, the date of observation, the output file
+# and the record to send to the output sink (None if nothing to write).
+def process_file(rabat3_run):
+    if (rabat3_run.history is not None):
+        rabat3_run.history.set_status(rabat3_run.file,RUNNING)
+    try:
+        success = rabat3_run.run()
+    except Exception, why:
+        LOG.error("Processing %s (%i) - raised %s",
+                  rabat3_run.file,rabat3_run.thread_id,why)
+        success = False
+    return bool(success), rabat3_run.date_obs, \
+        rabat3_run.feat_file, rabat3_run.record
+
+# Method to process a list of data files using a bounded pool of workers.
+# The outputs of the runs are sent to the sink of hfc_instance (see hfc_sink),
+# and a file is done in the processing history (history_store) once they are written.
+# If prefetch > 0, the next data files are downloaded while the current ones
+# are processed (see processing.start_downloads).
+def run_pool(fileList,job,hfc_instance,history,
+             processings=1,
+             process_pool=False,
+             quicklook=True,
+             download_data=True,
+             remove_data=False,
+             prefetch=0):
+
+    if (process_pool):
+        executor = ProcessPoolExecutor(max_workers=processings)
+    else:
+        executor = ThreadPoolExecutor(max_workers=processings)
+    counter_lock = threading.Lock()
+    counter = {"done":0,"failed":0}
+
+    def file_done(file,thread_id,future):
+        date_obs = None ; feat_file = None ; record = None
+        try:
+            success, date_obs, feat_file, record = future.result()
+        except Exception, why:
+            LOG.error("Processing %s (%i) - raised %s",file,thread_id,why)
+            set_status(file,thread_id,False,comment=str(why))
+            return
+        if (success) and (record is not None):
+            output = hfc_instance.write(record)
+            output.add_done_callback(functools.partial(file_written,file,thread_id,date_obs,feat_file))
+        else:
+            set_status(file,thread_id,success,date_obs=date_obs,feat_file=feat_file)
+
+    def file_written(file,thread_id,date_obs,feat_file,output):
+        try:
+            result = output.result()
+        except Exception, why:
+            LOG.error("Writing outputs of %s (%i) - raised %s",file,thread_id,why)
+            set_status(file,thread_id,False,date_obs=date_obs,comment=str(why))
+        else:
+            set_status(file,thread_id,True,date_obs=date_obs,
+                       init_file=result["INIT_FILE"],
+                       feat_file=result["FEAT_FILE"] or feat_file)
+
+    def set_status(file,thread_id,success,**fields):
+        history.set_status(file,DONE if (success) else FAILED,**fields)
+        with counter_lock:
+            if (success):
+                counter["done"]+=1
+                LOG.info("Processing %s (%i) - done on %s",
+                         file,thread_id,datetime.today().strftime(HELIO_TFORMAT))
+            else:
+                counter["failed"]+=1
+                LOG.error("Processing %s (%i) - failed on %s",
+                          file,thread_id,datetime.today().strftime(HELIO_TFORMAT))
+
+    # Days are queued as workers become available,
+    # so that only a few jobs are waiting at a time
+    start_time = time.time()
+    pending = set()
+    for i,current_file in enumerate(fileList):
+        while (len(pending) >= 2*processings):
+            done, pending = wait(pending,return_when=FIRST_COMPLETED)
+        if (download_data) and (prefetch > 0):
+            job.prefetch(fileList[i:i+prefetch+1])
+        LOG.info("Processing %s (%i) - queued on %s",
+                 current_file,i+1,datetime.today().strftime(HELIO_TFORMAT))
+        history.set_status(current_file,QUEUED)
+        future = executor.submit(process_file,
+                                 run_rabat3(current_file,job,
+                                            hfc_instance.copy(),
+                                            thread_id=i+1,
+                                            quicklook=quicklook,
+                                            download_data=download_data,
+                                            remove_data=remove_data,
+                                            history=None if (process_pool) else history))
+        future.add_done_callback(functools.partial(file_done,current_file,i+1))
+        pending.add(future)
+    wait(pending)
+    executor.shutdown(wait=True)
+    hfc_instance.flush()
+    history.flush()
+
+    elapsed = (time.time() - start_time)/60.0
+    nfile = counter["done"] + counter["failed"]
+    LOG.info("%i file(s) processed (%i failed) in %.2f min.",
+             nfile,counter["failed"],elapsed)
+    if (elapsed > 0.0):
+        LOG.info("Throughput: %.2f file(s)/min.",nfile/elapsed)
+    return counter["done"], counter["failed"]
 	
 
-	
+# Method to process a list of contiguous days as a stream (python engine only).
+# Days are detected in a rolling buffer with the end of the previous day
+# and the beginning of the next one, so that bursts crossing midnight
+# are detected in one piece. The next day is loaded while the current one
+# is processed. As in run_pool, the observation of each day is sent to the
+# sink of hfc_instance, and the day is done once it is written.
+def run_stream(fileList,job,hfc_instance,history,
+               margin=None,
+               download_data=True,
+               remove_data=False,
+               prefetch=0):
+
+    obs = job.observatory ; code = job.code.lower()
+    ver = "".join(str(job.version).split("."))
+
+    def load_file(file):
+        if (download_data): job.wait_download(file)
+        return job.data_set.get_data(filename=file,
+                                     data_directory=job.data_directory,
+                                     download_file=download_data,
+                                     delete_file=False,
+                                     verbose=False,prep=True,
+                                     dB=True,interpolate=True,
+                                     cache=job.cache)
+
+    counter_lock = threading.Lock()
+    counter = {"done":0,"failed":0}
+    def day_done(day):
+        (file,data), burst_indices, lvl_trust, burst_delay = day
+        output_filename = "_".join([code,ver,obs,data.date_obs.strftime(OUTPUT_TFORMAT),"burst"])+".csv"
+        output_path = os.path.join(job.output_directory,output_filename)
+        current_hfc = hfc_instance.copy()
+        init_file = add_observation(current_hfc,job,file,data)
+        if (init_file is not None) and \
+            (job.write_bursts(data,burst_indices,lvl_trust,burst_delay,
+                              output_file=output_path,data_file=file)):
+            record = current_hfc.get_record(init_file=init_file,feat_file=output_path)
+            output = hfc_instance.write(record)
+            output.add_done_callback(functools.partial(day_written,file,data.date_obs,output_path))
+        else:
+            set_status(file,False,date_obs=data.date_obs)
+        if (remove_data) and (os.path.isfile(file)):
+            os.remove(file)
+            LOG.info("%s deleted",file)
+
+    def day_written(file,date_obs,feat_file,output):
+        try:
+            result = output.result()
+        except Exception, why:
+            LOG.error("Writing outputs of %s - raised %s",file,why)
+            set_status(file,False,date_obs=date_obs,comment=str(why))
+        else:
+            set_status(file,True,date_obs=date_obs,
+                       init_file=result["INIT_FILE"],
+                       feat_file=result["FEAT_FILE"] or feat_file)
+
+    def set_status(file,success,**fields):
+        history.set_status(file,DONE if (success) else FAILED,**fields)
+        with counter_lock:
+            if (success):
+                counter["done"]+=1
+                LOG.info("Processing %s - done on %s",file,datetime.today().strftime(HELIO_TFORMAT))
+            else:
+                counter["failed"]+=1
+                LOG.error("Processing %s - failed on %s",file,datetime.today().strftime(HELIO_TFORMAT))
+
+    start_time = time.time()
+    try:
+        job.start_stream(margin=margin)
+    except ValueError, why:
+        LOG.error("Can not start the detection stream: %s",why)
+        return 0, 0
+    first_date = None
+    executor = ThreadPoolExecutor(max_workers=1)
+    next_data = executor.submit(load_file,fileList[0])
+    for i,current_file in enumerate(fileList):
+        if (download_data) and (prefetch > 0):
+            job.prefetch(fileList[i+1:i+prefetch+2])
+        data = next_data.result()
+        if (i+1 < len(fileList)):
+            next_data = executor.submit(load_file,fileList[i+1])
+        if (data is None):
+            LOG.error("Can not load %s!",current_file)
+            set_status(current_file,False,comment="Can not load the data file")
+            continue
+        history.set_status(current_file,RUNNING)
+        if (first_date is None):
+            first_date = datetime(data.date_obs.year,data.date_obs.month,data.date_obs.day)
+        for day in job.push_stream((current_file,data),data,first_date):
+            day_done(day)
+    for day in job.stream.flush():
+        day_done(day)
+    executor.shutdown(wait=True)
+    hfc_instance.flush()
+    history.flush()
+
+    elapsed = (time.time() - start_time)/60.0
+    LOG.info("%i file(s) processed (%i failed) in %.2f min.",
+             counter["done"] + counter["failed"],counter["failed"],elapsed)
+    return counter["done"], counter["failed"]
+
 if (__name__ == "__main__"):
 
 	parser = argparse.ArgumentParser(add_help=True,conflict_handler="resolve")
@@ -360,6 +595,16 @@ if (__name__ == "__main__"):
                         help="Last date of the time range to process.")
 	parser.add_argument('-p','--processings',nargs='?',default=1,type=int,
                         help='Number of processings allowed to run in the same time.')
+	parser.add_argument('-P','--Process_pool',action='store_true',
+                        help='If set, run the processings in a pool of processes instead of threads.')
+	parser.add_argument('-E','--engine',nargs='?',default="idl",choices=ENGINES,
+                        help='Detection engine: idl (default) or python (detections only, no contour).')
+	parser.add_argument('-S','--Stream',action='store_true',
+                        help='If set, process the days as a contiguous stream (python engine only).')
+	parser.add_argument('-w','--idl_workers',nargs='?',default=0,type=int,
+                        help='Number of persistent IDL sessions (if 0, run one idl -rt process per file).')
+	parser.add_argument('--idl_exe',nargs='?',default=IDL_EXE_PATH,
+                        help='Command used to start the persistent IDL sessions (e.g. "python fake_idl.py" for tests).')
 	parser.add_argument('-i','--idl_bin_file',nargs='?',
                         default=IDL_BIN_FILE,
                         help="Pathname of the IDL binary file used to run rabat3.")
@@ -367,15 +612,27 @@ if (__name__ == "__main__"):
                         default=CURRENT_DIRECTORY,help="output directory.")
 	parser.add_argument('-d','--data_directory',nargs='?',
                         default=CURRENT_DIRECTORY,help="data directory.")
+	parser.add_argument('-c','--cache_directory',nargs='?',default=None,
+                        help="Directory of the preprocessed data cache (no cache if not set).")
 	parser.add_argument('-h','--history_file',nargs='?',default=None,
-                        help='Pathname of the rabat3 history file used to check processed data files.')
+                        help='Pathname of the rabat3 history database (.sqlite) used to check processed data files (the flat .history file of the same name is imported when the database is created).')
 	parser.add_argument('-l','--log_file',nargs='?',default=None,
                         help="Pathname of the log file to create.")
+	parser.add_argument('-B','--database_file',nargs='?',default=None,
+                        help="Pathname of the sqlite database (.sqlite) where the observations and features are written (if not set, they are written in csv files in the output directory).")
 	parser.add_argument('-Q','--Quicklook',action='store_true',help='produce quicklook images')
 	parser.add_argument('-D','--Download_data',action="store_true",
                         help="If set, download data file from a distant server.")
 	parser.add_argument('-R','--Remove_data',action="store_true",
                         help="If set, remove data file after processing.")
+	parser.add_argument('-T','--catalog_ttl',nargs='?',default=24.0,type=float,
+                        help="Time to live (hours) of the cached listings of the server directories, used with -D to skip the days which are not available.")
+	parser.add_argument('--providers',nargs='?',default=None,
+                        help="Comma-separated list of the data providers to download from (e.g. gsfc,lesia), using the fastest available one.")
+	parser.add_argument('-M','--mirror',action='append',default=[],
+                        help="Mirror server of a provider, given as provider=url (can be repeated).")
+	parser.add_argument('-F','--prefetch',nargs='?',default=0,type=int,
+                        help="Number of next data files to download while processing (with -D only).")
 	parser.add_argument('-V','--Verbose',action="store_true",help="Verbose mode.")
 	
 	Namespace = parser.parse_args()
@@ -383,13 +640,27 @@ if (__name__ == "__main__"):
 	starttime = Namespace.starttime
 	endtime = Namespace.endtime
 	processings = Namespace.processings
+	process_pool = Namespace.Process_pool
 	idl_bin_file = Namespace.idl_bin_file
+	engine = Namespace.engine
+	stream = Namespace.Stream
+	idl_workers = Namespace.idl_workers
+	idl_exe = Namespace.idl_exe.split()
 	output_directory = Namespace.output_directory
 	data_directory = Namespace.data_directory
+	cache_directory = Namespace.cache_directory
 	history_file = Namespace.history_file
+	database_file = Namespace.database_file
 	quicklook = Namespace.Quicklook
 	download = Namespace.Download_data
 	remove = Namespace.Remove_data
+	prefetch = Namespace.prefetch
+	catalog_ttl = Namespace.catalog_ttl
+	providers = Namespace.providers
+	mirrors = {}
+	for mirror in Namespace.mirror:
+		provider, url = mirror.split("=",1)
+		mirrors.setdefault(provider.lower(),[]).append(url)
 	verbose = Namespace.Verbose
 	log_file = Namespace.log_file
 	
@@ -415,19 +686,22 @@ if (__name__ == "__main__"):
 	LOG=logging.getLogger(RABAT3_HFC_LOGGER)
 
 	if (history_file is None):
-		history_file = os.path.join(output_directory,"rabat3_hfc_%s.history" \
+		history_file = os.path.join(output_directory,"rabat3_hfc_%s.sqlite" \
 									% (TODAY.strftime(OUTPUT_TFORMAT)))
 		LOG.info("Creating a new history file: %s",history_file)
 	else:
 		LOG.info("%s history file already exists",history_file)
 
 	# Create an instance of rabat3_hfc_job with the given input parameters
-	rabat3_job = setup_rabat3(config_file,
-                              idl_bin_file=idl_bin_file,
+	rabat3_job = setup_rabat3(idl_bin_file,config_file,
                               output_directory=output_directory,
-                              data_directory=data_directory)
+                              data_directory=data_directory,
+                              cache_directory=cache_directory,
+                              engine=engine)
+	if (rabat3_job is None):
+		sys.exit(1)
 	obs = rabat3_job.observatory ; code = rabat3_job.code.lower()
-	ver = "".join(str(VERSION).split("."))
+	ver = "".join(str(FRC_META['VERSION']).split("."))
 	
 		
 	# Load meta-data for the current observatory
@@ -444,7 +718,9 @@ if (__name__ == "__main__"):
 		sys.exit(1)
 				  
   	# Create an HFC instance for outputs
-  	hfc_instance = hfc()
+  	hfc_instance = hfc(sink=open_sink(database_file))
+	if (database_file is not None):
+		LOG.info("Observations and features written into %s",database_file)
 
 	# Write a CSV format file containing the Observatory meta-data
 	table_name = "OBSERVATORY"
@@ -480,10 +756,10 @@ if (__name__ == "__main__"):
 	table_name = "FRC_INFO"
 	if not (hfc_instance.add_row(table_name,
 				     id_frc_info=1,code=code.upper(),
-				     version=VERSION,enc_met=ENC_MET,
-				     institut=INSTITUT,person=PERSON,
-				     feature_name=FEATURE,contact=CONTACT,
-				     reference=REFERENCE)):
+				     version=FRC_META['VERSION'],enc_met=FRC_META['ENC_MET'],
+				     institut=FRC_META['INSTITUT'],person=FRC_META['PERSON'],
+				     feature_name=FRC_META['FEATURE'],contact=FRC_META['CONTACT'],
+				     reference=FRC_META['REFERENCE'])):
 		LOG.error("hfc_instance has no attribute %s!",table_name)
 		sys.exit(1)
 
@@ -498,78 +774,97 @@ if (__name__ == "__main__"):
 	else:
             LOG.info("%s saved",output_path)
 
-	fileList = rabat3_job.build_filelist(starttime,endtime)
+	# Download from the fastest available provider/mirror if required
+	if (download) and ((providers is not None) or (mirrors)):
+		if (providers is not None): providers = providers.lower().split(",")
+		rabat3_job.start_router(providers=providers,mirrors=mirrors)
+		if (process_pool):
+			LOG.warning("The provider router can not be shared between processes, using threads.")
+			process_pool = False
+
+	# The days which are not available on the server are skipped
+	catalog = None
+	if (download):
+		catalog = rabat3_job.get_catalog(ttl=3600.0*catalog_ttl)
+	fileList = rabat3_job.build_filelist(starttime,endtime,catalog=catalog)
+	if (catalog is not None): catalog.close()
 	if (len(fileList) == 0):
 		LOG.warning("Empty file set!")
 		sys.exit()
 	else:
 		LOG.info("%i file(s) to process",len(fileList))
 
-	# Check if the data files have been already processed in the history file
-	if (os.path.isfile(history_file)):
-		processed, unprocessed = check_history(history_file,fileList,log=LOG)
-		if not (unprocessed):
-			LOG.warning("All of the files have been already processed.")
-			sys.exit(0)
-		else:
-			fileList = list(unprocessed)
-			del unprocessed
-			LOG.info("%i file(s) to process.",len(fileList))
+	# Check if the data files have been already processed in the history
+	history = open_history(history_file)
+	ninterrupted = history.reset()
+	if (ninterrupted > 0):
+		LOG.warning("%i file(s) left unfinished by a previous run",ninterrupted)
+	processed, unprocessed = history.get_unprocessed(fileList)
+	LOG.info("%i file(s) already processed",len(processed))
+	if not (unprocessed):
+		LOG.warning("All of the files have been already processed.")
+		history.close()
+		sys.exit(0)
+	else:
+		fileList = list(unprocessed)
+		del unprocessed
+		LOG.info("%i file(s) to process.",len(fileList))
 			
-	#Initialize rabat3 threads for the unprocessed files
-	threadList = []
-	for i,current_file in enumerate(fileList):
-		threadList.append(run_rabat3(current_file,rabat3_job,
-                                             copy.deepcopy(hfc_instance),
-                                             thread_id=i+1,
-                                             quicklook=quicklook,
-                                             download_data=download,
-                                             remove_data=remove))
-
-	nthread = len(threadList) 
-	if (nthread == 0):
+	if (len(fileList) == 0):
 		LOG.warning("Empty processing list!")
 		sys.exit(1)
 	else:
-		LOG.info("%i processings to run.",nthread)
-	
+		LOG.info("%i processings to run.",len(fileList))
+
+	# Start the persistent IDL sessions if required
+	if (idl_workers > 0) and (engine == "idl"):
+		if (process_pool):
+			LOG.warning("Persistent IDL sessions can not be shared between processes, using threads.")
+			process_pool = False
+		if (len(idl_exe) == 1): idl_exe = idl_exe[0]
+		if not (rabat3_job.start_idl_workers(idl_workers,idl_exe=idl_exe)):
+			sys.exit(1)
+
+	# Start the concurrent downloads of the next data files if required
+	if (download) and (prefetch > 0):
+		if (process_pool):
+			LOG.warning("Downloads can not be shared between processes, using threads.")
+			process_pool = False
+		rabat3_job.start_downloads(prefetch)
+
+	# Process the days as a stream
+	if (stream):
+		if (engine != "python"):
+			LOG.error("Stream mode is only available with the python engine!")
+			sys.exit(1)
+		LOG.info("Starting rabat3 stream detection...")
+		run_stream(sorted(fileList),rabat3_job,hfc_instance,history,
+			   download_data=download,
+			   remove_data=remove,
+			   prefetch=prefetch)
+		rabat3_job.stop_downloads()
+		rabat3_job.stop_router()
+		hfc_instance.close()
+		history.close()
+		LOG.info("Rabat3 executions completed")
+		LOG.info("Total elapsed time: %f min.",(time.time() - LAUNCH_TIME)/60.0)
+		sys.exit(0)
 
 	# Launch rabat3 sessions
-	LOG.info("Starting rabat3 executions...")
-	running = []
-	nremaining = nthread 
-	for current_thread in threadList:
-		if (len(running) < nprocessings):
-			LOG.info("Processing %s (%i) - started on %s",
-					 current_thread.file, 
-					 current_thread.thread_id,
-					 datetime.today().strftime(HELIO_TFORMAT))
-			LOG.info("%i/%i current running/remaining executions(s).",
-					 len(running),nremaining)
-			current_thread.start()
-			running.append(current_thread)
-			nremaining-=1	
-			time.sleep(3)			
-		
-		i=0
-		while(len(running) >= nprocessings):
-			if (running[i].terminated):
-				if (running[i].success):
-					fw = open(history_file,'a')
-					fw.write(running[i].file+"\n")
-					fw.close()
-					LOG.info("Processing %s (%i) - done on %s",
-					 	     current_thread.file, 
-					         current_thread.thread_id,
-					         datetime.today().strftime(HELIO_TFORMAT))
-				else:
-					LOG.error("Processing %s (%i) - failed on %s",
-					 	     current_thread.file, 
-					         current_thread.thread_id,
-					         datetime.today().strftime(HELIO_TFORMAT))
-				running.remove(running[i])
-				time.sleep(3)
-			i=(i+1)%nprocessings
+	LOG.info("Starting rabat3 executions (%i %s)...",processings,
+		 "processes" if (process_pool) else "threads")
+	run_pool(fileList,rabat3_job,hfc_instance,history,
+		 processings=processings,
+		 process_pool=process_pool,
+		 quicklook=quicklook,
+		 download_data=download,
+		 remove_data=remove,
+		 prefetch=prefetch)
+	rabat3_job.stop_idl_workers()
+	rabat3_job.stop_downloads()
+	rabat3_job.stop_router()
+	hfc_instance.close()
+	history.close()
 
 	LOG.info("Rabat3 executions completed")
 	LOG.info("Total elapsed time: %f min.",(time.time() - LAUNCH_TIME)/60.0)
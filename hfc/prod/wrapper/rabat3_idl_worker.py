@@ -0,0 +1,144 @@
+#! /usr/bin/env python
+# -*- coding: latin-1 -*-
+
+"""
+Python module to drive long-lived RABAT3 IDL sessions
+(see src/rabat3_worker.pro for the protocol).
+@author: X.Bonnin (LESIA)
+"""
+
+import os
+import subprocess
+import Queue
+import logging
+
+# IDL executable path
+IDL_EXE_PATH = "idl"
+
+# Tag of the protocol lines written by the IDL sessions
+WORKER_TAG = "@RABAT3@ "
+
+# Open logger
+RABAT3_HFC_LOGGER="rabat3_hfc_processing"
+LOG=logging.getLogger(RABAT3_HFC_LOGGER)
+
+# Exception raised when an IDL session has died
+class idl_worker_error(Exception):
+	pass
+
+# Class to run RABAT3 jobs in a persistent IDL session
+class idl_worker():
+
+	def __init__(self,idl_bin_file,
+		     idl_exe=IDL_EXE_PATH,
+		     worker_id=1):
+
+		self.idl_bin_file = idl_bin_file
+		self.idl_exe = idl_exe
+		self.worker_id = worker_id
+		self.process = None
+		self.njob = 0
+
+	def get_command(self):
+		if (isinstance(self.idl_exe,(list,tuple))):
+			idl_cmd = list(self.idl_exe)
+		else:
+			idl_cmd = [self.idl_exe]
+		return idl_cmd + ["-quiet","-rt="+self.idl_bin_file]
+
+	# Start the IDL session and wait for it to be ready
+	def start(self):
+		idl_cmd = self.get_command()
+		LOG.info("Starting IDL worker #%i --> %s",self.worker_id," ".join(idl_cmd))
+		self.process = subprocess.Popen(idl_cmd,
+						stdin=subprocess.PIPE,
+						stdout=subprocess.PIPE,
+						stderr=subprocess.STDOUT,
+						bufsize=1)
+		self.njob = 0
+		output = self.read_until("READY")
+		return output
+
+	def is_alive(self):
+		return (self.process is not None) and (self.process.poll() is None)
+
+	# Read the session output until the given protocol line,
+	# and return the list of the other lines.
+	def read_until(self,keyword):
+		output = []
+		while (True):
+			line = self.process.stdout.readline()
+			if not (line):
+				self.process.wait()
+				raise idl_worker_error("IDL worker #%i has died (exit status %s)" %
+						       (self.worker_id,self.process.returncode))
+			line = line.rstrip("\n")
+			if (line.startswith(WORKER_TAG)):
+				fields = line[len(WORKER_TAG):].split()
+				if (fields) and (fields[0] == keyword):
+					return output + [" ".join(fields[1:])]
+			output.append(line)
+
+	# Run rabat3_processing on a data file, and return
+	# its exit status and the output lines of the session.
+	def run(self,data_file,config_file,output_file):
+		if not (self.is_alive()): self.start()
+		command = "\t".join(["RUN",data_file,config_file,output_file])
+		try:
+			self.process.stdin.write(command+"\n")
+			self.process.stdin.flush()
+		except IOError, why:
+			raise idl_worker_error("IDL worker #%i has died (%s)" % (self.worker_id,why))
+		output = self.read_until("DONE")
+		self.njob += 1
+		try:
+			status = int(output.pop())
+		except ValueError:
+			status = 1
+		return status, output
+
+	def stop(self):
+		if (self.is_alive()):
+			try:
+				self.process.stdin.write("QUIT\n")
+				self.process.stdin.flush()
+				self.process.wait()
+			except IOError:
+				self.process.kill()
+		self.process = None
+
+# Class to manage a pool of persistent IDL sessions.
+# Crashed sessions are restarted automatically.
+class idl_worker_pool():
+
+	def __init__(self,idl_bin_file,
+		     nworker=1,
+		     idl_exe=IDL_EXE_PATH,
+		     retries=1):
+
+		self.retries = retries
+		self.workers = [idl_worker(idl_bin_file,idl_exe=idl_exe,worker_id=i+1)
+				for i in range(nworker)]
+		self.idle = Queue.Queue()
+		for worker in self.workers:
+			self.idle.put(worker)
+
+	# Run a job on the first idle session, and return
+	# its exit status and the output lines of the session.
+	def run(self,data_file,config_file,output_file):
+		worker = self.idle.get()
+		try:
+			for i in range(self.retries+1):
+				try:
+					return worker.run(data_file,config_file,output_file)
+				except idl_worker_error, why:
+					LOG.error("%s, restarting it...",why)
+					worker.stop()
+			return 1, ["IDL worker #%i has died %i time(s) on %s" %
+				   (worker.worker_id,self.retries+1,data_file)]
+		finally:
+			self.idle.put(worker)
+
+	def stop(self):
+		for worker in self.workers:
+			worker.stop()
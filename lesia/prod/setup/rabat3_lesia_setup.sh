@@ -20,6 +20,7 @@ cd $CURRENT_DIR
 # Append rabat3 python library path to $PYTHONPATH
 PYTHONPATH=$PYTHONPATH:$RABAT3_HOME_DIR/lib/python/aux
 PYTHONPATH=$PYTHONPATH:$RABAT3_HOME_DIR/lib/python/data
+PYTHONPATH=$PYTHONPATH:$RABAT3_HOME_DIR/lib/python/detection
 export PYTHONPATH
 
 # Append rabat3 idl library path to $IDL_PATH
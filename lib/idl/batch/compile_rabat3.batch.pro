@@ -15,3 +15,4 @@
 .compile rabat3_detect_sht
 .compile rabat3_detect_lig
 .compile rabat3_processing
+.compile rabat3_worker
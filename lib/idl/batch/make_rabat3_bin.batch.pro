@@ -21,3 +21,8 @@ save, /ROUTINES, filename=filename, $
       description='Runtime IDL program to call rabat3_processing.pro', $
       /VERBOSE, /EMBEDDED
 print,filename+' saved'
+filename = target_dir + sep + 'rabat3_worker.sav'
+save, /ROUTINES, filename=filename, $
+      description='Runtime IDL program to call rabat3_worker.pro', $
+      /VERBOSE, /EMBEDDED
+print,filename+' saved'
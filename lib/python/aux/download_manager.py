@@ -0,0 +1,606 @@
+#! /usr/bin/env python
+# -*- coding: latin-1 -*-
+
+"""
+Python module to download data files from ftp/http servers.
+Files are streamed by chunks into a temporary file, which is renamed
+once the transfer is complete, and the connections are kept open
+and reused for the next files of the same host.
+Interrupted transfers are resumed, and the downloaded files are
+checked against a local manifest of their size and md5 checksum.
+@author: X.Bonnin (LESIA)
+"""
+
+__author__="Xavier Bonnin"
+__date__="18-OCT-2026"
+__version__="1.00"
+
+import os
+import time, socket
+import threading
+import base64, hashlib, csv
+from datetime import datetime
+import ftplib, httplib
+from urlparse import urlparse
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+# Size (octets) of the chunks written into the files
+CHUNK_SIZE = 1048576
+
+# Extension of the files being downloaded
+PART_EXT = ".part"
+
+# Default transfer parameters
+TIMEOUT = 180
+TRIES = 3
+TIMESLEEP = 3
+
+# Maximal number of idle connections kept per host
+MAX_IDLE = 4
+
+# Manifest of the downloaded files (one per target directory)
+MANIFEST_FILENAME = ".download_manifest.csv"
+MANIFEST_FIELDS = ["FILENAME","SIZE","MD5","URL","DATE"]
+MANIFEST_TFORMAT = "%Y-%m-%dT%H:%M:%S"
+MANIFESTS = {}
+MANIFEST_LOCK = threading.Lock()
+
+# Check of the existing files against the manifest ("size" or "md5")
+VERIFY = "size"
+
+DOWNLOAD_LOGGER = "download"
+LOG = logging.getLogger(DOWNLOAD_LOGGER)
+
+# Exception raised when a transfer fails.
+# If permanent is True (e.g., file not found), the transfer is not retried.
+class download_error(Exception):
+    def __init__(self,message,permanent=False):
+        Exception.__init__(self,message)
+        self.permanent = permanent
+
+# Method to split an url into (scheme, host, port, path, username, password)
+def split_url(url,username=None,password=None):
+    url_items = urlparse(url)
+    scheme = url_items.scheme.lower()
+    if (username is None): username = url_items.username
+    if (password is None): password = url_items.password
+    port = url_items.port
+    if (port is None):
+        port = {"ftp":21,"http":80,"https":443}.get(scheme)
+    return scheme, url_items.hostname, port, url_items.path, username, password
+
+# Class to keep the connections opened with the servers,
+# in order to reuse them for the next transfers.
+# A connection is used by one transfer at a time.
+class connection_pool():
+
+    def __init__(self,max_idle=MAX_IDLE,
+                 timeout=TIMEOUT):
+
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self.idle = {}
+        self.lock = threading.Lock()
+
+    def connect(self,key,timeout=None):
+        scheme, host, port, username, password = key
+        if (timeout is None): timeout = self.timeout
+        if (scheme == "ftp"):
+            conn = ftplib.FTP()
+            conn.connect(host,port,timeout)
+            conn.login(username or "anonymous",password or "anonymous@")
+            conn.voidcmd("TYPE I")
+        elif (scheme == "http"):
+            conn = httplib.HTTPConnection(host,port,timeout=timeout)
+        elif (scheme == "https"):
+            conn = httplib.HTTPSConnection(host,port,timeout=timeout)
+        else:
+            raise download_error("Unknown protocol %s!" % (scheme),permanent=True)
+        return conn
+
+    def get(self,key,timeout=None):
+        with self.lock:
+            idle = self.idle.get(key,[])
+            if (idle): return idle.pop()
+        return self.connect(key,timeout=timeout)
+
+    def release(self,key,conn):
+        with self.lock:
+            idle = self.idle.setdefault(key,[])
+            if (len(idle) < self.max_idle):
+                idle.append(conn)
+                return
+        self.discard(conn)
+
+    def discard(self,conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def close(self):
+        with self.lock:
+            connections = [conn for idle in self.idle.values() for conn in idle]
+            self.idle = {}
+        for conn in connections:
+            try:
+                if (isinstance(conn,ftplib.FTP)): conn.quit()
+            except Exception:
+                pass
+            self.discard(conn)
+
+# Class to count the octets written into a file during a transfer,
+# and to time the first one (i.e., the latency of the server)
+class counting_writer():
+
+    def __init__(self,fw):
+        self.fw = fw
+        self.nbytes = 0
+        self.first = None
+
+    def write(self,chunk):
+        if (self.first is None): self.first = time.time()
+        self.nbytes += len(chunk)
+        self.fw.write(chunk)
+
+    def seek(self,*args):
+        return self.fw.seek(*args)
+
+    def truncate(self,*args):
+        return self.fw.truncate(*args)
+
+    def tell(self):
+        return self.fw.tell()
+
+# Method to build the http request headers
+def get_headers(username=None,password=None,offset=0):
+    headers = {"Connection":"keep-alive"}
+    if (username is not None):
+        headers["Authorization"] = "Basic " + \
+            base64.b64encode("%s:%s" % (username,password or ""))
+    if (offset > 0):
+        headers["Range"] = "bytes=%i-" % (offset)
+    return headers
+
+# Method to return the name of a file given by a server without its path,
+# or None if it is not a valid filename (e.g., empty, "." or "..")
+def safe_filename(filename):
+    if (filename is None): return None
+    filename = os.path.basename(filename.replace("\\","/")).strip()
+    if (filename in ("",".","..")): return None
+    return filename
+
+# Method to stream a file from a http connection, starting at offset
+# (if the server supports ranges, otherwise the whole file is streamed again).
+# Returns the expected size of the file and the filename given by the server (if any).
+def stream_http(conn,path,fw,
+                username=None,password=None,
+                offset=0,
+                chunk_size=CHUNK_SIZE):
+
+    conn.request("GET",path or "/",
+                 headers=get_headers(username=username,password=password,offset=offset))
+    response = conn.getresponse()
+    if (response.status == 416):
+        # The partial file is not a prefix of the remote file
+        response.read()
+        fw.seek(0) ; fw.truncate()
+        raise download_error("HTTP error 416 (requested range from %i octets)" % (offset))
+    if (response.status not in (200,206)):
+        response.read()
+        raise download_error("HTTP error %i (%s)" % (response.status,response.reason),
+                             permanent=(response.status in (401,403,404)))
+
+    size = None
+    if (response.status == 206):
+        content_range = response.getheader("Content-Range","")
+        if (content_range.split("/")[-1].isdigit()):
+            size = int(content_range.split("/")[-1])
+    else:
+        fw.seek(0) ; fw.truncate()
+        offset = 0
+    length = response.getheader("Content-Length")
+    if (size is None) and (length is not None):
+        size = offset + int(length)
+
+    while (True):
+        chunk = response.read(chunk_size)
+        if not (chunk): break
+        fw.write(chunk)
+    # httplib raises IncompleteRead if a chunked transfer is cut
+    if (size is None) and (response.chunked):
+        size = fw.tell()
+
+    filename = None
+    disposition = response.getheader("Content-Disposition")
+    if (disposition) and ("filename=" in disposition):
+        filename = disposition.split("filename=",1)[1].strip()
+        if (filename[0:1] in ("'","\"")):
+            filename = filename[1:].split(filename[0])[0]
+        else:
+            filename = filename.split(";")[0]
+    return size, safe_filename(filename)
+
+# Method to stream a file from a ftp connection, starting at offset.
+# Returns the expected size of the file.
+def stream_ftp(conn,path,fw,
+               offset=0,
+               chunk_size=CHUNK_SIZE):
+    try:
+        size = conn.size(path)
+    except ftplib.error_perm, why:
+        if (str(why).startswith("550")):
+            raise download_error("FTP error (%s)" % (why),permanent=True)
+        size = None
+    if (size is not None) and (offset > size):
+        fw.seek(0) ; fw.truncate()
+        offset = 0
+    if (size is not None) and (offset == size):
+        return size
+    try:
+        conn.retrbinary("RETR " + path,fw.write,
+                        blocksize=chunk_size,rest=offset or None)
+    except ftplib.error_reply:
+        # REST is not supported by the server
+        fw.seek(0) ; fw.truncate()
+        conn.retrbinary("RETR " + path,fw.write,blocksize=chunk_size)
+    except ftplib.error_perm, why:
+        raise download_error("FTP error (%s)" % (why),
+                             permanent=str(why).startswith("550"))
+    return size
+
+# Method to get the size of a remote file (None if unknown)
+def get_remote_size(conn,scheme,path,
+                    username=None,password=None):
+    if (scheme == "ftp"):
+        try:
+            return conn.size(path)
+        except ftplib.error_perm, why:
+            raise download_error("FTP error (%s)" % (why),
+                                 permanent=str(why).startswith("550"))
+    conn.request("HEAD",path or "/",
+                 headers=get_headers(username=username,password=password))
+    response = conn.getresponse()
+    response.read()
+    if (response.status != 200):
+        raise download_error("HTTP error %i (%s)" % (response.status,response.reason),
+                             permanent=(response.status in (401,403,404)))
+    length = response.getheader("Content-Length")
+    if (length is None): return None
+    return int(length)
+
+# Method to compute the md5 checksum of a file
+def get_md5(filepath,chunk_size=CHUNK_SIZE):
+    md5 = hashlib.md5()
+    with open(filepath,'rb') as fr:
+        while (True):
+            chunk = fr.read(chunk_size)
+            if not (chunk): break
+            md5.update(chunk)
+    return md5.hexdigest()
+
+# Class to keep the size and the md5 checksum of the files
+# downloaded into a directory, in order to check the local files
+# without connecting to the servers.
+# Entries are appended to the manifest file (the last entry of a file wins).
+class download_manifest():
+
+    def __init__(self,directory):
+
+        self.filepath = os.path.join(directory,MANIFEST_FILENAME)
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        self.entries = {}
+        if not (os.path.isfile(self.filepath)): return
+        with open(self.filepath) as fr:
+            reader = csv.DictReader(fr,delimiter=';')
+            for row in reader:
+                try:
+                    row["SIZE"] = int(row["SIZE"])
+                except (TypeError,ValueError):
+                    continue
+                self.entries[row["FILENAME"]] = row
+
+    def get(self,filename):
+        with self.lock:
+            return self.entries.get(os.path.basename(filename))
+
+    def update(self,filepath,url="",md5=None):
+        filename = os.path.basename(filepath)
+        if (md5 is None): md5 = get_md5(filepath)
+        row = {"FILENAME":filename,"SIZE":os.path.getsize(filepath),"MD5":md5,
+               "URL":url,"DATE":datetime.today().strftime(MANIFEST_TFORMAT)}
+        with self.lock:
+            new_file = not (os.path.isfile(self.filepath))
+            with open(self.filepath,'a') as fw:
+                writer = csv.DictWriter(fw,MANIFEST_FIELDS,delimiter=';')
+                if (new_file): writer.writeheader()
+                writer.writerow(row)
+            self.entries[filename] = row
+        return row
+
+    def check(self,filepath,verify=VERIFY):
+
+        """
+        Check a local file against the manifest.
+        Returns True if the file is complete, False if it is not,
+        and None if the file is not in the manifest.
+        """
+
+        entry = self.get(filepath)
+        if (entry is None): return None
+        if not (os.path.isfile(filepath)): return False
+        if (os.path.getsize(filepath) != entry["SIZE"]): return False
+        if (verify == "md5") and (entry["MD5"]):
+            return (get_md5(filepath) == entry["MD5"])
+        return True
+
+# Method to get the manifest of a directory
+def get_manifest(directory):
+    directory = os.path.abspath(directory)
+    with MANIFEST_LOCK:
+        manifest = MANIFESTS.get(directory)
+        if (manifest is None):
+            manifest = download_manifest(directory)
+            MANIFESTS[directory] = manifest
+    return manifest
+
+# Method to check a local file, which is not in the manifest,
+# against the size of the remote file.
+# Returns None if the server can not be reached or if the size is unknown.
+def check_remote_size(target,url,pool,key,
+                      timeout=None):
+    scheme, host, port, path, username, password = split_url(url,
+                                                             username=key[3],
+                                                             password=key[4])
+    conn = None
+    try:
+        conn = pool.get(key,timeout=timeout)
+        size = get_remote_size(conn,scheme,path,
+                               username=username,password=password)
+    except (download_error,httplib.HTTPException,EOFError,
+            socket.error,IOError,ftplib.Error), why:
+        if (conn is not None): pool.discard(conn)
+        LOG.warning("Can not check the size of %s: %s",url,why)
+        return None
+    pool.release(key,conn)
+    if (size is None):
+        LOG.warning("The size of %s is unknown",url)
+        return None
+    return (size == os.path.getsize(target))
+
+# Method to add the octets and the timing of a try to the transfer statistics
+def update_stats(stats,fw,t0):
+    stats["elapsed"] = time.time() - t0
+    if (fw is None): return stats
+    stats["nbytes"] += fw.nbytes
+    if (fw.first is not None): stats["latency"] = fw.first - t0
+    return stats
+
+def fetch_url(url,
+              target_directory=".",
+              output_filename="",
+              username=None,
+              password=None,
+              tries=TRIES,
+              timeout=None,
+              timesleep=TIMESLEEP,
+              overwrite=False,
+              verify=VERIFY,
+              chunk_size=CHUNK_SIZE,
+              pool=None,
+              stats=None):
+
+    """
+    Download a file from a ftp/http server into target_directory,
+    and return the local path of the file (None if it fails).
+    The file is streamed into a temporary .part file, which is
+    renamed only once its size matches the remote one.
+    An interrupted transfer is resumed from the end of the .part file
+    (ftp REST/http Range), at the next try or at the next call.
+    The size and the md5 checksum of the downloaded files are kept
+    in the manifest of target_directory; an existing file is only
+    downloaded again if it does not match its manifest entry
+    (verify="size" or "md5"), or, if it is not in the manifest,
+    if it does not match the size of the remote file.
+    If the remote file can not be checked (server unreachable or size
+    unknown), an existing file which is not in the manifest is used as it is.
+    A transfer of unknown size is accepted if it ends cleanly, and the
+    size of the file is recorded in the manifest.
+    If a dictionary is given as stats, it is filled with the octets
+    transferred (nbytes), the latency and the duration (elapsed) of
+    the last try, and the last error (if any).
+    """
+
+    if (stats is None): stats = {}
+    stats.update({"nbytes":0,"latency":None,"elapsed":None,
+                  "error":None,"permanent":False})
+
+    scheme, host, port, path, username, password = split_url(url,
+                                                             username=username,
+                                                             password=password)
+    if (pool is None): pool = DEFAULT_POOL
+    key = (scheme,host,port,username,password)
+    manifest = get_manifest(target_directory)
+
+    # The filename given by a http server is used if output_filename is not set
+    named = bool(output_filename)
+    if not (named): output_filename = os.path.basename(path)
+    target = os.path.join(target_directory,output_filename)
+    part = target + PART_EXT
+
+    if (os.path.isfile(target)) and not (overwrite):
+        complete = manifest.check(target,verify=verify)
+        if (complete is None):
+            complete = check_remote_size(target,url,pool,key,timeout=timeout)
+            if (complete): manifest.update(target,url=url)
+        if (complete):
+            LOG.info("%s already exists",target)
+            return target
+        if (complete is None):
+            # The file is not recorded, in order to check it at the next call
+            LOG.warning("%s already exists but can not be verified, using it",target)
+            return target
+        # A truncated file is resumed, a corrupted one is downloaded again
+        entry = manifest.get(target)
+        if (entry is None) or (os.path.getsize(target) < entry["SIZE"]):
+            LOG.warning("%s is incomplete, resuming the transfer",target)
+            os.rename(target,part)
+        else:
+            LOG.warning("%s is corrupted, downloading it again",target)
+            os.remove(target)
+    elif (overwrite) and (os.path.isfile(part)):
+        os.remove(part)
+
+    for i in range(tries):
+        conn = None ; fw = None
+        t0 = time.time()
+        try:
+            conn = pool.get(key,timeout=timeout)
+            with open(part,'ab') as fp:
+                fw = counting_writer(fp)
+                fw.seek(0,os.SEEK_END)
+                offset = fw.tell()
+                if (offset > 0): LOG.info("Resuming %s from %i octets",url,offset)
+                if (scheme == "ftp"):
+                    size = stream_ftp(conn,path,fw,offset=offset,chunk_size=chunk_size)
+                    filename = None
+                else:
+                    size, filename = stream_http(conn,path,fw,
+                                                 username=username,password=password,
+                                                 offset=offset,chunk_size=chunk_size)
+                nbytes = fw.tell()
+            # ftplib/httplib do not raise an error if the connection is closed too early
+            if (size is not None) and (nbytes != size):
+                raise download_error("Incomplete transfer (%i/%i octets)" % (nbytes,size))
+        except (download_error,httplib.HTTPException,EOFError,
+                socket.error,IOError,ftplib.Error), why:
+            if (conn is not None): pool.discard(conn)
+            LOG.warning("Can not download %s: %s [%i tries remaining]",url,why,tries-i-1)
+            update_stats(stats,fw,t0)
+            stats["error"] = why
+            stats["permanent"] = getattr(why,"permanent",False)
+            if (getattr(why,"permanent",False)):
+                if (os.path.isfile(part)): os.remove(part)
+                break
+            if (i < tries-1): time.sleep(timesleep)
+            continue
+
+        pool.release(key,conn)
+        update_stats(stats,fw,t0)
+        filename = safe_filename(filename)
+        if (filename) and not (named):
+            target = os.path.join(target_directory,filename)
+        os.rename(part,target)
+        manifest.update(target,url=url)
+        if (size is None):
+            LOG.warning("%s saved, but its size could not be verified (%i octets)",target,nbytes)
+        else:
+            LOG.info("%s saved",target)
+        return target
+
+    # The partial file (if any) is kept to resume the transfer later
+    return None
+
+# Class to download files with a bounded pool of concurrent transfers,
+# e.g. to prefetch the next days of a campaign while the current day
+# is being processed. Only one transfer is made for a given local file.
+class download_manager():
+
+    def __init__(self,max_workers=4,
+                 username=None,
+                 password=None,
+                 timeout=TIMEOUT,
+                 tries=TRIES,
+                 timesleep=TIMESLEEP,
+                 verify=VERIFY,
+                 chunk_size=CHUNK_SIZE):
+
+        self.username = username
+        self.password = password
+        self.tries = tries
+        self.timesleep = timesleep
+        self.verify = verify
+        self.chunk_size = chunk_size
+        self.pool = connection_pool(max_idle=max_workers,timeout=timeout)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.futures = {}
+        self.lock = threading.Lock()
+
+    def get_target(self,url,target_directory,output_filename=""):
+        if not (output_filename): output_filename = os.path.basename(urlparse(url).path)
+        return os.path.join(target_directory,output_filename)
+
+    def submit(self,url,
+               target_directory=".",
+               output_filename="",
+               overwrite=False):
+
+        """
+        Queue the download of a file, and return its future
+        (the local path of the file, or None if it fails).
+        """
+
+        target = self.get_target(url,target_directory,output_filename)
+        return self.submit_call(target,fetch_url,url,
+                                target_directory=target_directory,
+                                output_filename=os.path.basename(target),
+                                username=self.username,
+                                password=self.password,
+                                tries=self.tries,
+                                timesleep=self.timesleep,
+                                overwrite=overwrite,
+                                verify=self.verify,
+                                chunk_size=self.chunk_size,
+                                pool=self.pool)
+
+    def submit_call(self,target,func,*args,**kwargs):
+
+        """
+        Queue a method which downloads the local file target
+        (e.g., provider_router.fetch), and return its future.
+        """
+
+        with self.lock:
+            future = self.futures.get(target)
+            if (future is not None):
+                # Failed downloads can be queued again
+                if not (future.done()) or (future.result() is not None):
+                    return future
+            future = self.executor.submit(func,*args,**kwargs)
+            self.futures[target] = future
+        return future
+
+    def prefetch(self,urls,target_directory="."):
+        return [self.submit(url,target_directory=target_directory) for url in urls]
+
+    def fetch(self,url,
+              target_directory=".",
+              output_filename="",
+              overwrite=False):
+        return self.submit(url,target_directory=target_directory,
+                           output_filename=output_filename,
+                           overwrite=overwrite).result()
+
+    def wait(self,target):
+
+        """
+        Wait for the download of a local file if it is queued,
+        and return its local path (None if it is not queued or if it failed).
+        """
+
+        with self.lock:
+            future = self.futures.get(target)
+        if (future is None): return None
+        return future.result()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+        self.pool.close()
+
+# Connections shared by the download_file methods
+DEFAULT_POOL = connection_pool()
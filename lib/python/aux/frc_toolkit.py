@@ -1,8 +1,13 @@
 #! /usr/bin/env python
 
 import logging, csv
-import urllib2, os
+import os
 import time
+import threading
+import itertools
+import gzip
+import cStringIO
+from download_manager import fetch_url
 
 # Method to check in the input history file if 
 # data files have been already processed or not
@@ -15,7 +20,7 @@ def check_history(history_file,itemList,
 
 	# Read the history file
 	fr = open(history_file,'r')
-	fileList = fr.read().split("\n")
+	fileList = set(fr.read().split("\n"))
 	fr.close()
 
 	# Found processed and unprocessed data files
@@ -49,6 +54,122 @@ def parse_configfile(configfile):
 	
 	return args
 		
+# Number of rows buffered by csv_writer before writing them
+CSV_FLUSH_SIZE = 1000
+CSV_TEMP_IDS = itertools.count()
+
+# Class to write a csv file row by row.
+# Rows are buffered and written by blocks of flush_size rows into a temporary file,
+# which is renamed to output_file when the writer is closed, so that an
+# interrupted run never leaves a truncated csv file. The file is compressed
+# with gzip if output_file ends with .gz (or if compress is True).
+# The methods can be called from several threads, the rows of one call
+# being written together.
+class csv_writer():
+
+	def __init__(self,output_file,fieldnames=None,
+		     delimiter=';',quotechar='"',
+		     flush_size=CSV_FLUSH_SIZE,
+		     compress=None,header=True):
+
+		self.output_file = output_file
+		self.fieldnames = fieldnames
+		self.flush_size = flush_size
+		if (compress is None): compress = output_file.endswith(".gz")
+		self.lock = threading.Lock()
+		self.buffer = cStringIO.StringIO()
+		self.writer = csv.writer(self.buffer,delimiter=delimiter,quotechar=quotechar,
+					 quoting=csv.QUOTE_MINIMAL)
+		self.nrow = 0 ; self.pending = 0
+		self.closed = False
+		# Temporary file in the same directory, so that the rename is atomic
+		self.temp_file = "%s.%i.%i.tmp" % (output_file,os.getpid(),CSV_TEMP_IDS.next())
+		fw = open(self.temp_file,"wb")
+		if (compress):
+			self.file = gzip.GzipFile(filename=os.path.basename(output_file)[:-3],
+						  mode="wb",fileobj=fw)
+			self.raw_file = fw
+		else:
+			self.file = fw
+			self.raw_file = None
+		if (header) and (fieldnames is not None):
+			self.writer.writerow(fieldnames)
+			self.pending += 1
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self,exc_type,exc_value,traceback):
+		if (exc_type is None):
+			self.close()
+		else:
+			self.abort()
+		return False
+
+	# Rows given as dict are written in the order of fieldnames,
+	# missing keys being empty and the other keys ignored
+	def get_values(self,row):
+		if (isinstance(row,dict)):
+			return [row.get(name,"") for name in self.fieldnames]
+		return row
+
+	def writerow(self,row):
+		self.writerows([row])
+
+	def writerows(self,rows):
+		with self.lock:
+			if (self.closed): raise ValueError("%s is closed" % (self.output_file))
+			for row in rows:
+				self.writer.writerow(self.get_values(row))
+				self.nrow += 1 ; self.pending += 1
+				if (self.pending >= self.flush_size): self.write_buffer()
+
+	def write_buffer(self):
+		if (self.pending == 0): return
+		self.file.write(self.buffer.getvalue())
+		self.buffer.seek(0)
+		self.buffer.truncate()
+		self.pending = 0
+
+	def flush(self):
+		with self.lock:
+			self.write_buffer()
+			self.file.flush()
+
+	def close_file(self):
+		self.file.close()
+		if (self.raw_file is not None): self.raw_file.close()
+
+	# Method to write the remaining rows, and rename the temporary file
+	def close(self):
+		with self.lock:
+			if (self.closed): return True
+			self.closed = True
+			try:
+				self.write_buffer()
+				self.file.flush()
+				if (self.raw_file is None):
+					os.fsync(self.file.fileno())
+				else:
+					# The gzip trailer is only written when the gzip file is closed
+					self.file.close()
+					self.raw_file.flush()
+					os.fsync(self.raw_file.fileno())
+			finally:
+				self.close_file()
+			os.rename(self.temp_file,self.output_file)
+		return True
+
+	# Method to remove the temporary file without writing output_file
+	def abort(self):
+		with self.lock:
+			if (self.closed): return
+			self.closed = True
+			try:
+				self.close_file()
+			finally:
+				if (os.path.isfile(self.temp_file)): os.remove(self.temp_file)
+
 # Method to ... write csv file
 def write_csv(content,output_file,
 			  delimiter=';',quotechar='"',
@@ -60,18 +181,11 @@ def write_csv(content,output_file,
 
 	if (fieldnames is None): fieldnames = content[0].keys()
 
-	header={}
-	for name in fieldnames: header[name] = name
-
 	try:
-		writer = csv.DictWriter(open(output_file,"wb"),fieldnames,
-					delimiter=delimiter,quotechar=quotechar,
-					quoting=csv.QUOTE_MINIMAL,
-					extrasaction='ignore')
-		writer.writerow(header)
-		for row in content: 
-			writer.writerow(row)
-	except ValueError:
+		with csv_writer(output_file,fieldnames=fieldnames,
+				delimiter=delimiter,quotechar=quotechar) as writer:
+			writer.writerows(content)
+	except (IOError,OSError,ValueError,csv.Error):
 		return False
 	else:
 		return True
@@ -83,39 +197,17 @@ def download_file(url,
 		  		  filename="",
 		  		  timeout=180):
 	
-	
-	target = "" ; tries=3
-	for i in range(tries):
-		try:
-			connect = urllib2.urlopen(url,None,timeout)
-		except urllib2.URLError,e:
-			err_msg = "Can not reach %s: %s [%s]" % (url,e,tries-i)
-			if 'log' in globals():
-				log.warning(err_msg)
-			else:
-				print err_msg
-			time.sleep(3)
-			continue
+	# The filename given by the server is used if filename is not set
+	target = fetch_url(url,target_directory=data_directory,
+			   output_filename=filename,
+			   tries=3,timeout=timeout,timesleep=3)
+	if (target is None):
+		err_msg = "Can not download %s" % (url)
+		if 'log' in globals():
+			log.warning(err_msg)
 		else:
-			if not (filename):
-				if (connect.info().has_key('Content-Disposition')):
-					filename = connect.info()['Content-Disposition'].split('filename=')[1]
-					if (filename.startswith("'")) or (filename.startswith("\"")):
-						filename=filename[1:-1]
-				else:
-					filename=os.path.basename(url)
-			target=os.path.join(data_directory,filename)
-			if not (os.path.isfile(target)):
-				fw = open(target,'wb')
-				fw.write(connect.read())
-				fw.close()
-			else:
-				msg = "%s already exists" % (target)
-				if 'log' in globals():
-					log.info(msg)
-				else:
-					print msg
-			break
+			print err_msg
+		return ""
 	return target
 
 # Method used in Python 2.6 to compute datetime.total_seconds() module operation.
@@ -0,0 +1,170 @@
+#! /usr/bin/env python
+# -*- coding: latin-1 -*-
+
+"""
+Python module to compute the geometry of the type III bursts
+of a FEATURES table (see hfc_table) from their chain codes:
+area, bounding rectangle, duration and frequency extent, and centroid.
+The contours of all of the bursts are decoded at once (see improlib.decode_chains)
+and the statistics are computed contour by contour with NumPy reductions.
+@author: X.Bonnin (LESIA)
+"""
+
+__author__="Xavier Bonnin"
+__date__="18-OCT-2026"
+__version__="1.00"
+
+import numpy as np
+
+from improlib import decode_chains
+from hfc_table import INT_NULL
+
+# Bounding rectangle columns of the FEATURES table,
+# corners being ordered as done by rabat3_hfc_processing
+# (0: [Xmin,Ymin], 1: [Xmin,Ymax], 2: [Xmax,Ymin], 3: [Xmax,Ymax]).
+BR_COLUMNS = [("BR_X0_PIX","XMIN"),("BR_Y0_PIX","YMIN"),
+              ("BR_X1_PIX","XMIN"),("BR_Y1_PIX","YMAX"),
+              ("BR_X2_PIX","XMAX"),("BR_Y2_PIX","YMIN"),
+              ("BR_X3_PIX","XMAX"),("BR_Y3_PIX","YMAX")]
+
+# Method to sum the values of the contours, given their offsets
+# (see improlib.decode_chains)
+def contour_sum(values,offsets):
+    segments = np.repeat(np.arange(len(offsets)-1),np.diff(offsets))
+    return np.bincount(segments,weights=values,minlength=len(offsets)-1)
+
+def contours_geometry(X,Y,offsets):
+
+    """
+    Method to compute the geometry of several contours at once.
+    Inputs:
+      X, Y, offsets - locations of the contours' pixels,
+                      as returned by improlib.decode_chains
+    Outputs:
+      geometry - dictionary of arrays with, for each contour:
+                 AREA (area of the polygon of the contour, shoelace formula),
+                 XMIN, XMAX, YMIN, YMAX (bounding rectangle),
+                 CENTROID_X, CENTROID_Y (centroid of the polygon,
+                 or mean location of the pixels for a flat contour).
+    Author: Xavier Bonnin (LESIA)
+    """
+
+    X = np.asarray(X,dtype=np.float64)
+    Y = np.asarray(Y,dtype=np.float64)
+    offsets = np.asarray(offsets,dtype=np.int64)
+    ncontour = len(offsets) - 1
+    first = offsets[:-1] ; last = offsets[1:] - 1
+
+    # Edges of the polygons (each contour is closed on its first pixel)
+    next_index = np.arange(1,len(X)+1)
+    next_index[last] = first
+    X1 = X[next_index] ; Y1 = Y[next_index]
+    cross = X*Y1 - X1*Y
+    signed_area = 0.5*contour_sum(cross,offsets)
+
+    npixel = np.diff(offsets).astype(np.float64)
+    with np.errstate(divide="ignore",invalid="ignore"):
+        centroid_x = contour_sum((X + X1)*cross,offsets)/(6.0*signed_area)
+        centroid_y = contour_sum((Y + Y1)*cross,offsets)/(6.0*signed_area)
+        flat = (signed_area == 0.0)
+        centroid_x[flat] = (contour_sum(X,offsets)/npixel)[flat]
+        centroid_y[flat] = (contour_sum(Y,offsets)/npixel)[flat]
+
+    geometry = {"AREA":np.abs(signed_area),
+                "CENTROID_X":centroid_x,"CENTROID_Y":centroid_y}
+    if (ncontour > 0):
+        geometry["XMIN"] = np.minimum.reduceat(X,first).astype(np.int64)
+        geometry["XMAX"] = np.maximum.reduceat(X,first).astype(np.int64)
+        geometry["YMIN"] = np.minimum.reduceat(Y,first).astype(np.int64)
+        geometry["YMAX"] = np.maximum.reduceat(Y,first).astype(np.int64)
+    else:
+        for key in ["XMIN","XMAX","YMIN","YMAX"]:
+            geometry[key] = np.zeros(0,dtype=np.int64)
+    return geometry
+
+# Method to return the CDELT1 and CDELT2 values of each feature,
+# from the OBSERVATIONS table (joined on OBSERVATIONS_ID) or from scalars.
+def get_cdelt(features,observations=None,cdelt1=None,cdelt2=None):
+    nrow = len(features)
+    if (observations is None):
+        cdelt1 = np.nan if (cdelt1 is None) else cdelt1
+        cdelt2 = np.nan if (cdelt2 is None) else cdelt2
+        return np.zeros(nrow) + cdelt1, np.zeros(nrow) + cdelt2
+    feat_cdelt1 = np.zeros(nrow) + np.nan ; feat_cdelt2 = np.zeros(nrow) + np.nan
+    if (len(observations) == 0): return feat_cdelt1, feat_cdelt2
+    order = np.argsort(observations["ID_OBSERVATIONS"])
+    ids = observations["ID_OBSERVATIONS"][order]
+    position = np.searchsorted(ids,features["OBSERVATIONS_ID"])
+    position = np.minimum(position,len(ids)-1)
+    found = (ids[position] == features["OBSERVATIONS_ID"])
+    feat_cdelt1[found] = observations["CDELT1"][order][position[found]]
+    feat_cdelt2[found] = observations["CDELT2"][order][position[found]]
+    return feat_cdelt1, feat_cdelt2
+
+def features_geometry(features,observations=None,
+                      cdelt1=None,cdelt2=None,
+                      chain="CC"):
+
+    """
+    Method to compute the geometry of the bursts of a FEATURES table.
+    Inputs:
+      features     - hfc_table of the features (CC, CC_X_PIX and CC_Y_PIX columns)
+      observations - hfc_table of the observations, used to get the
+                     CDELT1 and CDELT2 of each feature (joined on OBSERVATIONS_ID)
+      cdelt1       - time resolution used if observations is not given
+      cdelt2       - frequency resolution used if observations is not given
+      chain        - chain code column (CC or SKE_CC)
+    Outputs:
+      geometry - dictionary of arrays with, for each feature, the items
+                 of contours_geometry, the BR_*_PIX columns,
+                 DURATION = (XMAX - XMIN)*CDELT1 and
+                 FREQ_EXTENT = (YMAX - YMIN)*CDELT2.
+    Features without chain code or starting pixel have NaN values
+    (INT_NULL for the pixel indices).
+    Author: Xavier Bonnin (LESIA)
+    """
+
+    chain = chain.upper()
+    prefix = chain[:-2]
+    chaincodes = features[chain]
+    start_pix = np.column_stack([features[prefix+"CC_X_PIX"],features[prefix+"CC_Y_PIX"]])
+    valid = np.array([chaincode is not None for chaincode in chaincodes],dtype=bool)
+    valid &= (start_pix != INT_NULL).all(axis=1)
+    rows = np.flatnonzero(valid)
+
+    X, Y, offsets = decode_chains([chaincodes[i] for i in rows],start_pix[rows])
+    current_geometry = contours_geometry(X,Y,offsets)
+
+    nrow = len(features)
+    geometry = {}
+    for key, values in current_geometry.items():
+        null = INT_NULL if (values.dtype == np.int64) else np.nan
+        geometry[key] = np.zeros(nrow,dtype=values.dtype) + null
+        geometry[key][rows] = values
+    for name, key in BR_COLUMNS:
+        geometry[name] = geometry[key]
+
+    feat_cdelt1, feat_cdelt2 = get_cdelt(features,observations=observations,
+                                         cdelt1=cdelt1,cdelt2=cdelt2)
+    geometry["DURATION"] = np.zeros(nrow) + np.nan
+    geometry["FREQ_EXTENT"] = np.zeros(nrow) + np.nan
+    geometry["DURATION"][rows] = (current_geometry["XMAX"] - current_geometry["XMIN"])*feat_cdelt1[rows]
+    geometry["FREQ_EXTENT"][rows] = (current_geometry["YMAX"] - current_geometry["YMIN"])*feat_cdelt2[rows]
+    return geometry
+
+# Method to fill the BR_*_PIX columns of a FEATURES table
+# with the bounding rectangles of the contours.
+def fill_bounding_boxes(features,geometry=None):
+    if (geometry is None): geometry = features_geometry(features)
+    for name, key in BR_COLUMNS:
+        features[name] = geometry[name]
+    return features
+
+# Method to return the indices of the features whose BR_*_PIX columns
+# do not match the bounding rectangles of their contours.
+def check_bounding_boxes(features,geometry=None):
+    if (geometry is None): geometry = features_geometry(features)
+    mismatch = np.zeros(len(features),dtype=bool)
+    for name, key in BR_COLUMNS:
+        mismatch |= (features[name] != geometry[name])
+    return np.flatnonzero(mismatch)
@@ -0,0 +1,254 @@
+#! /usr/bin/env python
+# -*- coding: latin-1 -*-
+
+"""
+Python module to write the OBSERVATIONS and FEATURES output tables
+of the HFC, either into a sqlite database (see hfc/prod/scripts/make_rabat3_hfc_db.sql)
+or into csv files. The rows are sent to a single writer thread through
+a queue, and written by batches over several data files.
+The ids of the rows are assigned by the writer when the batch is written.
+@author: X.Bonnin (LESIA)
+"""
+
+__author__="Xavier Bonnin"
+__date__="18-OCT-2026"
+__version__="1.00"
+
+import os
+import time
+import threading
+import Queue
+import sqlite3
+import logging
+import numpy as np
+from concurrent.futures import Future
+
+from hfc_table import OBSERVATIONS_COLUMNS, FEATURES_COLUMNS, \
+    OBSERVATIONS_FIELDS, FEATURES_FIELDS
+
+# Tables created if they do not exist yet in the database
+SINK_SCHEMA = """
+CREATE TABLE IF NOT EXISTS `OBSERVATIONS` (%s);
+CREATE INDEX IF NOT EXISTS `IDX_OBSERVATIONS_DATE_OBS` ON `OBSERVATIONS` (`DATE_OBS`);
+CREATE TABLE IF NOT EXISTS `FEATURES` (%s);
+CREATE INDEX IF NOT EXISTS `IDX_FEATURES_OBSERVATIONS_ID` ON `FEATURES` (`OBSERVATIONS_ID`);
+CREATE INDEX IF NOT EXISTS `IDX_FEATURES_TIME_START` ON `FEATURES` (`TIME_START`);
+""" % (",".join(["`%s` %s" % column for column in OBSERVATIONS_COLUMNS]),
+       ",".join(["`%s` %s" % column for column in FEATURES_COLUMNS]))
+
+# Default number of rows per batch, and maximal time (sec.) a row waits to be written
+BATCH_SIZE = 1000
+FLUSH_INTERVAL = 2.0
+
+# Extensions of the sqlite database files
+SQLITE_EXT = [".db",".sqlite",".sqlite3"]
+
+LOG = logging.getLogger("hfc_sink")
+
+# Method to build the record of a processed data file:
+# the table of its observation (one row), the table of its features
+# (see hfc_table), and the csv files where they are written by the csv sink.
+def make_record(observation,features,
+                init_file=None,feat_file=None):
+    return {"observation":observation,"features":features,
+            "init_file":init_file,"feat_file":feat_file}
+
+# Method to set the ids of the rows of a record, starting from the given ids.
+# The tables of the record are updated in place.
+def set_ids(record,id_observations,id_type_iii):
+    observation = record["observation"]
+    features = record["features"]
+    observation["ID_OBSERVATIONS"] = id_observations
+    features["ID_TYPE_III"] = np.arange(id_type_iii,id_type_iii+len(features))
+    features["OBSERVATIONS_ID"] = id_observations
+    return observation, features
+
+# Base class of the output sinks.
+# The records are written by a single thread, by batches
+# of about batch_size rows, or every flush_interval sec.
+class hfc_sink():
+
+    def __init__(self,batch_size=BATCH_SIZE,
+                 flush_interval=FLUSH_INTERVAL):
+
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = Queue.Queue()
+        self.closed = False
+        self.thread = threading.Thread(target=self.run,name="hfc_sink")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def submit(self,record):
+
+        """
+        Queue a record to write, and return a Future
+        whose result is the output of the record
+        (ID_OBSERVATIONS, NFEATURES, INIT_FILE, FEAT_FILE).
+        """
+
+        if (self.closed):
+            raise ValueError("The output sink is closed")
+        future = Future()
+        self.queue.put((record,future))
+        return future
+
+    def flush(self):
+
+        """
+        Wait until the records queued so far are written.
+        """
+
+        future = Future()
+        self.queue.put((None,future))
+        return future.result()
+
+    def run(self):
+        batch = [] ; nrow = 0
+        deadline = None
+        while True:
+            timeout = None
+            if (deadline is not None):
+                timeout = max(deadline - time.time(),0.0)
+            try:
+                record, future = self.queue.get(timeout=timeout)
+            except Queue.Empty:
+                record, future = None, None
+            if (record is not None):
+                batch.append((record,future))
+                nrow += 1 + len(record["features"])
+                if (deadline is None): deadline = time.time() + self.flush_interval
+                if (nrow < self.batch_size): continue
+            self.write(batch)
+            batch = [] ; nrow = 0
+            deadline = None
+            if (future is not None) and (record is None):
+                # Flush or close request
+                future.set_result(None)
+                if (self.closed) and (self.queue.empty()): break
+
+    def write(self,batch):
+        if not (batch): return
+        try:
+            outputs = self.write_batch([record for record, future in batch])
+        except Exception, why:
+            LOG.error("Can not write %i record(s): %s",len(batch),why)
+            outputs = [why]*len(batch)
+        for (record, future), output in zip(batch,outputs):
+            if (isinstance(output,Exception)):
+                future.set_exception(output)
+            else:
+                future.set_result(output)
+
+    def write_batch(self,records):
+        raise NotImplementedError
+
+    def close(self):
+        if (self.closed): return
+        self.closed = True
+        self.flush()
+        self.thread.join()
+        self.close_output()
+
+    def close_output(self):
+        pass
+
+# Class to write the records into the OBSERVATIONS and FEATURES tables
+# of a sqlite database. The ids of a batch are assigned in the
+# transaction which writes it, so that several runs can share a database.
+class sqlite_sink(hfc_sink):
+
+    def __init__(self,db_file,**options):
+
+        self.db_file = db_file
+        # Transactions are handled by write_batch
+        self.conn = sqlite3.connect(db_file,check_same_thread=False,
+                                    isolation_level=None,timeout=60.0)
+        self.conn.text_factory = str
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SINK_SCHEMA)
+        self.columns = {}
+        for table in ["OBSERVATIONS","FEATURES"]:
+            rows = self.conn.execute("PRAGMA table_info(%s)" % (table)).fetchall()
+            self.columns[table] = [row[1] for row in rows]
+        hfc_sink.__init__(self,**options)
+
+    def write_batch(self,records):
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            id_observations = conn.execute("SELECT COALESCE(MAX(ID_OBSERVATIONS),0)+1 FROM OBSERVATIONS").fetchone()[0]
+            id_type_iii = conn.execute("SELECT COALESCE(MAX(ID_TYPE_III),0)+1 FROM FEATURES").fetchone()[0]
+            observations = [] ; features = [] ; outputs = []
+            for record in records:
+                observation, current_features = set_ids(record,id_observations,id_type_iii)
+                observations.append(observation)
+                features.append(current_features)
+                outputs.append({"ID_OBSERVATIONS":id_observations,
+                                "NFEATURES":len(current_features),
+                                "INIT_FILE":self.db_file,
+                                "FEAT_FILE":self.db_file if (len(current_features) > 0) else None})
+                id_observations += len(observation)
+                id_type_iii += len(current_features)
+            for table, tables in [("OBSERVATIONS",observations),("FEATURES",features)]:
+                columns = self.columns[table]
+                query = "INSERT INTO %s (%s) VALUES (%s)" % \
+                    (table,",".join(columns),",".join("?"*len(columns)))
+                for current_table in tables:
+                    if (len(current_table) == 0): continue
+                    conn.executemany(query,current_table.iterrows(columns))
+            conn.execute("COMMIT")
+        except:
+            conn.execute("ROLLBACK")
+            raise
+        LOG.info("%i observation(s) and %i feature(s) written into %s",
+                 sum([len(table) for table in observations]),
+                 sum([len(table) for table in features]),self.db_file)
+        return outputs
+
+    def close_output(self):
+        self.conn.close()
+
+# Class to write the records into the csv files of the previous versions
+# (one *_init.csv and one *_feat.csv file per data file).
+# The ids are numbered from first_id during the run.
+class csv_sink(hfc_sink):
+
+    def __init__(self,first_id=1,**options):
+
+        self.id_observations = first_id
+        self.id_type_iii = first_id
+        hfc_sink.__init__(self,**options)
+
+    def write_batch(self,records):
+        outputs = []
+        for record in records:
+            observation, features = set_ids(record,self.id_observations,self.id_type_iii)
+            output = {"ID_OBSERVATIONS":self.id_observations,
+                      "NFEATURES":len(features),
+                      "INIT_FILE":record["init_file"],"FEAT_FILE":None}
+            try:
+                if not (observation.write_csv(record["init_file"],fieldnames=OBSERVATIONS_FIELDS)):
+                    raise IOError("%s has not been written correctly!" % (record["init_file"]))
+                LOG.info("%s saved",record["init_file"])
+                if (len(features) > 0):
+                    if not (features.write_csv(record["feat_file"],fieldnames=FEATURES_FIELDS)):
+                        raise IOError("%s has not been written correctly!" % (record["feat_file"]))
+                    LOG.info("%s saved",record["feat_file"])
+                    output["FEAT_FILE"] = record["feat_file"]
+            except IOError, why:
+                outputs.append(why)
+                continue
+            self.id_observations += len(observation)
+            self.id_type_iii += len(features)
+            outputs.append(output)
+        return outputs
+
+# Method to open the output sink of a run:
+# a sqlite database if output is a .sqlite file, csv files otherwise.
+def open_sink(output=None,**options):
+    if (output is not None) and \
+        (os.path.splitext(output)[1].lower() in SQLITE_EXT):
+        return sqlite_sink(output,**options)
+    return csv_sink(**options)
@@ -0,0 +1,261 @@
+#! /usr/bin/env python
+# -*- coding: latin-1 -*-
+
+"""
+Python module providing a typed, column-oriented table for the
+OBSERVATIONS and FEATURES rows of the HFC (see hfc/prod/scripts/make_rabat3_hfc_db.sql).
+Each column is kept in a NumPy array which grows by doubling,
+integer and real columns being stored as numbers instead of strings.
+@author: X.Bonnin (LESIA)
+"""
+
+__author__="Xavier Bonnin"
+__date__="18-OCT-2026"
+__version__="1.00"
+
+import csv
+import numpy as np
+
+from frc_toolkit import csv_writer
+
+# Columns of the output tables
+OBSERVATIONS_COLUMNS = [("ID_OBSERVATIONS","integer primary key"),("OBSERVATORY_ID","integer"),
+                        ("DATE_OBS","text"),("DATE_END","text"),("JDINT","integer"),
+                        ("JDFRAC","real"),("C_ROTATION","integer"),("BSCALE","real"),
+                        ("BZERO","real"),("BITPIX","integer"),("EXP_TIME","real"),
+                        ("NAXIS1","integer"),("NAXIS2","integer"),("CDELT1","real"),
+                        ("CDELT2","real"),("R_SUN","real"),("CENTER_X","real"),
+                        ("CENTER_Y","real"),("QUALITY","text"),("FILENAME","text"),
+                        ("FILE_FORMAT","text"),("COMMENT","text"),("LOC_FILENAME","text"),
+                        ("URL","text"),("QCLK_FNAME","text"),("QCLK_URL","text")]
+
+FEATURES_COLUMNS = [("ID_TYPE_III","integer primary key"),("FRC_INFO_ID","integer"),
+                    ("OBSERVATIONS_ID","integer"),("CC_X_PIX","integer"),("CC_Y_PIX","integer"),
+                    ("CC_X_UTC","text"),("CC_Y_MHZ","real"),("CC","text"),("CC_LENGTH","integer"),
+                    ("SKE_CC_X_PIX","integer"),("SKE_CC_Y_PIX","integer"),("SKE_CC_X_UTC","text"),
+                    ("SKE_CC_Y_MHZ","real"),("SKE_CC","text"),("SKE_CC_LENGTH","integer"),
+                    ("BR_X0_PIX","integer"),("BR_Y0_PIX","integer"),("BR_X1_PIX","integer"),
+                    ("BR_Y1_PIX","integer"),("BR_X2_PIX","integer"),("BR_Y2_PIX","integer"),
+                    ("BR_X3_PIX","integer"),("BR_Y3_PIX","integer"),("BR_X0_UTC","text"),
+                    ("BR_Y0_MHZ","real"),("BR_X1_UTC","text"),("BR_Y1_MHZ","real"),
+                    ("BR_X2_UTC","text"),("BR_Y2_MHZ","real"),("BR_X3_UTC","text"),
+                    ("BR_Y3_MHZ","real"),("TIME_START","text"),("TIME_END","text"),
+                    ("FEAT_MAX_INT","real"),("FEAT_MEAN_INT","real"),("FIT_A0","real"),
+                    ("FIT_A1","real"),("DRIFT_START","real"),("DRIFT_END","real"),
+                    ("LVL_TRUST","real"),("MULTIPLE","integer"),("SNAPSHOT_FN","text"),
+                    ("SNAPSHOT_PATH","text"),("FEAT_FILENAME","text"),("HELIO_ID","text"),
+                    ("RUN_DATE","text")]
+
+OBSERVATIONS_FIELDS = [column[0] for column in OBSERVATIONS_COLUMNS]
+FEATURES_FIELDS = [column[0] for column in FEATURES_COLUMNS]
+
+# Value written for the missing values
+NULL_VALUE = "NULL"
+
+# Missing values of the integer columns
+INT_NULL = np.iinfo(np.int64).min
+
+# Number of rows allocated by a new table
+INITIAL_SIZE = 8
+
+# Method to return the NumPy type of a sqlite column type
+def get_type(column_type):
+    column_type = column_type.lower()
+    if ("int" in column_type): return np.int64
+    if ("real" in column_type): return np.float64
+    return object
+
+# Method to return the missing value of a NumPy type
+def get_null(dtype):
+    if (dtype is np.int64): return INT_NULL
+    if (dtype is np.float64): return np.nan
+    return None
+
+# Method to return the hh:mm:ss strings of decimal hours,
+# prefixed with the date day (YYYY-MM-DD), as done by waves.split_time.
+def get_times(day,float_time):
+    float_time = np.asarray(float_time,dtype=np.float64)
+    hour = float_time.astype(np.int64)
+    minute = ((float_time - hour)*60.0).astype(np.int64)
+    second = (float_time*3600.0 - hour*3600.0 - minute*60.0).astype(np.int64)
+    return ["%sT%02i:%02i:%02i" % (day,hh,mm,ss)
+            for hh,mm,ss in zip(hour.tolist(),minute.tolist(),second.tolist())]
+
+# Class to store the rows of a table in columns.
+# A column can be read and set as a NumPy array (table[name]),
+# missing values being INT_NULL, NaN or None.
+class hfc_table():
+
+    def __init__(self,columns,
+                 size=INITIAL_SIZE):
+
+        self.columns = list(columns)
+        self.names = [column[0] for column in self.columns]
+        self.types = [get_type(column[1]) for column in self.columns]
+        self.nrow = 0
+        self.size = max(size,1)
+        self.data = dict([(name,self.allocate(dtype,self.size))
+                          for name, dtype in zip(self.names,self.types)])
+
+    def allocate(self,dtype,size):
+        column = np.empty(size,dtype=dtype)
+        if (dtype is not object): column.fill(get_null(dtype))
+        return column
+
+    def reserve(self,nrow):
+
+        """
+        Make room for nrow more rows, doubling the size of the array
+        so that appending a row costs O(1) on average.
+        """
+
+        size = self.size
+        if (self.nrow + nrow <= size): return
+        while (size < self.nrow + nrow): size *= 2
+        for name, dtype in zip(self.names,self.types):
+            column = self.allocate(dtype,size)
+            column[:self.nrow] = self.data[name][:self.nrow]
+            self.data[name] = column
+        self.size = size
+
+    def __len__(self):
+        return self.nrow
+
+    def __getitem__(self,name):
+        return self.data[name.upper()][:self.nrow]
+
+    def __setitem__(self,name,values):
+        self.data[name.upper()][:self.nrow] = values
+
+    def get_column(self,name,values,nrow):
+        dtype = self.types[self.names.index(name)]
+        if (isinstance(values,basestring)) or (not hasattr(values,"__len__")):
+            values = [values]*nrow
+        elif (len(values) != nrow):
+            raise ValueError("Column %s has %i value(s) instead of %i" % (name,len(values),nrow))
+        if (dtype is object):
+            return [None if (value == NULL_VALUE) else value for value in values]
+        try:
+            # Columns without missing values are converted at once
+            return np.array(values,dtype=np.float64).astype(dtype)
+        except (ValueError,TypeError):
+            pass
+        values = np.array(values,dtype=object)
+        null = np.array([(value is None) or (value == NULL_VALUE) or (value == "")
+                         for value in values],dtype=bool)
+        if (null.any()): values[null] = np.nan
+        if (dtype is np.float64):
+            return values.astype(np.float64)
+        column = np.empty(nrow,dtype=np.int64)
+        column[:] = INT_NULL
+        column[~null] = values[~null].astype(np.float64).astype(np.int64)
+        return column
+
+    def extend(self,**columns):
+
+        """
+        Append several rows given column by column.
+        A column is a sequence, or a single value used for all of the rows.
+        Columns which are not given are missing.
+        """
+
+        nrow = None
+        for values in columns.values():
+            if (isinstance(values,basestring)) or (not hasattr(values,"__len__")): continue
+            nrow = len(values)
+            break
+        if (nrow is None): nrow = 1
+        if (nrow == 0): return 0
+        self.reserve(nrow)
+        for key, values in columns.items():
+            name = key.upper()
+            if (name not in self.names):
+                raise KeyError("Unknown column: %s" % (name))
+            self.data[name][self.nrow:self.nrow+nrow] = self.get_column(name,values,nrow)
+        self.nrow += nrow
+        return nrow
+
+    def append(self,**values):
+        return self.extend(**values)
+
+    def set_lengths(self,name,length_name):
+
+        """
+        Set a column to the lengths of the strings of another column
+        (e.g. CC_LENGTH from CC), missing strings having a length of 0.
+        """
+
+        self[length_name] = np.fromiter((len(value) if (value is not None) else 0
+                                         for value in self[name]),
+                                        dtype=np.int64,count=self.nrow)
+
+    def take(self,indices):
+
+        """
+        Return a new table with the given rows.
+        """
+
+        table = hfc_table(self.columns,size=len(indices))
+        for name in self.names:
+            table.data[name][:len(indices)] = self.data[name][:self.nrow][indices]
+        table.nrow = len(indices)
+        return table
+
+    def get_values(self,name):
+
+        """
+        Return the values of a column as a list,
+        missing values being None.
+        """
+
+        name = name.upper()
+        if (name not in self.names): return [None]*self.nrow
+        column = self.data[name][:self.nrow]
+        values = column.tolist()
+        dtype = self.types[self.names.index(name)]
+        if (dtype is np.float64):
+            for i in np.flatnonzero(np.isnan(column)): values[i] = None
+        elif (dtype is np.int64):
+            for i in np.flatnonzero(column == INT_NULL): values[i] = None
+        return values
+
+    def iterrows(self,names=None):
+
+        """
+        Yield the rows as tuples of the values of the given columns
+        (all of them by default), missing values being None.
+        """
+
+        if (names is None): names = self.names
+        return zip(*[self.get_values(name) for name in names]) if (self.nrow > 0) else []
+
+    def get_row(self,index):
+        return dict(zip(self.names,self.iterrows()[index]))
+
+    def write_csv(self,output_file,
+                  delimiter=';',quotechar='"',
+                  fieldnames=None):
+
+        """
+        Write the table in a csv file, with a header
+        (gzip compressed if output_file ends with .gz).
+        Missing values are written as NULL.
+        """
+
+        if (fieldnames is None): fieldnames = self.names
+        try:
+            with csv_writer(output_file,fieldnames=fieldnames,
+                            delimiter=delimiter,quotechar=quotechar) as writer:
+                writer.writerows([NULL_VALUE if (value is None) else value
+                                  for value in row]
+                                 for row in self.iterrows(fieldnames))
+        except (IOError,OSError,ValueError,csv.Error):
+            return False
+        return True
+
+# Methods to create empty observations and features tables
+def observations_table(size=1):
+    return hfc_table(OBSERVATIONS_COLUMNS,size=size)
+
+def features_table(size=INITIAL_SIZE):
+    return hfc_table(FEATURES_COLUMNS,size=size)
@@ -0,0 +1,298 @@
+#! /usr/bin/env python
+# -*- coding: latin-1 -*-
+
+"""
+Python module to keep the processing history of the data files
+in the PROCESSING_HISTORY table of a sqlite database
+(see hfc/prod/scripts/make_rabat3_hfc_db.sql).
+The status of the files are buffered and written by batches,
+and the files left to process are returned by a single query.
+@author: X.Bonnin (LESIA)
+"""
+
+__author__="Xavier Bonnin"
+__date__="18-OCT-2026"
+__version__="1.00"
+
+import os
+import errno
+import socket
+import time
+import threading
+import sqlite3
+from datetime import datetime
+import logging
+
+# Name of the history table
+HISTORY_TABLE = "PROCESSING_HISTORY"
+
+# Processing status
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+STATUS = [QUEUED,RUNNING,DONE,FAILED]
+
+# Columns of the history table which can be updated
+HISTORY_FIELDS = ["OBSERVAT_ID","FRC_INFO_ID","DATE_OBS","FILE_ID",
+                  "INIT_FILE","FEAT_FILE","FEAT_RUN_DATE","STATUS","COMMENT","RUN_ID"]
+
+HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS `PROCESSING_HISTORY` (
+  `ID` integer primary key,
+  `OBSERVAT_ID` integer,
+  `FRC_INFO_ID` integer,
+  `DATE_OBS` text,
+  `FILE_ID` text,
+  `INIT_FILE` text,
+  `FEAT_FILE` text,
+  `FEAT_RUN_DATE` text,
+  `STATUS`  text,
+  `COMMENT` text,
+  `RUN_ID` text
+);
+CREATE UNIQUE INDEX IF NOT EXISTS `IDX_HISTORY_FILE_ID` ON `PROCESSING_HISTORY` (`FILE_ID`);
+CREATE INDEX IF NOT EXISTS `IDX_HISTORY_DATE_OBS` ON `PROCESSING_HISTORY` (`DATE_OBS`);
+"""
+
+# Default number of buffered updates, and maximal time (sec.) between two writes
+BATCH_SIZE = 100
+FLUSH_INTERVAL = 5.0
+
+# Date and time format of the history
+HISTORY_TFORMAT = "%Y-%m-%dT%H:%M:%S"
+
+# Extensions of the sqlite history files
+SQLITE_EXT = [".db",".sqlite",".sqlite3"]
+
+LOG = logging.getLogger("history_store")
+
+# Method to return the id of a data file in the history
+def get_file_id(filename):
+    return os.path.basename(filename.strip())
+
+# Method to return the id of the current run (hostname:pid),
+# saved with the status of the files it processes
+def get_run_id():
+    return "%s:%i" % (socket.gethostname(),os.getpid())
+
+# Method to check if the run which has set the status of a file
+# is over. The runs of other hosts can not be checked, and are assumed alive.
+def is_run_over(run_id):
+    if not (run_id): return True
+    hostname, sep, pid = run_id.rpartition(":")
+    if (hostname != socket.gethostname()): return False
+    try:
+        pid = int(pid)
+    except ValueError:
+        return True
+    if (pid == os.getpid()): return True
+    try:
+        os.kill(pid,0)
+    except OSError, why:
+        return (why.errno == errno.ESRCH)
+    return False
+
+# Class to read/write the processing history of the data files.
+# The methods can be called from several threads.
+class history_store():
+
+    def __init__(self,db_file,
+                 batch_size=BATCH_SIZE,
+                 flush_interval=FLUSH_INTERVAL):
+
+        self.db_file = db_file
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending = {}
+        self.last_flush = time.time()
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(db_file,check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        # The readers are not blocked by the writes in WAL mode
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(HISTORY_SCHEMA)
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(%s)" % (HISTORY_TABLE))]
+        if ("RUN_ID" not in columns):
+            # History created by a previous version
+            self.conn.execute("ALTER TABLE %s ADD COLUMN RUN_ID text" % (HISTORY_TABLE))
+        self.conn.commit()
+        self.run_id = get_run_id()
+
+    def set_status(self,filename,status,
+                   flush=False,
+                   **fields):
+
+        """
+        Set the processing status of a data file,
+        with other columns of the history table
+        (e.g., date_obs, init_file, feat_file, comment).
+        Columns set to None are not updated, except the comment
+        which is cleared when a file is done.
+        The update is written with the next batch.
+        """
+
+        if (status not in STATUS):
+            raise ValueError("Unknown processing status: %s" % (status))
+        row = {"FILE_ID":get_file_id(filename),"STATUS":status,"RUN_ID":self.run_id}
+        if (status in (DONE,FAILED)):
+            row["FEAT_RUN_DATE"] = datetime.today().strftime(HISTORY_TFORMAT)
+        if (status == DONE):
+            row["COMMENT"] = None
+        for key, value in fields.items():
+            key = key.upper()
+            if (key not in HISTORY_FIELDS):
+                raise ValueError("Unknown history field: %s" % (key))
+            if (value is None): continue
+            if (isinstance(value,datetime)): value = value.strftime(HISTORY_TFORMAT)
+            row[key] = value
+
+        with self.lock:
+            previous = self.pending.get(row["FILE_ID"])
+            if (previous is not None):
+                previous.update(row)
+            else:
+                self.pending[row["FILE_ID"]] = row
+            if (flush) or (len(self.pending) >= self.batch_size) or \
+                (time.time() - self.last_flush >= self.flush_interval):
+                self.flush()
+
+    def flush(self):
+
+        """
+        Write the buffered updates in a single transaction.
+        """
+
+        with self.lock:
+            rows = self.pending.values()
+            self.pending = {}
+            self.last_flush = time.time()
+            if not (rows): return 0
+            # Rows are grouped by set of columns to update them with executemany
+            groups = {}
+            for row in rows:
+                groups.setdefault(tuple(sorted(row.keys())),[]).append(row)
+            with self.conn:
+                self.conn.executemany("INSERT OR IGNORE INTO %s (FILE_ID) VALUES (?)" % (HISTORY_TABLE),
+                                      [(row["FILE_ID"],) for row in rows])
+                for keys, group in groups.items():
+                    columns = [key for key in keys if (key != "FILE_ID")]
+                    query = "UPDATE %s SET %s WHERE FILE_ID=?" % \
+                        (HISTORY_TABLE,",".join(["%s=?" % (key) for key in columns]))
+                    self.conn.executemany(query,[[row[key] for key in columns] + [row["FILE_ID"]]
+                                                 for row in group])
+        return len(rows)
+
+    def get_unprocessed(self,fileList,
+                        status=[DONE]):
+
+        """
+        Return the lists of the processed and unprocessed files
+        of fileList (in the same order), a file being processed
+        if its status is in status.
+        """
+
+        self.flush()
+        with self.lock:
+            with self.conn:
+                self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS CANDIDATES "
+                                  "(RANK integer primary key, FILE_ID text)")
+                self.conn.execute("DELETE FROM CANDIDATES")
+                self.conn.executemany("INSERT INTO CANDIDATES (RANK,FILE_ID) VALUES (?,?)",
+                                      [(i,get_file_id(current_file))
+                                       for i,current_file in enumerate(fileList)])
+                query = "SELECT C.RANK FROM CANDIDATES C JOIN %s H ON H.FILE_ID=C.FILE_ID " \
+                    "WHERE H.STATUS IN (%s)" % (HISTORY_TABLE,",".join("?"*len(status)))
+                ranks = set([row[0] for row in self.conn.execute(query,status)])
+                self.conn.execute("DELETE FROM CANDIDATES")
+
+        processed = [] ; unprocessed = []
+        for i,current_file in enumerate(fileList):
+            if (i in ranks):
+                processed.append(current_file)
+            else:
+                unprocessed.append(current_file)
+        return processed, unprocessed
+
+    def get_status(self,filename):
+        self.flush()
+        with self.lock:
+            row = self.conn.execute("SELECT STATUS FROM %s WHERE FILE_ID=?" % (HISTORY_TABLE),
+                                    (get_file_id(filename),)).fetchone()
+        if (row is None): return None
+        return row[0]
+
+    def count(self):
+
+        """
+        Return the number of files for each status.
+        """
+
+        self.flush()
+        with self.lock:
+            rows = self.conn.execute("SELECT STATUS, COUNT(*) FROM %s GROUP BY STATUS" %
+                                     (HISTORY_TABLE)).fetchall()
+        return dict([(row[0],row[1]) for row in rows])
+
+    def reset(self,status=[QUEUED,RUNNING]):
+
+        """
+        Set the files left with a given status by an interrupted run
+        to failed, and return their number.
+        The files of the runs which are still running (on this host,
+        or on another host sharing the history) are not changed.
+        """
+
+        self.flush()
+        with self.lock:
+            with self.conn:
+                rows = self.conn.execute("SELECT FILE_ID, RUN_ID FROM %s WHERE STATUS IN (%s)" %
+                                         (HISTORY_TABLE,",".join("?"*len(status))),
+                                         list(status)).fetchall()
+                interrupted = [(FAILED,"Interrupted run",row[0]) for row in rows
+                               if (is_run_over(row[1]))]
+                self.conn.executemany("UPDATE %s SET STATUS=?, COMMENT=? WHERE FILE_ID=?" %
+                                      (HISTORY_TABLE),interrupted)
+        return len(interrupted)
+
+    def import_history_file(self,history_file):
+
+        """
+        Import a flat history file (one processed data file per line),
+        as written by the previous versions of the launcher.
+        """
+
+        if not (os.path.isfile(history_file)):
+            LOG.warning("%s does not exist!",history_file)
+            return 0
+        with open(history_file) as fr:
+            fileList = [line.strip() for line in fr if (line.strip())]
+        for current_file in fileList:
+            self.set_status(current_file,DONE,comment="Imported from %s" % (os.path.basename(history_file)))
+        self.flush()
+        LOG.info("%i file(s) imported from %s",len(fileList),history_file)
+        return len(fileList)
+
+    def close(self):
+        self.flush()
+        with self.lock:
+            self.conn.close()
+
+# Method to open the history of a run.
+# A flat history file is imported into a sqlite database of the same name
+# (e.g., rabat3.history -> rabat3.sqlite), at the first run only.
+# The flat history file of the same name is also imported when
+# a new sqlite database is given (e.g., rabat3.sqlite <- rabat3.history).
+def open_history(history_file,**options):
+    basename, extension = os.path.splitext(history_file)
+    if (extension.lower() in SQLITE_EXT):
+        db_file = history_file
+        history_file = basename + ".history"
+    else:
+        db_file = basename + ".sqlite"
+    new_db = not (os.path.isfile(db_file))
+    store = history_store(db_file,**options)
+    if (new_db) and (os.path.isfile(history_file)):
+        store.import_history_file(history_file)
+    return store
@@ -4,31 +4,193 @@ import sys, os
 import PIL
 import numpy as np
 from scipy import ndimage, misc
+from scipy import sparse as sparse_matrix
 from copy import copy
 
+from quantile import histogram_quantile
+
 
 def poly_area(x,y):
 
     """
     Method to compute the area of an irregular, closed, convex polygon.
-    The x and y vectors are the vertices ; the last should equal the first.
+    The x and y vectors are the vertices ; the polygon is closed
+    on its first vertex if the last one differs (the inputs are not modified).
+    (see hfc_geometry to compute the areas of several contours at once)
     Author: Xavier Bonnin (LESIA)
     """
 
-    # Must be a closed area
-    if (x[-1] != x[0]) or (y[-1] != y[0]):
-        x.append(x[0])
-        y.append(y[0])
+    x = np.asarray(x,dtype=np.float64)
+    y = np.asarray(y,dtype=np.float64)
+    area = np.sum(x*np.roll(y,-1) - np.roll(x,-1)*y)*0.5
 
+    return abs(area)
 
-    area = 0.0
-    nx = len(x)
-    for i,x_i in enumerate(x):
-        if (i == nx-1): break
-        area += (x_i*y[i+1] - x[i+1]*y[i])*0.5
 
-    return abs(area)
+# Chain code directions: code -> [dX,dY]
+CC_DIRECTIONS = np.array([[-1,0],[-1,-1],[0,-1],[1,-1],[1,0],[1,1],[0,1],[-1,1]])
+CC_CHARS = "01234567"
+
+# Order in which the neighbours are searched when tracing a contour:
+# from code 0 backwards for the first pixel, then starting
+# three codes after the last move (the previous pixel is searched last).
+def get_search_order(last_code=None):
+    if (last_code is None): return [0,7,6,5,4,3,2,1]
+    return [(last_code + 3 - k) % 8 for k in range(8)]
+
+# Lookup table giving the next code of the contour from the last code
+# (8 for the first pixel) and the 8 bits of the neighbours of the current
+# pixel which belong to the feature (bit k set if the neighbour in the
+# direction of code k does). -1 if the pixel has no neighbour.
+def make_next_code_table():
+    table = []
+    for last_code in range(9):
+        order = get_search_order(last_code if (last_code < 8) else None)
+        current_table = []
+        for bits in range(256):
+            code = -1
+            for k in order:
+                if (bits >> k) & 1:
+                    code = k
+                    break
+            current_table.append(code)
+        table.append(current_table)
+    return table
+
+CC_NEXT_CODE = make_next_code_table()
+
+def get_neighbour_bits(label_image):
+
+    """
+    Method to compute, for each pixel of a label image padded with a
+    border of one pixel, the 8 bits of its neighbours which have the
+    same label (see CC_NEXT_CODE). Background pixels have no bit set.
+    Author: Xavier Bonnin (LESIA)
+    """
 
+    nX = label_image.shape[0] ; nY = label_image.shape[1]
+    padded = np.zeros((nX+2,nY+2),dtype=label_image.dtype)
+    padded[1:-1,1:-1] = label_image
+    inner = padded[1:-1,1:-1]
+    bits = np.zeros((nX+2,nY+2),dtype=np.uint8)
+    for code,(dx,dy) in enumerate(CC_DIRECTIONS):
+        neighbour = padded[1+dx:nX+1+dx,1+dy:nY+1+dy]
+        bits[1:-1,1:-1] |= ((neighbour == inner).astype(np.uint8) << code)
+    bits[1:-1,1:-1][inner == 0] = 0
+    return bits
+
+def get_start_pixels(label_image,index):
+
+    """
+    Method to return the starting pixels [X,Y] of the contours of
+    the features of a label image, i.e. the leftmost-uppermost pixel
+    (minimal X, then maximal Y) of each label of index.
+    Labels which are not on the image have a starting pixel [-1,-1].
+    Author: Xavier Bonnin (LESIA)
+    """
+
+    nY = label_image.shape[1]
+    x, y = np.nonzero(label_image)
+    labels = label_image[x,y]
+    # Pixels sorted by label, then X, then decreasing Y
+    order = np.lexsort((-y,x,labels))
+    labels = labels[order]
+    first = np.searchsorted(labels,index)
+    found = (first < len(labels))
+    found[found] = (labels[first[found]] == np.asarray(index)[found])
+    start_pix = np.zeros((len(index),2),dtype=np.int64) - 1
+    start_pix[found,0] = x[order[first[found]]]
+    start_pix[found,1] = y[order[first[found]]]
+    return start_pix
+
+def image2chains(label_image,index=None,
+                 fill=False,
+                 remove_isolated_pixels=False,
+                 verbose=True):
+
+    """
+    Method to compute the chain codes of the contours of all of the
+    features of a label image (e.g., from ndimage.label) in one pass.
+    Inputs:
+      label_image - 2d numpy array of integer labels (0 is background)
+      index       - list of the labels to trace (all labels > 0 by default)
+    Outputs:
+      chaincodes, start_pix - list of the chain code strings of the
+                              features' contours, and array [n,2] of the
+                              locations [X,Y] of their starting pixels.
+    A feature of a single pixel has an empty chain code, and a label
+    which is not on the image an empty chain code and a starting pixel [-1,-1].
+    Author: Xavier Bonnin (LESIA)
+    """
+
+    label_image = np.asarray(label_image)
+    if (label_image.ndim != 2):
+        if (verbose): print "Error: input array must have 2 dimensions!"
+        return [], np.zeros((0,2),dtype=np.int64)
+    if (index is None):
+        index = np.unique(label_image[label_image > 0])
+    index = np.atleast_1d(np.asarray(index,dtype=label_image.dtype))
+
+    if (remove_isolated_pixels) or (fill):
+        label_image = clean_labels(label_image,index,fill=fill,
+                                   remove_isolated_pixels=remove_isolated_pixels)
+
+    nY = label_image.shape[1] + 2
+    bits = get_neighbour_bits(label_image).ravel().tolist()
+    start_pix = get_start_pixels(label_image,index)
+    offsets = [int(dx)*nY + int(dy) for dx,dy in CC_DIRECTIONS]
+    next_code = CC_NEXT_CODE
+    max_iter = len(bits)
+
+    chaincodes = []
+    for i in range(len(index)):
+        if (start_pix[i,0] < 0):
+            chaincodes.append("")
+            continue
+        start = (int(start_pix[i,0])+1)*nY + int(start_pix[i,1])+1
+        pos = start ; last_code = 8
+        codes = []
+        while (True):
+            code = next_code[last_code][bits[pos]]
+            if (code < 0): break
+            codes.append(CC_CHARS[code])
+            pos += offsets[code]
+            last_code = code
+            # if return to starting pixel, then stop
+            if (pos == start): break
+            if (len(codes) > max_iter):
+                if (verbose): print "Error: can not compute chain code!"
+                codes = []
+                break
+        chaincodes.append("".join(codes))
+
+    return chaincodes, start_pix
+
+def clean_labels(label_image,index,
+                 fill=False,
+                 remove_isolated_pixels=False):
+
+    """
+    Method to apply closerec and/or fill_holes on each feature
+    of a label image, within its bounding box.
+    Author: Xavier Bonnin (LESIA)
+    """
+
+    if (remove_isolated_pixels) and not (fill):
+        return closerec_labels(label_image,index)
+    label_image = label_image.copy()
+    slices = ndimage.find_objects(label_image)
+    for label in index:
+        if (label < 1) or (label > len(slices)) or (slices[label-1] is None): continue
+        # Bounding box with a margin for the filled pixels
+        current_slice = tuple([slice(max(sl.start-1,0),sl.stop+1) for sl in slices[label-1]])
+        crop = label_image[current_slice]
+        mask = (crop == label)
+        if (remove_isolated_pixels): mask = closerec(mask)
+        if (fill): mask = fill_holes(mask)
+        crop[(crop == label) & ~mask] = 0
+        crop[mask & (crop == 0)] = label
+    return label_image
 
 def image2chain(image,pixel_value,
                 fill=False,
@@ -45,60 +207,84 @@ def image2chain(image,pixel_value,
       chaincode, locations - String containing the chain code
                              of the feature's contour,
                              and locations [X,Y] of the contour's pixels
+    (see image2chains to trace all of the features of an image at once)
     Author: Xavier Bonnin (LESIA)
     """
 
-    ardir = np.array([[-1,0],[-1,1],[0,1],[1,1],[1,0],[1,-1],[0,-1],[-1,-1]])
-    ccdir = np.array([0,7,6,5,4,3,2,1])
-    
     if (image.ndim != 2):
         print "Error: input array must have 2 dimensions!"
         return "",[]
 
-    nX = image.shape[0] ; nY = image.shape[1]
-    n = nX*nY
     mask = (image == pixel_value)
+    if not (mask.any()): return "",[]
 
-    if (remove_isolated_pixels): mask = closerec(mask)
-    if (fill): mask = fill_holes(mask)
-
-    # Find location of the starting pixel [X,Y]
-    # It must be the leftmost-uppermost pixel belonging to the feature
-    indices = np.where(mask)
-    cc_x_pix = min(indices[0])
-    cc_y_pix = max(indices[1][np.where(indices[0] == cc_x_pix)])
-
-    chaincode="" ; locations = []
-    xpix = int(cc_x_pix) ; ypix = int(cc_y_pix)
-    loop = True ; niter=0
-    while (loop):
-        for i,direction in enumerate(ardir):
-            x = xpix + direction[0] ; y = ypix + direction[1]
-            current_ccdir = ccdir[i]
-            if (mask[x,y]): break
-        chaincode += str(current_ccdir)
-        locations.append([xpix,ypix]) 
-        # if return to starting pixel, then stop
-        if ([x,y] == [cc_x_pix,cc_y_pix]): 
-            locations.append([x,y])
-            loop=False
-        # assign new pixel position
-        xpix = x ; ypix = y
-        # rotate direction vector
-        ishift = int(np.where(ccdir == (int(current_ccdir)+4)%8)[0])
-        ardir = np.roll(ardir,7-ishift,axis=0) ; ccdir = np.roll(ccdir,7-ishift)
-        niter+=1
-        if (niter > n): 
-            if (verbose): print "Error: can not compute chain code!"
-            return "",[]
-    
+    chaincodes, start_pix = image2chains(mask.astype(np.int32),index=[1],
+                                         fill=fill,
+                                         remove_isolated_pixels=remove_isolated_pixels,
+                                         verbose=verbose)
+    chaincode = chaincodes[0]
+    if (start_pix[0,0] < 0): return "",[]
+    X, Y = chain2image(chaincode,start_pix[0].tolist())
+    locations = [[int(x),int(y)] for x,y in zip(X,Y)]
     return chaincode, locations
 
+# Lookup table of the chain code characters: ascii code -> [dX,dY]
+# (characters which are not chain codes are flagged by CC_INVALID)
+CC_INVALID = 127
+CC_LOOKUP_X = np.zeros(256,dtype=np.int8) + CC_INVALID
+CC_LOOKUP_Y = np.zeros(256,dtype=np.int8)
+CC_LOOKUP_X[np.frombuffer(CC_CHARS,dtype=np.uint8)] = CC_DIRECTIONS[:,0]
+CC_LOOKUP_Y[np.frombuffer(CC_CHARS,dtype=np.uint8)] = CC_DIRECTIONS[:,1]
+
+def decode_chains(chaincodes,start_pix):
+
+    """
+    Method to compute the pixel contours of several chain codes at once.
+    Inputs:
+      chaincodes - list of chain code strings
+      start_pix  - array [n,2] of the starting pixel locations [X,Y]
+    Outputs:
+      X, Y, offsets - arrays of the locations of the contours' pixels,
+                      the contour of the i-th chain code being
+                      X[offsets[i]:offsets[i+1]], Y[offsets[i]:offsets[i+1]]
+                      (starting pixel included).
+    Raises ValueError if a chain code is not valid.
+    Author: Xavier Bonnin (LESIA)
+    """
+
+    start_pix = np.asarray(start_pix,dtype=np.int64).reshape(-1,2)
+    if (len(chaincodes) != len(start_pix)):
+        raise ValueError("chaincodes and start_pix must have the same length!")
+    lengths = np.array([len(chaincode) for chaincode in chaincodes],dtype=np.int64)
+    steps = np.frombuffer("".join(chaincodes),dtype=np.uint8)
+    dX = CC_LOOKUP_X[steps].astype(np.int64)
+    if (dX == CC_INVALID).any():
+        raise ValueError("Wrong chain code format!")
+    dY = CC_LOOKUP_Y[steps].astype(np.int64)
+
+    # Each contour has its starting pixel followed by one pixel per step
+    npoints = lengths + 1
+    offsets = np.zeros(len(npoints)+1,dtype=np.int64)
+    np.cumsum(npoints,out=offsets[1:])
+    first = offsets[:-1]
+    X = np.ones(offsets[-1],dtype=np.int64)
+    Y = np.ones(offsets[-1],dtype=np.int64)
+    is_step = np.ones(offsets[-1],dtype=bool)
+    is_step[first] = False
+    X[is_step] = dX ; Y[is_step] = dY
+    # The starting pixel of a contour resets the cumulative sum
+    X[first] = 0 ; Y[first] = 0
+    X = np.cumsum(X) ; Y = np.cumsum(Y)
+    X += np.repeat(start_pix[:,0] - X[first],npoints)
+    Y += np.repeat(start_pix[:,1] - Y[first],npoints)
+    return X, Y, offsets
+
 def chain2image(chaincode,start_pix):
 
     """
     Method to compute the pixel contour providing the chain code string
     and the starting pixel location [X,Y].
+    (see decode_chains to decode several chain codes at once)
     Author: Xavier Bonnin (LESIA)
     """
     
@@ -110,45 +296,195 @@ def chain2image(chaincode,start_pix):
         print "Second input argument must be a 2-elements vector!"
         return None
 
-    ardir = np.array([[-1,0],[-1,1],[0,1],[1,1],[1,0],[1,-1],[0,-1],[-1,-1]])
-    ccdir = np.array([0,7,6,5,4,3,2,1])
-
-    X=[start_pix[0]]
-    Y=[start_pix[1]]
-    for c in chaincode:
-        if (abs(np.int8(c)) > 7):
-            print "Wrong chain code format!"
-            return None
-        wc = np.where(np.int8(c) == np.int8(ccdir))[0]
-        X.append(X[-1] + np.int(ardir[wc,0]))
-        Y.append(Y[-1] + np.int(ardir[wc,1]))
-    return X,Y
-        
+    try:
+        X, Y, offsets = decode_chains([chaincode],[start_pix])
+    except ValueError:
+        print "Wrong chain code format!"
+        return None
+    return X.tolist(),Y.tolist()
+
+def chains2image(chaincodes,start_pix,shape,
+                 labels=None,
+                 fill=False,
+                 sparse=False):
+
+    """
+    Method to rasterize the contours of several chain codes
+    into one label image.
+    Inputs:
+      chaincodes - list of chain code strings
+      start_pix  - array [n,2] of the starting pixel locations [X,Y]
+      shape      - shape of the output image
+      labels     - label of each contour (1 to n by default)
+      fill       - if True, the contours are filled (see fill_holes)
+      sparse     - if True, a scipy.sparse csr matrix is returned
+                   instead of a 2d numpy array
+    Pixels outside of the image are ignored; where contours overlap,
+    the label of the last one is kept.
+    Author: Xavier Bonnin (LESIA)
+    """
+
+    if (labels is None): labels = np.arange(1,len(chaincodes)+1)
+    labels = np.asarray(labels,dtype=np.int32)
+    X, Y, offsets = decode_chains(chaincodes,start_pix)
+    L = np.repeat(labels,np.diff(offsets))
+
+    if (fill) and (len(X) > 0):
+        # Each contour is filled within its bounding box
+        first = offsets[:-1]
+        xmin = np.minimum.reduceat(X,first) ; xmax = np.maximum.reduceat(X,first)
+        ymin = np.minimum.reduceat(Y,first) ; ymax = np.maximum.reduceat(Y,first)
+        filled = []
+        for i,label in enumerate(labels):
+            box = np.zeros((xmax[i]-xmin[i]+1,ymax[i]-ymin[i]+1),dtype=bool)
+            box[X[offsets[i]:offsets[i+1]]-xmin[i],Y[offsets[i]:offsets[i+1]]-ymin[i]] = True
+            box_x, box_y = np.nonzero(fill_holes(box))
+            filled.append((box_x + xmin[i],box_y + ymin[i],np.zeros(len(box_x),dtype=np.int32) + label))
+        X = np.concatenate([item[0] for item in filled])
+        Y = np.concatenate([item[1] for item in filled])
+        L = np.concatenate([item[2] for item in filled])
+
+    inside = (X >= 0) & (X < shape[0]) & (Y >= 0) & (Y < shape[1])
+    X = X[inside] ; Y = Y[inside] ; L = L[inside]
+
+    if (sparse):
+        # Only the last label of a pixel is kept
+        flat = X*shape[1] + Y
+        unique_flat, last = np.unique(flat[::-1],return_index=True)
+        last = len(flat) - 1 - last
+        return sparse_matrix.csr_matrix((L[last],(X[last],Y[last])),shape=shape)
+
+    image = np.zeros(shape,dtype=np.int32)
+    image[X,Y] = L
+    return image
+
+# Method to return the distance metric equivalent to repeated
+# erosions with a structuring element (None if there is not any)
+def get_erosion_metric(structure=None):
+    if (structure is None): return "taxicab"
+    structure = np.asarray(structure,dtype=bool)
+    if (np.array_equal(structure,ndimage.generate_binary_structure(2,1))): return "taxicab"
+    if (np.array_equal(structure,ndimage.generate_binary_structure(2,2))): return "chessboard"
+    return None
+
+# Method to return, for each pixel of a binary image, the number of
+# erosions that it survives plus one (0 for the background pixels),
+# the pixels outside of the image being background as in binary_erosion.
+def get_erosion_depth(binary_image,metric):
+    padded = np.pad(binary_image,1,mode="constant")
+    depth = ndimage.distance_transform_cdt(padded,metric=metric)
+    return depth[1:-1,1:-1]
+
+# Method to check if a structuring element is symmetric
+# (required to reconstruct with ndimage.label)
+def is_symmetric(structure=None):
+    if (structure is None): return True
+    structure = np.asarray(structure,dtype=bool)
+    return np.array_equal(structure,structure[::-1,::-1])
 
 def closerec(image,open_structure=None,close_structure=None):
 
     """
-    Method to apply a closing reconstruction operator on the input binary image
+    Method to apply a closing reconstruction operator on the input binary image:
+    the last non-empty erosion of the image is propagated back into it.
+    The erosions are computed at once with a distance transform
+    for the 4- and 8-connected structuring elements.
+    (see closerec_labels to apply it on each feature of a label image)
     """
     
-    # Multiple erosion operations
     if not (isinstance(image[0,0],np.bool_)):
         binary_image = image > 0
     else:
         binary_image = image.copy()
-    
-    current_image1 = binary_image.copy()
-    while (True in current_image1):
-        current_image0 = current_image1.copy()
-        current_image1 = ndimage.morphology.binary_erosion(current_image0,
-                                              structure=open_structure)
-            
-    # Multiple dilatation operations
-    reconstruct_image = ndimage.morphology.binary_propagation(
-        current_image0,structure=close_structure,mask=binary_image)
-        
-    return reconstruct_image
+    if not (binary_image.any()): return binary_image
+
+    metric = get_erosion_metric(open_structure)
+    if (metric is None):
+        # Multiple erosion operations
+        current_image1 = binary_image.copy()
+        while (True in current_image1):
+            current_image0 = current_image1.copy()
+            current_image1 = ndimage.morphology.binary_erosion(current_image0,
+                                                  structure=open_structure)
+    else:
+        depth = get_erosion_depth(binary_image,metric)
+        current_image0 = (depth == depth.max())
+
+    if not (is_symmetric(close_structure)):
+        # Multiple dilatation operations
+        return ndimage.morphology.binary_propagation(
+            current_image0,structure=close_structure,mask=binary_image)
+
+    # Keep the connected parts of the image which contain the last erosion
+    components, ncomponent = ndimage.label(binary_image,structure=close_structure)
+    kept = np.zeros(ncomponent+1,dtype=bool)
+    kept[components[current_image0]] = True
+    kept[0] = False
+    return kept[components]
+
+# Method to check if features of a label image touch each other
+# (i.e. if two 8-connected pixels have different non-zero labels)
+def labels_touch(label_image):
+    for first, second in [(label_image[:-1,:],label_image[1:,:]),
+                          (label_image[:,:-1],label_image[:,1:]),
+                          (label_image[:-1,:-1],label_image[1:,1:]),
+                          (label_image[:-1,1:],label_image[1:,:-1])]:
+        if ((first != second) & (first > 0) & (second > 0)).any(): return True
+    return False
+
+def closerec_labels(label_image,index=None,
+                    open_structure=None,close_structure=None):
+
+    """
+    Method to apply closerec on each feature of a label image.
+    Inputs:
+      label_image - 2d numpy array of labels (0 for the background)
+      index       - labels of the features to process (all by default)
+    Outputs:
+      label_image - copy of the input label image where the pixels
+                    removed by closerec are set to 0.
+    If the features do not touch each other, the erosions and the
+    reconstruction of all of them are computed in one pass over the image,
+    otherwise closerec is applied within the bounding box of each feature.
+    Author: Xavier Bonnin (LESIA)
+    """
 
+    label_image = np.asarray(label_image)
+    if (index is None):
+        index = np.unique(label_image[label_image > 0])
+    index = np.asarray(index,dtype=np.int64).reshape(-1)
+    index = index[(index > 0) & (index <= label_image.max())]
+    cleaned_image = label_image.copy()
+    if (len(index) == 0): return cleaned_image
+
+    metric = get_erosion_metric(open_structure)
+    if (metric is None) or (not is_symmetric(close_structure)) or \
+        (labels_touch(label_image)):
+        slices = ndimage.find_objects(label_image)
+        for label in index:
+            if (slices[label-1] is None): continue
+            current_slice = tuple([slice(max(sl.start-1,0),sl.stop+1) for sl in slices[label-1]])
+            crop = cleaned_image[current_slice]
+            mask = (crop == label)
+            crop[mask & ~closerec(mask,open_structure=open_structure,
+                                  close_structure=close_structure)] = 0
+        return cleaned_image
+
+    selected = np.zeros(label_image.max()+1,dtype=bool)
+    selected[index] = True
+    binary_image = selected[label_image]
+    depth = get_erosion_depth(binary_image,metric)
+    # Last non-empty erosion of each feature
+    max_depth = np.zeros(label_image.max()+1,dtype=depth.dtype)
+    max_depth[index] = ndimage.maximum(depth,labels=label_image,index=index)
+    last_erosion = binary_image & (depth == max_depth[label_image])
+    # Features do not touch, so the connected parts belong to one feature
+    components, ncomponent = ndimage.label(binary_image,structure=close_structure)
+    kept = np.zeros(ncomponent+1,dtype=bool)
+    kept[components[last_erosion]] = True
+    kept[0] = True
+    cleaned_image[binary_image & ~kept[components]] = 0
+    return cleaned_image
 
 def fill_holes(image,structure=None):
 
@@ -167,39 +503,21 @@ def fill_holes(image,structure=None):
     return filled_image
 
 # Module to adjust automatically the contrast of an image using
-# the histogram of its pixel's values.
+# the histogram of its pixel's values (see quantile.histogram_quantile).
 def auto_contrast(image,low=0.02,high=0.99):
 
     max_val = np.max(image)
     min_val = np.min(image)
     imb = misc.bytescale(image)
-    xh = np.array(range(257))
-    histo = np.histogram(imb,bins=xh)
-    xh = histo[1][0:-1]
-    yh = histo[0]
-    #    plot(xh,yh)
-    #    show()
-    yhtot = np.sum(yh)
-
-    # Get mininmum level
-    yh_i = 0.0 ; i=0
-    if (low <= 0.0):
-        lev_min = min_val
-    else:
-        while (yh_i < low*yhtot):
-            yh_i += yh[i]
-            i += 1
-        lev_min = (max_val - min_val)*(float(xh[i-1])/255.0) + min_val
-
-    # Get maximum level
-    yh_i = 0.0 ; i=0
-    if (high >= 1.0):
-        lev_max = max_val
-    else:
-        while (yh_i < high*yhtot):
-            yh_i += yh[i]
-            i += 1
-        lev_max = (max_val - min_val)*(float(xh[i-1])/255.0) + min_val   
+    xh = np.arange(256)
+    yh = np.bincount(imb.ravel(),minlength=256)
+
+    # Get minimum and maximum levels
+    lev_min, lev_max = histogram_quantile(yh,xh,[low,high])
+    lev_min = (max_val - min_val)*(float(lev_min)/255.0) + min_val
+    lev_max = (max_val - min_val)*(float(lev_max)/255.0) + min_val
+    if (low <= 0.0): lev_min = min_val
+    if (high >= 1.0): lev_max = max_val
     
     il = np.where(image <= lev_min)
     image[il] = lev_min
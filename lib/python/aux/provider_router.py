@@ -0,0 +1,246 @@
+#! /usr/bin/env python
+# -*- coding: latin-1 -*-
+
+"""
+Python module to download a file from the fastest available mirror.
+The latency and the throughput of each host are measured on the
+transfers, and the hosts which keep failing are put aside for a while
+(circuit breaker). Failed rounds are retried with an exponential backoff.
+@author: X.Bonnin (LESIA)
+"""
+
+__author__="Xavier Bonnin"
+__date__="18-OCT-2026"
+__version__="1.00"
+
+import os
+import time, random
+import threading
+import logging
+
+from download_manager import fetch_url, split_url, get_manifest, \
+    TRIES, VERIFY, DOWNLOAD_LOGGER
+
+# Exponential backoff between two rounds of tries (sec.)
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+# Number of consecutive failures after which a host is put aside,
+# and time (sec.) before it is tried again
+FAILURE_THRESHOLD = 3
+COOLDOWN = 300.0
+
+# Weight of the last transfer in the latency/throughput averages
+SMOOTHING = 0.3
+
+# Size (octets) assumed to rank the hosts if the file size is unknown
+DEFAULT_SIZE = 1048576
+
+LOG = logging.getLogger(DOWNLOAD_LOGGER)
+
+# Class to keep the statistics and the state of a host
+class host_stats():
+
+    def __init__(self,host,
+                 failure_threshold=FAILURE_THRESHOLD,
+                 cooldown=COOLDOWN,
+                 smoothing=SMOOTHING):
+
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.smoothing = smoothing
+        self.latency = None
+        self.throughput = None
+        self.failures = 0
+        self.opened_at = None
+        self.nsuccess = 0
+        self.nfailure = 0
+
+    def get_state(self,now=None):
+
+        """
+        Return the state of the circuit breaker of the host:
+        closed (available), open (put aside) or half-open (one try allowed).
+        """
+
+        if (self.opened_at is None): return "closed"
+        if (now is None): now = time.time()
+        if (now - self.opened_at >= self.cooldown): return "half-open"
+        return "open"
+
+    def average(self,old,new):
+        if (old is None): return new
+        return (1.0 - self.smoothing)*old + self.smoothing*new
+
+    def record_success(self,latency=None,nbytes=0,elapsed=None):
+        self.nsuccess += 1
+        self.failures = 0
+        self.opened_at = None
+        if (latency is not None):
+            self.latency = self.average(self.latency,latency)
+        # Short transfers only tell the latency
+        if (elapsed is not None) and (nbytes > 0):
+            transfer_time = max(elapsed - (latency or 0.0),1.0e-3)
+            self.throughput = self.average(self.throughput,nbytes/transfer_time)
+
+    def record_failure(self):
+        self.nfailure += 1
+        self.failures += 1
+        if (self.failures >= self.failure_threshold) or \
+            (self.opened_at is not None):
+            # A failed try of a half-open host opens the circuit again
+            self.opened_at = time.time()
+
+    def get_expected_time(self,size=DEFAULT_SIZE):
+
+        """
+        Return the expected time (sec.) to download size octets from
+        the host, or None if the host has not been measured yet.
+        """
+
+        if (self.latency is None) and (self.throughput is None): return None
+        expected = self.latency or 0.0
+        if (self.throughput is not None): expected += size/self.throughput
+        return expected
+
+# Class to route the downloads to the mirrors of a file.
+# A candidate is a tuple (url, local filename); the candidates are
+# tried from the fastest available host to the slowest one,
+# hosts which have not been measured yet being tried first.
+class provider_router():
+
+    def __init__(self,tries=TRIES,
+                 backoff_base=BACKOFF_BASE,
+                 backoff_max=BACKOFF_MAX,
+                 failure_threshold=FAILURE_THRESHOLD,
+                 cooldown=COOLDOWN,
+                 username=None,
+                 password=None,
+                 timeout=None,
+                 verify=VERIFY,
+                 pool=None):
+
+        self.tries = tries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.verify = verify
+        self.pool = pool
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    def get_host(self,url):
+        scheme, host, port = split_url(url)[0:3]
+        return "%s://%s:%s" % (scheme,host,port)
+
+    def get_stats(self,url):
+        host = self.get_host(url)
+        with self.lock:
+            stats = self.hosts.get(host)
+            if (stats is None):
+                stats = host_stats(host,
+                                   failure_threshold=self.failure_threshold,
+                                   cooldown=self.cooldown)
+                self.hosts[host] = stats
+        return stats
+
+    def rank(self,candidates,size=None):
+
+        """
+        Return the candidates whose host is available,
+        from the fastest to the slowest one.
+        """
+
+        if (size is None): size = DEFAULT_SIZE
+        now = time.time()
+        ranked = []
+        for i,candidate in enumerate(candidates):
+            stats = self.get_stats(candidate[0])
+            if (stats.get_state(now=now) == "open"): continue
+            expected = stats.get_expected_time(size=size)
+            ranked.append((expected is not None,expected,i,candidate))
+        ranked.sort()
+        return [item[-1] for item in ranked]
+
+    def get_backoff(self,attempt):
+        delay = min(self.backoff_max,self.backoff_base*2**attempt)
+        # Jitter, so that concurrent downloads do not retry at the same time
+        return delay*(0.5 + 0.5*random.random())
+
+    def fetch(self,candidates,
+              target_directory=".",
+              size=None,
+              overwrite=False):
+
+        """
+        Download a file from one of its mirrors into target_directory,
+        and return the local path of the file (None if it fails).
+        A candidate whose local file already exists is returned first.
+        """
+
+        if not (candidates): return None
+        manifest = get_manifest(target_directory)
+        local = None
+        if not (overwrite):
+            for url, filename in candidates:
+                target = os.path.join(target_directory,filename)
+                if (os.path.isfile(target)) and \
+                    (manifest.check(target,verify=self.verify) is not False):
+                    # The file is checked by fetch_url if it is not in the manifest,
+                    # the other mirrors being tried if it must be downloaded again
+                    local = (url,filename)
+                    break
+
+        missing = set()
+        for attempt in range(self.tries):
+            ranked = [candidate for candidate in self.rank(candidates,size=size)
+                      if (candidate[0] not in missing)]
+            if (local in ranked):
+                ranked.remove(local)
+                ranked.insert(0,local)
+            for url, filename in ranked:
+                stats = {}
+                target = fetch_url(url,target_directory=target_directory,
+                                   output_filename=filename,
+                                   username=self.username,password=self.password,
+                                   tries=1,timeout=self.timeout,
+                                   overwrite=overwrite,verify=self.verify,
+                                   pool=self.pool,stats=stats)
+                host = self.get_stats(url)
+                if (target is not None):
+                    host.record_success(latency=stats["latency"],
+                                        nbytes=stats["nbytes"],
+                                        elapsed=stats["elapsed"])
+                    return target
+                if (stats["permanent"]):
+                    # The file is missing from this mirror, the host is fine
+                    missing.add(url)
+                else:
+                    host.record_failure()
+                    if (host.get_state() == "open"):
+                        LOG.warning("%s put aside for %.0f sec.",host.host,self.cooldown)
+                LOG.info("Failing over from %s",url)
+            if (len(missing) == len(candidates)): break
+            if (attempt < self.tries-1):
+                delay = self.get_backoff(attempt)
+                LOG.info("Retrying in %.1f sec.",delay)
+                time.sleep(delay)
+
+        LOG.error("Can not download %s from any mirror",
+                  os.path.basename(candidates[0][1]))
+        return None
+
+    def report(self):
+        with self.lock:
+            hosts = sorted(self.hosts.values(),key=lambda stats: stats.host)
+        for stats in hosts:
+            LOG.info("%s: %s, %i success(es), %i failure(s), latency %s sec., throughput %s octets/sec.",
+                     stats.host,stats.get_state(),stats.nsuccess,stats.nfailure,
+                     "%.3f" % (stats.latency) if (stats.latency is not None) else "?",
+                     "%.0f" % (stats.throughput) if (stats.throughput is not None) else "?")
+        return hosts
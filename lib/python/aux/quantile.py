@@ -0,0 +1,168 @@
+#! /usr/bin/env python
+# -*- coding: latin-1 -*-
+
+"""
+Python module to compute quantiles, either from a histogram
+(cumulative sum and searchsorted), exactly (np.partition), or as the bin
+of the histogram of the values where the quantile is reached (as done by
+the get_quantile.pro and get_background.pro IDL routines).
+In the latter case the bin is found from the exact order statistic,
+so that the histogram, which can have 100000 bins, is never built.
+Quantiles of each column of a 2d array (e.g. background spectrum
+of a (nt,nf) dynamical spectrum) are computed in a single call.
+@author: X.Bonnin (LESIA)
+"""
+
+__author__="Xavier Bonnin"
+__date__="18-OCT-2026"
+__version__="1.00"
+
+import warnings
+import numpy as np
+
+# Number of bins used by get_quantile.pro by default
+NBINS = 100
+
+def histogram_quantile(histo,bins,q):
+
+    """
+    Method to compute the q quantile(s) of a histogram:
+    the lower edge of the first bin where the cumulative sum
+    of the histogram reaches q times its total.
+    Inputs:
+      histo - histogram [nbins] or histograms of several columns [nbins,ncol]
+      bins  - lower edges of the bins [nbins] (or [nbins,ncol])
+      q     - quantile(s) between 0 and 1
+    Outputs:
+      quantile - lower edge of the bin for each q (or each column)
+    Author: Xavier Bonnin (LESIA)
+    """
+
+    histo = np.asarray(histo)
+    bins = np.asarray(bins)
+    cumul = np.cumsum(histo,axis=0)
+    threshold = np.asarray(q,dtype=np.float64)*cumul[-1]
+    if (histo.ndim == 1):
+        index = np.searchsorted(cumul,threshold,side="left")
+    else:
+        index = (cumul < threshold).sum(axis=0)
+    index = np.minimum(index,len(histo)-1)
+    if (bins.ndim == 1): return bins[index]
+    return bins[index,np.arange(bins.shape[1])]
+
+# Method to return the rank (from 0) of the q quantile
+# of n values, i.e. the smallest rank k such as k+1 >= q*n.
+def get_rank(q,n):
+    rank = np.ceil(q*np.asarray(n,dtype=np.float64)).astype(np.int64) - 1
+    return np.clip(rank,0,np.maximum(np.asarray(n) - 1,0))
+
+def exact_quantile(array,q,axis=0,
+                   min_value=None,max_value=None):
+
+    """
+    Method to compute the q quantile of the values of an array
+    along an axis (all of the values if axis is None),
+    i.e. the smallest value v such as at least q of the values are <= v.
+    Values which are not finite, or out of [min_value,max_value],
+    are ignored; NaN is returned if there is no value left.
+    Uses np.partition if all of the values are kept,
+    np.sort along the axis otherwise.
+    Author: Xavier Bonnin (LESIA)
+    """
+
+    array = np.asarray(array,dtype=np.float64)
+    if (axis is None):
+        array = array.ravel() ; axis = 0
+    array = np.moveaxis(array,axis,0)
+    valid = np.isfinite(array)
+    with np.errstate(invalid="ignore"):
+        if (min_value is not None): valid &= (array >= min_value)
+        if (max_value is not None): valid &= (array <= max_value)
+    count = valid.sum(axis=0)
+    rank = get_rank(q,count)
+
+    if (len(array) == 0):
+        quantile = np.zeros(array.shape[1:]) + np.nan
+    elif (valid.all()):
+        rank = int(np.max(rank))
+        quantile = np.partition(array,rank,axis=0)[rank]
+    else:
+        values = np.sort(np.where(valid,array,np.inf),axis=0)
+        quantile = np.take_along_axis(values,np.asarray(rank)[np.newaxis,...],axis=0)[0]
+        quantile = np.where(count > 0,quantile,np.nan)
+    if (np.ndim(quantile) == 0): return float(quantile)
+    return quantile
+
+def binned_quantile(array,q,nbins=NBINS,axis=0,
+                    min_value=None,max_value=None):
+
+    """
+    Method to compute the q quantile of the values of an array along an axis,
+    as the lower edge of the bin of their histogram where the cumulative
+    sum reaches q times its total (see histogram_quantile).
+    The histogram has nbins regular bins between min_value and max_value
+    (the minimal and maximal values along the axis by default),
+    with the bin edges of np.histogram.
+    Author: Xavier Bonnin (LESIA)
+    """
+
+    array = np.asarray(array,dtype=np.float64)
+    if (axis is None):
+        array = array.ravel() ; axis = 0
+    array = np.moveaxis(array,axis,0)
+    with np.errstate(invalid="ignore"), warnings.catch_warnings():
+        # Columns without any finite value give NaN
+        warnings.simplefilter("ignore",RuntimeWarning)
+        finite = np.where(np.isfinite(array),array,np.nan)
+        if (min_value is None): min_value = np.nanmin(finite,axis=0) if (len(array) > 0) else np.nan
+        if (max_value is None): max_value = np.nanmax(finite,axis=0) if (len(array) > 0) else np.nan
+    min_value = np.asarray(min_value,dtype=np.float64)
+    max_value = np.asarray(max_value,dtype=np.float64)
+
+    # The histogram bin of the quantile is the bin of the order statistic
+    value = np.asarray(exact_quantile(array,q,axis=0,
+                                      min_value=min_value,max_value=max_value))
+    step = (max_value - min_value)/nbins
+    with np.errstate(invalid="ignore",divide="ignore"):
+        index = np.floor((value - min_value)/step)
+        index = np.clip(np.where(np.isfinite(index),index,0),0,nbins-1).astype(np.int64)
+        # Same rounding of the bin edges as np.histogram
+        index -= (value < index*step + min_value)
+        upper = np.where(index + 1 == nbins,max_value,(index + 1)*step + min_value)
+        index += (value >= upper) & (index != nbins-1)
+    if (q <= 0.0): index = np.zeros_like(index)
+    quantile = np.where(max_value > min_value,index*step + min_value,min_value)
+    quantile = np.where(np.isfinite(value),quantile,np.nan)
+    if (np.ndim(quantile) == 0): return float(quantile)
+    return quantile
+
+# Method to compute the 100*Q% quantile of a set X of values,
+# on a histogram of nbins bins (or of bins of width dX,
+# twice the median step between successive values by default).
+def get_quantile(X,Q,nbins=None,dX=None):
+    X = np.asarray(X,dtype=np.float64).ravel()
+    if (nbins is None):
+        if (dX is None):
+            dX = 2.0*np.median(np.abs(np.diff(X))) if (len(X) > 1) else 0.0
+        if not (dX > 0.0): return exact_quantile(X,Q,axis=None)
+        nbins = int((X.max() - X.min())/dX) + 1
+    return binned_quantile(X,Q,nbins=nbins,axis=None)
+
+def get_background(intensity,q=0.05,
+                   nbins=None,
+                   min_value=None,max_value=None):
+
+    """
+    Method to compute the background spectrum of a (nt,nf) intensity array,
+    i.e. the q quantile of the intensity in each frequency channel
+    (see Zarka et al., SSR, 2004 and get_background.pro).
+    If nbins is given, the quantile is the lower edge of the bin of the
+    channel's histogram as done by get_quantile.pro, otherwise it is exact.
+    Author: Xavier Bonnin (LESIA)
+    """
+
+    if (nbins is None):
+        return exact_quantile(intensity,q,axis=0,
+                              min_value=min_value,max_value=max_value)
+    return binned_quantile(intensity,q,nbins=nbins,axis=0,
+                           min_value=min_value,max_value=max_value)
@@ -0,0 +1,214 @@
+#! /usr/bin/env python
+# -*- coding: latin-1 -*-
+
+"""
+Python module to list the directories of the ftp/http data servers.
+Each directory is listed once, and its listing (file names and sizes)
+is cached on disk for a given time, so that the files of a campaign
+can be checked without connecting to the servers for each file.
+@author: X.Bonnin (LESIA)
+"""
+
+__author__="Xavier Bonnin"
+__date__="18-OCT-2026"
+__version__="1.00"
+
+import os, re
+import time, socket
+import threading
+import hashlib, json
+import posixpath
+import ftplib, httplib
+from datetime import datetime
+import logging
+
+from download_manager import split_url, get_headers, download_error, \
+    connection_pool, TIMEOUT, DOWNLOAD_LOGGER
+
+# Default time to live of the cached listings (sec.)
+CATALOG_TTL = 86400
+
+# Default time (sec.) during which a directory which can not be listed
+# is not listed again (the server is not contacted for each of its files)
+FAILURE_TTL = 600
+
+# Date and time format of the cached listings
+CATALOG_TFORMAT = "%Y-%m-%dT%H:%M:%S"
+
+# Links of the http directory listings
+HREF_PATTERN = re.compile(r'href\s*=\s*["\']([^"\'?#]+)["\']',re.IGNORECASE)
+
+LOG = logging.getLogger(DOWNLOAD_LOGGER)
+
+# Method to list a directory from a ftp connection.
+# Returns a dictionary {filename:size} (size is None if unknown).
+def list_ftp(conn,path):
+    lines = []
+    try:
+        conn.retrlines("LIST " + path,lines.append)
+    except ftplib.error_perm, why:
+        raise download_error("FTP error (%s)" % (why),
+                             permanent=str(why).startswith("550"))
+    files = {}
+    for line in lines:
+        fields = line.split(None,8)
+        if (len(fields) == 9) and (fields[4].isdigit()):
+            # Unix format, sub-directories and links are skipped
+            if (fields[0][0] in "dl"): continue
+            files[fields[8]] = int(fields[4])
+        elif (len(fields) == 4) and (fields[2].isdigit()):
+            # Windows format
+            files[fields[3]] = int(fields[2])
+    return files
+
+# Method to list a directory from a http connection (file names only).
+def list_http(conn,path,
+              username=None,password=None):
+    conn.request("GET",path.rstrip("/") + "/",
+                 headers=get_headers(username=username,password=password))
+    response = conn.getresponse()
+    content = response.read()
+    if (response.status != 200):
+        raise download_error("HTTP error %i (%s)" % (response.status,response.reason),
+                             permanent=(response.status in (401,403,404)))
+    files = {}
+    for href in HREF_PATTERN.findall(content):
+        filename = posixpath.basename(href)
+        if (filename) and not (href.endswith("/")):
+            files[filename] = None
+    return files
+
+# Class to list the directories of the data servers.
+# A directory is listed once for the lifetime of the instance, and
+# its listing is cached on disk for ttl seconds (if cache_directory is set).
+# A failed listing is kept in memory for failure_ttl seconds.
+class remote_catalog():
+
+    def __init__(self,cache_directory=None,
+                 ttl=CATALOG_TTL,
+                 failure_ttl=FAILURE_TTL,
+                 username=None,
+                 password=None,
+                 timeout=TIMEOUT,
+                 pool=None):
+
+        self.cache_directory = cache_directory
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        if (pool is None): pool = connection_pool(timeout=timeout)
+        self.pool = pool
+        self.listings = {}
+        # Time of the last failed listing of the directories
+        self.failures = {}
+        self.lock = threading.Lock()
+        if (cache_directory is not None) and \
+            not (os.path.isdir(cache_directory)):
+            os.makedirs(cache_directory)
+
+    def get_cache_file(self,url):
+        if (self.cache_directory is None): return None
+        key = hashlib.sha1(url.rstrip("/")).hexdigest()
+        return os.path.join(self.cache_directory,"listing_%s.json" % (key))
+
+    def load(self,url):
+
+        """
+        Load the cached listing of a directory,
+        and return None if there is no listing or if it has expired.
+        """
+
+        cache_file = self.get_cache_file(url)
+        if (cache_file is None) or not (os.path.isfile(cache_file)):
+            return None
+        if (time.time() - os.path.getmtime(cache_file) > self.ttl):
+            return None
+        try:
+            with open(cache_file) as fr:
+                listing = json.load(fr)
+        except (IOError,ValueError):
+            return None
+        return listing.get("files")
+
+    def save(self,url,files):
+        cache_file = self.get_cache_file(url)
+        if (cache_file is None): return None
+        listing = {"url":url,"date":datetime.today().strftime(CATALOG_TFORMAT),
+                   "files":files}
+        # The listing is written into a temporary file to be atomic
+        with open(cache_file + ".tmp",'w') as fw:
+            json.dump(listing,fw)
+        os.rename(cache_file + ".tmp",cache_file)
+        return cache_file
+
+    def list_directory(self,url,refresh=False):
+
+        """
+        Return the listing {filename:size} of a remote directory
+        (None if it can not be listed, or if it has failed
+        less than failure_ttl seconds ago).
+        """
+
+        url = url.rstrip("/")
+        if not (refresh):
+            with self.lock:
+                files = self.listings.get(url)
+                failure = self.failures.get(url)
+            if (files is not None): return files
+            if (failure is not None) and (time.time() - failure < self.failure_ttl):
+                return None
+            files = self.load(url)
+            if (files is not None):
+                with self.lock:
+                    self.listings[url] = files
+                return files
+
+        scheme, host, port, path, username, password = split_url(url,
+                                                                 username=self.username,
+                                                                 password=self.password)
+        key = (scheme,host,port,username,password)
+        conn = None
+        t0 = time.time()
+        try:
+            conn = self.pool.get(key,timeout=self.timeout)
+            if (scheme == "ftp"):
+                files = list_ftp(conn,path or "/")
+            else:
+                files = list_http(conn,path or "/",
+                                  username=username,password=password)
+        except (download_error,httplib.HTTPException,EOFError,
+                socket.error,IOError,ftplib.Error), why:
+            if (conn is not None): self.pool.discard(conn)
+            LOG.warning("Can not list %s: %s",url,why)
+            with self.lock:
+                self.failures[url] = time.time()
+            return None
+        self.pool.release(key,conn)
+        LOG.info("%s listed in %.2f sec. (%i file(s))",url,time.time() - t0,len(files))
+
+        with self.lock:
+            self.listings[url] = files
+            self.failures.pop(url,None)
+        self.save(url,files)
+        return files
+
+    def exists(self,url):
+
+        """
+        Return True if the remote file is in the listing of its directory,
+        False if it is not, and None if the directory can not be listed.
+        """
+
+        files = self.list_directory(posixpath.dirname(url))
+        if (files is None): return None
+        return (posixpath.basename(url) in files)
+
+    def get_size(self,url):
+        files = self.list_directory(posixpath.dirname(url))
+        if (files is None): return None
+        return files.get(posixpath.basename(url))
+
+    def close(self):
+        self.pool.close()
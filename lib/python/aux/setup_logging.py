@@ -2,11 +2,10 @@
 
 def setup_logging(filename = None, quiet = False, verbose = False, debug = False):
 
-    
-    """Method to setup a logging instance"""
+	"""Method to setup a logging instance"""
 
 	import logging
-    
+	
 	if debug:
 		logging.basicConfig(level = logging.DEBUG, format='%(levelname)-8s: %(message)s')
 	elif verbose:
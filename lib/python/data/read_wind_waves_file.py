@@ -8,22 +8,329 @@ Python module to read a Wind/Waves data file.
 
 __author__="Xavier Bonnin"
 __date__="03-MAR-2013"
-__version__="1.00"
+__version__="1.10"
 
 import sys, os
 import re
 from datetime import datetime
 import struct
+import time
+import numpy as np
+
+# Wind/Waves l2 high resolution sweep header
+HEADER_FIELDS = ("P_FIELD","JULIAN_DAY_B1","JULIAN_DAY_B2","JULIAN_DAY_B3","MSEC_OF_DAY",
+                 "RECEIVER_CODE","JULIAN_SEC","YEAR","MONTH","DAY",
+                 "HOUR","MINUTE","SECOND","JULIAN_SEC_FRAC",
+                 "ISWEEP","IUNIT","NPBS","SUN_ANGLE","SPIN_RATE","KSPIN","MODE","LISTFR","NFREQ",
+                 "ICAL","IANTEN","IPOLA","IDIPXY","SDURCY","SDURPA",
+                 "NPALCY","NFRPAL","NPALIF","NSPALF","NZPALF")
+HEADER_FORMATS = ('>i1','>i1','>i1','>i1','>i4',
+                  '>i2','>u4','>i2','>i2','>i2',
+                  '>i2','>i2','>i2','>f4',
+                  '>i4','>i2','>i2','>f4','>f4','>i2','>i2','>i2','>i2',
+                  '>i2','>i2','>i2','>i2','>f4','>f4',
+                  '>i2','>i2','>i2','>i2','>i2')
+HEADER_DTYPE = np.dtype(zip(HEADER_FIELDS,HEADER_FORMATS))
+HEADER_SIZE = HEADER_DTYPE.itemsize # 80 octets
+
+# Offset (in octets) of the NPALIF, NSPALF, NZPALF parameters in the header
+NPAL_OFFSET = HEADER_DTYPE.fields["NPALIF"][1]
+
+# Sweep parameters returned as arrays
+SWEEP_FIELDS = ("FREQ","VSPAL","TSPAL","VZPAL","TZPAL")
+
+# Extension of the sweep index file saved next to the data file
+INDEX_EXT = ".idx.npz"
 
 class waves_data:
     def __init__(self,header,data):
         self.header = header
         self.data = data
 
+def sweep_size(npalf,nspal,nzpal):
+
+    """
+    Return the number of octets between the two
+    record length markers of a sweep.
+    """
+
+    return HEADER_SIZE + 4*npalf*(1 + 2*nspal + 2*nzpal)
+
+def sweep_dtype(npalf,nspal,nzpal):
+
+    """
+    Return the numpy dtype of a complete sweep record
+    (including the leading and trailing record length markers).
+    """
+
+    return np.dtype([("LOCTETS1",'>i4'),
+                     ("HEADER",HEADER_DTYPE),
+                     ("FREQ",'>f4',(npalf,)),
+                     ("VSPAL",'>f4',(npalf*nspal,)),
+                     ("TSPAL",'>f4',(npalf*nspal,)),
+                     ("VZPAL",'>f4',(npalf*nzpal,)),
+                     ("TZPAL",'>f4',(npalf*nzpal,)),
+                     ("LOCTETS2",'>i4')])
+
+def sweep_runs(offsets,npal):
+
+    """
+    Return the [i0,i1[ bounds of the runs of adjacent sweeps
+    sharing the same layout.
+    """
+
+    nsweep = len(offsets)
+    if (nsweep == 0): return []
+    size = 8 + sweep_size(npal[:,0],npal[:,1],npal[:,2])
+    change = np.any(npal[1:] != npal[:-1],axis=1) | \
+        (offsets[1:] != offsets[:-1] + size[:-1])
+    starts = np.concatenate(([0],np.where(change)[0] + 1,[nsweep]))
+    return zip(starts[:-1],starts[1:])
+
+def scan_l2_hres(buffer):
+
+    """
+    Scan the record lengths of a Wind/Waves l2 high resolution
+    data file content, and return the offsets of the sweeps
+    and their (NPALIF,NSPALF,NZPALF) parameters as arrays.
+    Return None if the file content is not consistent.
+    """
+
+    nbytes = len(buffer)
+    offsets = [] ; npal = []
+    offset = 0
+    while (offset < nbytes):
+        if (offset + 8 + HEADER_SIZE > nbytes):
+            print "Error reading file: truncated sweep at octet %i!" % (offset)
+            return None
+        loctets = struct.unpack_from('>i',buffer,offset)[0]
+        npal_i = struct.unpack_from('>hhh',buffer,offset + 4 + NPAL_OFFSET)
+        if (loctets != sweep_size(*npal_i)) or \
+                (offset + 8 + loctets > nbytes):
+            print "Error reading file: wrong sweep length at octet %i!" % (offset)
+            return None
+        offsets.append(offset) ; npal.append(npal_i)
+        offset += 8 + loctets
+
+    offsets = np.array(offsets,dtype=np.int64)
+    npal = np.array(npal,dtype=np.int64).reshape(-1,3)
+    return offsets, npal
+
 def read_l2_hres(filepath):
 
     """
-    Method to read a Wind/Waves l2 high resolution data file"
+    Method to read a Wind/Waves l2 high resolution data file.
+    The record lengths are scanned once, then the sweeps are decoded
+    by runs of identical layout with np.frombuffer.
+    Returned waves_data header is a structured array (one element per sweep),
+    and data is a dictionary of float32 arrays [nsweep,n] for FREQ, VSPAL,
+    TSPAL, VZPAL and TZPAL (padded with NaN if the sweep layout changes
+    during the day).
+    """
+
+    with open(filepath,'rb') as frb:
+        buffer = frb.read()
+
+    scan = scan_l2_hres(buffer)
+    if (scan is None): return None
+    offsets, npal = scan
+
+    return decode_l2_hres(buffer,offsets,npal)
+
+def decode_l2_hres(buffer,offsets,npal,
+                   sweeps=None,frequencies=None):
+
+    """
+    Decode the sweeps of a Wind/Waves l2 high resolution data file content,
+    providing the sweep offsets and (NPALIF,NSPALF,NZPALF) parameters
+    returned by scan_l2_hres.
+    Optional sweeps and frequencies index vectors allow to decode
+    a subset of the sweeps and of the frequency steps only.
+    S/SP and Z values of a sweep are assumed to be stored
+    frequency step by frequency step (i.e., [NPALIF,NSPALF]).
+    """
+
+    if (sweeps is None):
+        sweeps = np.arange(len(offsets))
+    sweeps = np.asarray(sweeps,dtype=np.int64).ravel()
+    nsweep = len(sweeps)
+    offsets = offsets[sweeps] ; npal = npal[sweeps]
+
+    npalf = npal[:,0] ; nspal = npal[:,1] ; nzpal = npal[:,2]
+    if (frequencies is not None):
+        frequencies = np.asarray(frequencies,dtype=np.int64).ravel()
+        if (nsweep > 0) and (frequencies.max() >= npalf.min()):
+            print "Error: frequency index out of range!"
+            return None
+        npalf = np.zeros(nsweep,dtype=np.int64) + len(frequencies)
+    ncols = {"FREQ":npalf,
+             "VSPAL":npalf*nspal,"TSPAL":npalf*nspal,
+             "VZPAL":npalf*nzpal,"TZPAL":npalf*nzpal}
+
+    header = np.zeros(nsweep,dtype=HEADER_DTYPE.newbyteorder('='))
+    data = {}
+    for field in SWEEP_FIELDS:
+        ncol = int(ncols[field].max()) if (nsweep > 0) else 0
+        data[field] = np.empty((nsweep,ncol),dtype=np.float32)
+        if (nsweep > 0) and (ncols[field].min() != ncol):
+            data[field].fill(np.nan)
+
+    # Decode runs of adjacent sweeps sharing the same layout
+    for i0, i1 in sweep_runs(offsets,npal):
+        dtype = sweep_dtype(*npal[i0])
+        records = np.frombuffer(buffer,dtype=dtype,
+                                count=i1-i0,offset=offsets[i0])
+        if np.any(records["LOCTETS1"] != records["LOCTETS2"]):
+            print "Error reading file!"
+            return None
+        header[i0:i1] = records["HEADER"]
+        for field in SWEEP_FIELDS:
+            values = records[field]
+            if (frequencies is not None):
+                values = values.reshape(i1-i0,npal[i0,0],-1)[:,frequencies,:]
+                values = values.reshape(i1-i0,-1)
+            data[field][i0:i1,0:values.shape[1]] = values
+
+    return waves_data(header, data)
+
+class waves_mmap:
+
+    """
+    Memory-mapped access to a Wind/Waves l2 high resolution data file.
+    Sweeps are decoded on demand, so that a time window or
+    a frequency subset can be loaded without reading the whole file.
+    """
+
+    def __init__(self,filepath,offsets,npal):
+        self.filepath = filepath
+        self.buffer = np.memmap(filepath,dtype=np.uint8,mode='r')
+        self.offsets = offsets
+        self.npal = npal
+        self.nsweep = len(offsets)
+        self._header = None
+
+    def get_header(self):
+
+        """
+        Return the header of all of the sweeps as a structured array.
+        """
+
+        if (self._header is None):
+            header = np.zeros(self.nsweep,dtype=HEADER_DTYPE.newbyteorder('='))
+            for i0, i1 in sweep_runs(self.offsets,self.npal):
+                header[i0:i1] = self.records(i0,i1)["HEADER"]
+            self._header = header
+        return self._header
+
+    def get_time(self):
+
+        """
+        Return the starting time of the sweeps in seconds of the day.
+        """
+
+        return self.get_header()["MSEC_OF_DAY"]/1000.0
+
+    def select(self,starttime=None,endtime=None):
+
+        """
+        Return the indices of the sweeps starting between starttime
+        and endtime (in seconds of the day).
+        """
+
+        time = self.get_time()
+        keep = np.ones(self.nsweep,dtype=bool)
+        if (starttime is not None): keep &= (time >= starttime)
+        if (endtime is not None): keep &= (time <= endtime)
+        return np.where(keep)[0]
+
+    def records(self,i0=0,i1=None):
+
+        """
+        Return a zero-copy (big endian) structured view of the sweeps [i0,i1[.
+        All of these sweeps must share the same layout.
+        """
+
+        if (i1 is None): i1 = self.nsweep
+        if np.any(self.npal[i0:i1] != self.npal[i0]):
+            print "Error: sweeps %i to %i do not share the same layout!" % (i0,i1-1)
+            return None
+        return np.frombuffer(self.buffer,dtype=sweep_dtype(*self.npal[i0]),
+                             count=i1-i0,offset=self.offsets[i0])
+
+    def get_data(self,sweeps=None,frequencies=None,
+                 starttime=None,endtime=None):
+
+        """
+        Decode the given sweeps (or the sweeps between starttime and endtime)
+        and frequency steps, and return a waves_data object.
+        """
+
+        if (sweeps is None) and ((starttime is not None) or (endtime is not None)):
+            sweeps = self.select(starttime=starttime,endtime=endtime)
+        return decode_l2_hres(self.buffer,self.offsets,self.npal,
+                              sweeps=sweeps,frequencies=frequencies)
+
+    def close(self):
+        del self.buffer
+
+def index_l2_hres(filepath,index_file=None,
+                  overwrite=False):
+
+    """
+    Return the sweep offsets and (NPALIF,NSPALF,NZPALF) parameters
+    of a Wind/Waves l2 high resolution data file.
+    The index is saved next to the data file (filepath+INDEX_EXT),
+    and reloaded as long as the size and modification time
+    of the data file have not changed.
+    """
+
+    if (index_file is None): index_file = filepath + INDEX_EXT
+    stat = os.stat(filepath)
+
+    if (os.path.isfile(index_file)) and not (overwrite):
+        try:
+            index = np.load(index_file)
+            if (int(index["size"]) == stat.st_size) and \
+                    (float(index["mtime"]) == stat.st_mtime):
+                return index["offsets"], index["npal"]
+        except (IOError,ValueError,KeyError):
+            pass
+
+    buffer = np.memmap(filepath,dtype=np.uint8,mode='r')
+    scan = scan_l2_hres(buffer)
+    del buffer
+    if (scan is None): return None
+    offsets, npal = scan
+
+    # Write the index in a temporary file first, then rename it
+    tmp_file = index_file + ".%i.tmp" % (os.getpid())
+    try:
+        with open(tmp_file,'wb') as fw:
+            np.savez(fw,offsets=offsets,npal=npal,
+                     size=stat.st_size,mtime=stat.st_mtime)
+        os.rename(tmp_file,index_file)
+    except (IOError,OSError), why:
+        print "Can not save index file %s: %s" % (index_file,why)
+        if (os.path.isfile(tmp_file)): os.remove(tmp_file)
+
+    return offsets, npal
+
+def mmap_l2_hres(filepath,overwrite_index=False):
+
+    """
+    Method to open a Wind/Waves l2 high resolution data file
+    as a memory-mapped waves_mmap object.
+    """
+
+    index = index_l2_hres(filepath,overwrite=overwrite_index)
+    if (index is None): return None
+    return waves_mmap(filepath,*index)
+
+def read_l2_hres_loop(filepath):
+
+    """
+    Method to read a Wind/Waves l2 high resolution data file
+    sweep by sweep (kept as a reference for read_l2_hres).
     """
 
     header_fields = ("P_FIELD","JULIAN_DAY_B1","JULIAN_DAY_B2","JULIAN_DAY_B3","MSEC_OF_DAY",
@@ -31,14 +338,13 @@ def read_l2_hres(filepath):
                      "HOUR","MINUTE","SECOND","JULIAN_SEC_FRAC",
                      "ISWEEP","IUNIT","NPBS","SUN_ANGLE","SPIN_RATE","KSPIN","MODE","LISTFR","NFREQ",
                      "ICAL","IANTEN","IPOLA","IDIPXY","SDURCY","SDURPA",
-        "NPALCY","NFRPAL","NPALIF","NSPALF","NZPALF") 
+        "NPALCY","NFRPAL","NPALIF","NSPALF","NZPALF")
     header_dtype = '>bbbbihLhhhhhhfihhffhhhhhhhhffhhhhh'
 
     header = [] ; data = [] ; nsweep=1
     with open(filepath,'rb') as frb:
         while (True):
             try:
-                print "Reading sweep #%i" % (nsweep)
                 # Reading number of octets in the current sweep
                 block = frb.read(4)
                 if (len(block) == 0): break
@@ -57,7 +363,7 @@ def read_l2_hres(filepath):
                 Tspal = struct.unpack('>'+'f'*npalf*nspal,block)
                 # Reading intensity and time values for Z in the current sweep
                 block = frb.read(4*npalf*nzpal)
-                Vzpal = struct.unpack('>'+'f'*npalf*nzpal,block)    
+                Vzpal = struct.unpack('>'+'f'*npalf*nzpal,block)
                 block = frb.read(4*npalf*nzpal)
                 Tzpal = struct.unpack('>'+'f'*npalf*nzpal,block)
                 # Reading number of octets in the current sweep
@@ -75,8 +381,38 @@ def read_l2_hres(filepath):
                 nsweep+=1
 
     return waves_data(header, data)
- 
-if (__name__=="__main__"):
-    print "Python module to read Wind/Waves data file."
 
+def benchmark(filepath,repeat=3):
+
+    """
+    Compare the reading times of read_l2_hres and read_l2_hres_loop
+    on a given Wind/Waves l2 high resolution data file.
+    """
+
+    timing = {}
+    for method in (read_l2_hres_loop, read_l2_hres):
+        elapsed = []
+        for i in range(repeat):
+            t0 = time.time()
+            wdata = method(filepath)
+            elapsed.append(time.time() - t0)
+        timing[method.__name__] = min(elapsed)
+        print "%s: %.3f sec. (best of %i)" % (method.__name__,min(elapsed),repeat)
 
+    # Check that both methods return the same values
+    ref = read_l2_hres_loop(filepath) ; new = read_l2_hres(filepath)
+    for i,sweep in enumerate(ref.data):
+        for field in SWEEP_FIELDS:
+            values = np.array(sweep[field],dtype=np.float32)
+            if not np.array_equal(values,new.data[field][i,0:len(values)]):
+                print "%s differs on sweep #%i!" % (field,i+1)
+                return timing
+    print "speed-up: x%.1f" % (timing["read_l2_hres_loop"]/max(timing["read_l2_hres"],1.0e-6))
+    return timing
+
+if (__name__=="__main__"):
+    if (len(sys.argv) > 1):
+        benchmark(sys.argv[1])
+    else:
+        print "Python module to read Wind/Waves data file."
+        print "Usage: python read_wind_waves_file.py WIN_RAD2_YYYYMMDD.B3E (benchmark)"
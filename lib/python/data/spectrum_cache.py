@@ -0,0 +1,197 @@
+#! /usr/bin/env python
+# -*- coding: latin-1 -*-
+
+"""
+Python module to cache preprocessed Waves spectra on disk.
+@author: X.Bonnin (LESIA)
+"""
+
+__author__="Xavier Bonnin"
+__date__="18-OCT-2026"
+__version__="1.00"
+
+import os
+import hashlib
+import json
+import time
+import numpy as np
+from datetime import datetime
+import logging
+
+from waves import spectrum, WAVES_LOGGER
+
+# Date and time format of the cached meta-data
+CACHE_TFORMAT = "%Y-%m-%dT%H:%M:%S"
+
+# Default maximal size of the cache (octets)
+CACHE_MAX_SIZE = 2*1024**3
+
+# Size (octets) of the chunks read to compute file checksums
+CHUNK_SIZE = 1048576
+
+# Spectrum array and meta-data attributes saved in the cache
+ARRAY_PARAMETERS = ("intensity","background","snr","time","frequency")
+META_PARAMETERS = ("observatory","instrument","receiver",
+                   "naxis","cdelt","bandwidth","integration_time",
+                   "intensity_units","comment")
+
+LOG=logging.getLogger(WAVES_LOGGER)
+
+# Method to compute the sha1 checksum of a file
+def file_checksum(filepath,chunk_size=CHUNK_SIZE):
+    sha1 = hashlib.sha1()
+    with open(filepath,'rb') as fr:
+        while (True):
+            chunk = fr.read(chunk_size)
+            if not (chunk): break
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+# Method to convert numpy scalars into json serializable values
+def to_json(value):
+    if (isinstance(value,np.generic)):
+        return value.item()
+    if (isinstance(value,(list,tuple))):
+        return [to_json(val) for val in value]
+    return value
+
+# Class to cache preprocessed spectra on disk.
+# Each entry is a .npz file containing the arrays of the spectrum,
+# and a .json sidecar file containing its meta-data.
+# Entries are identified by the checksum of the source file, the receiver
+# and the preprocessing options, and the least recently used entries
+# are removed when the total size of the cache exceeds max_size.
+class spectrum_cache():
+
+    def __init__(self,cache_directory,
+                 max_size=CACHE_MAX_SIZE):
+
+        self.cache_directory = cache_directory
+        self.max_size = max_size
+        if not (os.path.isdir(cache_directory)):
+            os.makedirs(cache_directory)
+
+    def get_key(self,filepath,receiver="",**options):
+
+        """
+        Return the cache key of a given data file,
+        receiver and preprocessing options.
+        """
+
+        items = [file_checksum(filepath),str(receiver).lower()]
+        for name in sorted(options):
+            items.append("%s=%s" % (name,options[name]))
+        return hashlib.sha1(";".join(items)).hexdigest()
+
+    def get_path(self,key,ext=".npz"):
+        return os.path.join(self.cache_directory,key + ext)
+
+    def load(self,key):
+
+        """
+        Return the spectrum cached with the given key,
+        or None if it is not in the cache.
+        """
+
+        array_path = self.get_path(key) ; meta_path = self.get_path(key,ext=".json")
+        if not (os.path.isfile(array_path)) or not (os.path.isfile(meta_path)):
+            return None
+
+        try:
+            with open(meta_path,'r') as fr:
+                meta = json.load(fr)
+            arrays = np.load(array_path)
+            data = spectrum()
+            for parameter in ARRAY_PARAMETERS:
+                if (parameter in arrays.files):
+                    data.set_parameter(parameter,arrays[parameter])
+            arrays.close()
+        except (IOError,ValueError,KeyError), why:
+            LOG.warning("Can not load cache entry %s: %s",key,why)
+            return None
+
+        for parameter in META_PARAMETERS:
+            data.set_parameter(parameter,meta.get(parameter))
+        for parameter in ("date_obs","date_end"):
+            if (meta.get(parameter)):
+                data.set_parameter(parameter,
+                                   datetime.strptime(meta[parameter],CACHE_TFORMAT))
+
+        # Update the access time of the entry (LRU)
+        now = time.time()
+        os.utime(array_path,(now,now))
+        return data
+
+    def save(self,key,data,**info):
+
+        """
+        Save a spectrum in the cache with the given key,
+        then remove the least recently used entries
+        if the cache is too large.
+        """
+
+        arrays = {}
+        for parameter in ARRAY_PARAMETERS:
+            value = data.get_parameter(parameter)
+            if (value is not None):
+                arrays[parameter] = np.asarray(value)
+
+        meta = dict(info)
+        for parameter in META_PARAMETERS:
+            meta[parameter] = to_json(data.get_parameter(parameter))
+        for parameter in ("date_obs","date_end"):
+            value = data.get_parameter(parameter)
+            if (value is not None):
+                meta[parameter] = value.strftime(CACHE_TFORMAT)
+
+        # Write temporary files first, then rename them
+        array_path = self.get_path(key) ; meta_path = self.get_path(key,ext=".json")
+        suffix = ".%i.tmp" % (os.getpid())
+        try:
+            with open(array_path + suffix,'wb') as fw:
+                np.savez(fw,**arrays)
+            with open(meta_path + suffix,'w') as fw:
+                json.dump(meta,fw)
+            os.rename(meta_path + suffix,meta_path)
+            os.rename(array_path + suffix,array_path)
+        except (IOError,OSError), why:
+            LOG.warning("Can not save cache entry %s: %s",key,why)
+            for path in (array_path + suffix,meta_path + suffix):
+                if (os.path.isfile(path)): os.remove(path)
+            return False
+
+        self.evict()
+        return True
+
+    def evict(self,max_size=None):
+
+        """
+        Remove the least recently used entries
+        until the cache size is lower than max_size.
+        """
+
+        if (max_size is None): max_size = self.max_size
+
+        entries = [] ; total_size = 0
+        for filename in os.listdir(self.cache_directory):
+            if not (filename.endswith(".npz")): continue
+            key = filename[0:-4]
+            array_path = self.get_path(key) ; meta_path = self.get_path(key,ext=".json")
+            try:
+                size = os.path.getsize(array_path)
+                if (os.path.isfile(meta_path)): size += os.path.getsize(meta_path)
+                atime = os.path.getmtime(array_path)
+            except OSError:
+                continue
+            entries.append((atime,size,key))
+            total_size += size
+
+        entries.sort()
+        while (total_size > max_size) and (entries):
+            atime, size, key = entries.pop(0)
+            for path in (self.get_path(key),self.get_path(key,ext=".json")):
+                if (os.path.isfile(path)): os.remove(path)
+            total_size -= size
+            LOG.info("Cache entry %s removed",key)
+
+        return total_size
@@ -10,9 +10,10 @@ __date__="08-MAY-2013"
 __version__ = "1.0.1"
 
 import os, sys
-import re, urllib2
+import re
 from urlparse import urlparse
-import time, subprocess
+import time, subprocess, tempfile
+import gzip
 import numpy as np
 from copy import deepcopy 
 from datetime import datetime
@@ -20,6 +21,10 @@ from PIL import Image
 from scipy.misc import bytescale
 from scipy.interpolate import barycentric_interpolate
 import logging
+from read_wind_waves_file import read_l2_hres, mmap_l2_hres
+from download_manager import fetch_url
+# get_quantile is kept in this module for the previous callers
+from quantile import get_quantile, get_background
 
 CURRENT_DIRECTORY = os.getcwd()
 
@@ -54,6 +59,14 @@ TNR_FREQ_NUM=96
 
 # logger name
 WAVES_LOGGER="waves"
+LOG=logging.getLogger(WAVES_LOGGER)
+
+# Magic numbers of gzip and compress (LZW) files
+GZIP_MAGIC="\x1f\x8b"
+LZW_MAGIC="\x1f\x9d"
+
+# Size (octets) of the chunks read from the data files
+CHUNK_SIZE=1048576
 
 # Wind/Waves class
 class wind():
@@ -63,6 +76,9 @@ class wind():
                   dataset="l2_60s",
                   username=None,
                   password=None,
+                  providers=None,
+                  mirrors=None,
+                  router=None,
                   verbose=True):
           
           self.provider=provider
@@ -72,6 +88,13 @@ class wind():
           self.dataset=dataset
           self.username=username
           self.password=password
+          # Providers and mirror servers {provider:[base urls]} used to
+          # download the files with a provider_router instance (if any)
+          if (providers is None): providers = [provider]
+          self.providers=providers
+          if (mirrors is None): mirrors = {}
+          self.mirrors=mirrors
+          self.router=router
 
           # Setup the logging
           setup_logging(filename=None,quiet = False, verbose = verbose)
@@ -176,6 +199,84 @@ class wind():
 
           return date
 
+     def get_provider(self,filename):
+
+          """
+          This method returns the provider
+          of a file from its name.
+          """
+
+          basename = os.path.basename(filename)
+          if (re.search("^\d{8}.(R1|R2|tnr)",basename)):
+               return "gsfc"
+          elif (re.search("^WIN_\w{3,4}_.*\d{8}.B3E",basename)):
+               return "lesia"
+          else:
+               return None
+
+     def get_mirror_filename(self,filename,provider):
+
+          """
+          This method returns the name of the file
+          of the same data set for another provider
+          (e.g., 20010101.R2.Z <-> WIN_RAD2_60S_20010101.B3E).
+          """
+
+          pro = self.get_provider(filename)
+          if (pro is None): return None
+          if (pro == provider.lower()): return os.path.basename(filename)
+          date = self.get_date(filename,provider=pro)
+          rec = self.get_rec(filename,provider=pro)
+          ds = self.get_dataset(filename,provider=pro)
+          if (provider.lower() == "gsfc") and (ds != "l2_60s"):
+               return None
+          return self.get_filename(date,receiver=rec,
+                                   provider=provider,dataset=ds)
+
+     def is_readable(self,filename):
+
+          """
+          This method returns True if the file
+          can be read by read_file.
+          """
+
+          pro = self.get_provider(filename)
+          if (pro == "gsfc"):
+               return True
+          elif (pro == "lesia"):
+               return (self.get_rec(filename,provider=pro) in ["rad1","rad2"]) and \
+                   (self.get_dataset(filename,provider=pro) == "l2_hres")
+          else:
+               return False
+
+     def get_mirrors(self,date=None,
+                     receiver=None,
+                     filename=None,
+                     dataset=None):
+
+          """
+          This method returns the list of the urls and
+          local filenames of a file for each provider
+          and each mirror server, skipping the files
+          which can not be read.
+          """
+
+          if (filename is None):
+               filename = self.get_filename(date,receiver=receiver,
+                                            dataset=dataset)
+               if (filename is None): return []
+
+          candidates = []
+          for provider in self.providers:
+               basename = self.get_mirror_filename(filename,provider)
+               if (basename is None) or not (self.is_readable(basename)):
+                    continue
+               for base_url in [None] + self.mirrors.get(provider,[]):
+                    url = self.get_url(filename=basename,provider=provider,
+                                       base_url=base_url)
+                    if (url is not None): candidates.append((url,basename))
+          return candidates
+
      def get_rec(self,filename,
                  provider=None):
 
@@ -246,11 +347,14 @@ class wind():
                  filename=None,
                  provider=None,
                  dataset=None,
+                 base_url=None,
                  verbose=True):
 
           """
           This method returns the url a
           the Waves data file.
+          If base_url is given, it replaces the
+          url of the provider server (e.g., for a mirror).
           """
           
           if (provider is None):
@@ -270,8 +374,10 @@ class wind():
                                             dataset=ds,
                     verbose=verbose)
           else:
-               rec = self.get_rec(filename)
+               rec = self.get_rec(filename,provider=self.get_provider(filename) or pro)
                basename = os.path.basename(filename)
+               if (self.get_provider(filename) == "lesia"):
+                    ds = self.get_dataset(filename,provider="lesia")
 			
 
           if (pro == "gsfc"):
@@ -305,6 +411,8 @@ class wind():
                LOG.error("Unknown data provider!")
                return None
 			
+          if (base_url is not None):
+               url = base_url.rstrip("/") + url[len(GSFC_URL if (pro == "gsfc") else LESIA_URL):]
           url += "/"+basename
           return url
 		
@@ -327,6 +435,14 @@ class wind():
           if (password is None):
                password = self.password
 		
+          # Download from the fastest available mirror
+          if (self.router is not None) and (provider is None):
+               candidates = self.get_mirrors(date=date,receiver=receiver,
+                                             filename=filename,dataset=dataset)
+               if (verbose) and (candidates):
+                    print "Downloading %s..." % candidates[0][1]
+               return self.router.fetch(candidates,target_directory=data_directory)
+
           url = self.get_url(date=date,
                              receiver=receiver,
                              provider=provider,
@@ -343,18 +459,24 @@ class wind():
                return None
 						
      def read_file(self,filename,
-                   verbose=True):
+                   verbose=True,
+                   mmap=False):
           """
-          This method read the Waves data file
+          This method read the Waves data file.
+          If mmap is True, LESIA l2 high resolution files
+          are opened as memory-mapped waves_mmap objects.
           """
 
           basename = os.path.basename(filename)
-		
+
+          array = None
           if (re.search("\d{8}.R\d{1}",basename)) or \
               (re.search("\d{8}.tnr",basename)) or \
               (re.search("\d{8}.R\d{1}.Z",basename)) or \
               (re.search("\d{8}.tnr.Z",basename)):
                array = self.read_gsfc(filename)
+          elif (re.search("WIN_\w{3,4}_.*\d{8}.B3E",basename)):
+               array = self.read_lesia(filename,mmap=mmap)
 		
           return array 
 	
@@ -366,9 +488,16 @@ class wind():
                   verbose=True,
                   prep=False,
                   interpolate=False,
-                  dB=False):
+                  dB=False,
+                  mmap=False,
+                  cache=None):
           """
           This method returns the Waves data.
+          If mmap is True, LESIA l2 high resolution files are
+          returned as memory-mapped waves_mmap objects
+          (the data file is then never deleted).
+          If a spectrum_cache instance is given, preprocessed
+          data are loaded from/saved into this cache.
           """
           
           if (filename is None):		 
@@ -381,26 +510,42 @@ class wind():
           filepath = os.path.join(data_directory,filename)
           if not (os.path.isfile(filepath)):
                if (verbose): print "%s not found!" % filepath
-               if (download_file):
-                    filepath = self.get_file(date=date,receiver=receiver,
-                                             data_directory=data_directory,
-                         filename=filename,verbose=verbose)
-                    if (filepath is None): return None
-               else:
-                    return None
-          data = self.read_file(filepath,verbose=verbose)
+               if not (download_file): return None
+          if (download_file):
+               # Existing files are checked against the download manifest,
+               # and truncated ones are completed before being read
+               filepath = self.get_file(date=date,receiver=receiver,
+                                        data_directory=data_directory,
+                    filename=filename,verbose=verbose)
+               if (filepath is None): return None
+
+          key = None ; data = None
+          if (prep) and (cache is not None):
+               key = cache.get_key(filepath,receiver=self.get_rec(filepath),
+                                   provider=self.provider,
+                                   dB=dB,interpolate=interpolate)
+               data = cache.load(key)
+               if (data is not None) and (verbose):
+                    print "%s loaded from cache" % filepath
 
-          if (delete_file):
+          if (data is None):
+               data = self.read_file(filepath,verbose=verbose,mmap=mmap)
+               if (prep) and (data is not None):
+                    data = self.prep_data(data,dB=dB,interpolate=interpolate,
+                                          inplace=True)
+                    if (key is not None) and (data is not None):
+                         cache.save(key,data,filename=os.path.basename(filepath))
+
+          if (delete_file) and (mmap):
+               LOG.warning("%s is memory-mapped and will not be deleted",filepath)
+          elif (delete_file):
                if (os.path.isfile(filepath)): 
                     os.remove(filepath)
                     if (verbose): print "%s deleted" % filepath
 		
-          if (prep):
-               return self.prep_data(data,dB=dB,interpolate=interpolate)
-          else:
-               return data	
+          return data	
 
-     def read_lesia(self,filename):
+     def read_lesia(self,filename,mmap=False):
 
           """
           This method reads the ObsParis/LESIA waves data file.
@@ -408,11 +553,14 @@ class wind():
           rec = self.get_rec(filename,provider="lesia")
           ds = self.get_dataset(filename,provider="lesia")
 
-          #with (open(filename,'rb') as frb):
-          #    content = frb.read() 
-
-          #if (rec == "rad1") and (ds == "l2_hres"):
-               
+          if (rec in ["rad1","rad2"]) and (ds == "l2_hres"):
+               if (mmap):
+                    return mmap_l2_hres(filename)
+               else:
+                    return read_l2_hres(filename)
+          else:
+               LOG.error("%s data set not available yet!",ds)
+               return None
           
 	
      def read_gsfc(self,filename):
@@ -424,23 +572,22 @@ class wind():
           basename = os.path.basename(filename)
           if (basename.endswith("Z")):
                ext=basename.split(".")[-2].lower()
-               cmd=["gzip","-dc",filename]
-               gzip_process = subprocess.Popen(cmd,stdin=subprocess.PIPE,
-                                               stdout=subprocess.PIPE)
-               output, error = gzip_process.communicate()
-               if (gzip_process.wait() == 0):
-                    file_content=output.split("\n")[0:-1]
           else:
                ext=basename.split(".")[-1].lower()
-               fr = open(file,'r')
-               file_content = fr.read().split("\n")[0:-1]
-               fr.close()		
-               nf = len(file_content)
-               nt = len(file_content[0].split())
-               array = np.zeros((nt,nf),dtype=np.float32)	
-               for i,line in enumerate(file_content):	
-                    array[:,i] = np.float32(line.split())
-               nt -=1
+
+          if (ext == "r1"):
+               nf = RAD1_FREQ_NUM
+          elif (ext == "r2"):
+               nf = RAD2_FREQ_NUM
+          elif (ext == "tnr"):
+               nf = TNR_FREQ_NUM
+          else:
+               return None
+
+          # Last row contains the background
+          array = read_gsfc_array(filename,nf)
+          if (array is None): return None
+          nt = array.shape[0] - 1
 	
           dt=60.0 #sec
           time = dt*np.arange(nt,dtype=np.float32)	
@@ -497,17 +644,27 @@ class wind():
      def prep_data(self,data,
                    quantile=0.1,nbins=1000,
                    interpolate=False,dB=False,
-                   substract_background=False):
+                   substract_background=False,
+                   inplace=False):
           """
           This method preprocesses data (e.g., substract background).
+          If inplace is True, the input data are modified and
+          returned, instead of working on a copy.
           """
 
           prov = self.provider
-          prep_data = deepcopy(data)
           array = data.get_parameter("intensity")
+          if (inplace):
+               prep_data = data
+          else:
+               # Copy everything but the intensity array, which is not modified
+               prep_data = deepcopy(data,{id(array):array})
           nt = data.naxis[0] ; nf = data.naxis[1]
           frequency = data.get_parameter("frequency")
           background = data.get_parameter("background")
+          if (background is None):
+               # Background spectrum estimated from the intensity histograms
+               background = get_background(array,quantile,nbins=nbins)
           int_time = data.get_parameter("integration_time")
           bandwidth = data.get_parameter("bandwidth")
           rms = 1./np.sqrt(int_time*bandwidth)
@@ -517,18 +674,30 @@ class wind():
                     where_ok = np.where(background > 0.0)
                     background=barycentric_interpolate(frequency[where_ok],background[where_ok],
                                                        frequency)
-	       snr = np.zeros((nt,nf),dtype=np.float32)
-               for j in range(nf):
-                    array_j = array[:,j]*background[j]
-                    if (sum(array_j) == 0.0): continue
-                    array_j = array_j - background[j]
-                    snr[:,j] = array_j/(background[j]*rms)
-                    if (substract_background):
-                         array[:,j]=array_j
-	
+
+               # Frequency channels are processed all at once,
+               # using the float32 arithmetic of the intensity array
+               snr = np.multiply(array,background.astype(np.float32))
+               valid = (snr.sum(axis=0) != 0.0)
+               np.subtract(snr,background.astype(np.float32),out=snr)
+               if (substract_background):
+                    if (inplace):
+                         np.copyto(array,snr,where=valid)
+                    else:
+                         array = np.where(valid,snr,array)
+               norm = (background.astype(np.float64)*rms).astype(np.float32)
+               norm[~valid] = 1.0
+               np.divide(snr,norm,out=snr)
+               snr[:,~valid] = 0.0
+
+               intensity_units = data.get_parameter("intensity_units")
                if (dB):
-                    array = to_dB(array.clip(MIN_VAL,array.max()))
-                    snr = to_dB(snr.clip(MIN_VAL,snr.max()))
+                    if (inplace) or (substract_background):
+                         array = np.clip(array,MIN_VAL,array.max(),out=array)
+                    else:
+                         array = array.clip(MIN_VAL,array.max())
+                    array = to_dB(array,inplace=True)
+                    snr = to_dB(np.clip(snr,MIN_VAL,snr.max(),out=snr),inplace=True)
                     background = to_dB(background.clip(MIN_VAL,background.max()))
                     if (substract_background):
                          intensity_units = "Intensity (dB)"
@@ -672,58 +841,234 @@ def download_file(url,
                   password=None,
 		  overwrite=False,
 		  verbose=True):
-     if (verbose): print "Downloading %s..." % url				  
-     target=None
-     for i in range(tries):
-          try:
-               if (username is not None):
-                    url_items=urlparse(url)
-                    url = url_items.scheme + "://" + username
-                    if (password is not None):
-                         url+= ":" + password
-                    url+="@"+url_items.netloc+url_items.path
-                     
-               connect = urllib2.urlopen(url,None,timeout)
-          except urllib2.URLError,why:
-               if (verbose): print "Can not reach %s: %s [%s tries remaining]" % (url,why,tries-i)
-               time.sleep(timesleep)
-               continue
-          else:	
-               if not (output_filename): output_filename = os.path.basename(url)
-               target = os.path.join(target_directory,output_filename)
-               if not (os.path.isfile(target)) or (overwrite):
-                    fw = open(target,'wb')
-                    fw.write(connect.read())
-                    fw.close()
-                    if (verbose): print "%s saved" % target
-               else:
-                    if (verbose): print "%s already exists" % target
-                    break
-			
+     if (verbose): print "Downloading %s..." % url
+     if not (output_filename): output_filename = os.path.basename(urlparse(url).path)
+
+     # The file is streamed by chunks, and the connection is kept for the next files.
+     # An existing file is only downloaded again (or completed) if it does not
+     # match the download manifest of target_directory.
+     target = fetch_url(url,target_directory=target_directory,
+                        output_filename=output_filename,
+                        username=username,password=password,
+                        tries=tries,timeout=timeout,timesleep=timesleep,
+                        overwrite=overwrite)
+     if (verbose):
+          if (target is None):
+               print "Can not download %s!" % url
+          else:
+               print "%s ready" % target
      return target
 	
-# Method to compute the 100*Q% quantile of a set X of values
-def get_quantile(X,Q,nbins=None,dX=None):
-	nX = len(X)
-	if (dX is None):
-		dX=2.0*np.median(abs(diff(X)))
-	
-	if (nbins is None):
-		nbins=int((max(X)-min(X))/dX) + 1
-		
-	h, xh = np.histogram(X,bins=nbins)	
-	threshold=Q*sum(h)
-	i=0 ; hsum=0.0 ; nh = len(h)
-	while (hsum < threshold):
-		hsum+=h[i]
-		i+=1
-		if (i == (nh)): break
+# Method to decompress a unix compress (.Z) file content on the fly,
+# without gzip (see read_chunks).
+# The compressed content is read by blocks of chunk_size octets, and
+# decoded data are yielded by chunks of about chunk_size octets.
+# (Adapted from the ncompress LZW decoder.)
+def unlzw(fileobj,chunk_size=CHUNK_SIZE):
+     header = fileobj.read(3)
+     if (len(header) < 3) or (header[0:2] != LZW_MAGIC):
+          raise IOError("Not a compress (.Z) file!")
+     maxbits = ord(header[2]) & 0x1f
+     block_mode = ord(header[2]) & 0x80
+     if (maxbits < 9) or (maxbits > 16):
+          raise IOError("Wrong compress (.Z) file header!")
+     maxmaxcode = 1 << maxbits
 
-	return xh[i-1]
+     data = bytearray() ; nbytes = 0 ; eof = False
 
+     table = [chr(i) for i in range(256)] + [""]*(maxmaxcode - 256)
+     n_bits = 9 ; maxcode = (1 << n_bits) - 1 ; bitmask = maxcode
+     free_ent = 257 if (block_mode) else 256
+     posbits = 0 ; base = 0
+     oldcode = -1 ; finchar = ""
+     output = [] ; noutput = 0
+     while (True):
+          if (posbits + n_bits > 8*nbytes):
+               if (eof): break
+               # Drop the octets already decoded and read the next block
+               # (the last 3 octets of data are padding)
+               i = min(posbits >> 3,nbytes)
+               data = data[i:nbytes]
+               posbits -= 8*i ; base -= 8*i
+               block = fileobj.read(chunk_size)
+               eof = not (block)
+               data.extend(block)
+               nbytes = len(data)
+               data.extend("\x00\x00\x00")
+               continue
+
+          if (free_ent > maxcode):
+               # Codes are written by groups of 8, skip the end of the group
+               group = n_bits << 3
+               posbits = base + (posbits - base + group - 1)//group*group
+               base = posbits
+               n_bits += 1
+               maxcode = maxmaxcode if (n_bits == maxbits) else (1 << n_bits) - 1
+               bitmask = (1 << n_bits) - 1
+               continue
+
+          i = posbits >> 3
+          code = ((data[i] | (data[i+1] << 8) | (data[i+2] << 16)) >> (posbits & 7)) & bitmask
+          posbits += n_bits
+
+          if (oldcode == -1):
+               if (code >= 256): raise IOError("Corrupt compress (.Z) file!")
+               oldcode = code ; finchar = table[code]
+               output.append(finchar) ; noutput += 1
+               continue
+
+          if (code == 256) and (block_mode):
+               group = n_bits << 3
+               posbits = base + (posbits - base + group - 1)//group*group
+               base = posbits
+               n_bits = 9 ; maxcode = (1 << n_bits) - 1 ; bitmask = maxcode
+               free_ent = 256
+               continue
+
+          if (code < free_ent):
+               entry = table[code]
+          elif (code == free_ent):
+               entry = table[oldcode] + finchar
+          else:
+               raise IOError("Corrupt compress (.Z) file!")
+          finchar = entry[0]
+          if (free_ent < maxmaxcode):
+               table[free_ent] = table[oldcode] + finchar
+               free_ent += 1
+          oldcode = code
+
+          output.append(entry) ; noutput += len(entry)
+          if (noutput >= chunk_size):
+               yield "".join(output)
+               output = [] ; noutput = 0
+     if (output): yield "".join(output)
+
+# Method to decompress a unix compress (.Z) file with gzip -dc,
+# decoded data being read by chunks from its standard output.
+# The error messages of gzip go to a temporary file, so that gzip
+# can not block on a full stderr pipe while its output is read.
+# Returns None if gzip can not be run.
+def gunzip_lzw(filename,chunk_size=CHUNK_SIZE):
+     stderr = tempfile.TemporaryFile()
+     try:
+          gzip_process = subprocess.Popen(["gzip","-dc",filename],
+                                          stdout=subprocess.PIPE,
+                                          stderr=stderr,
+                                          bufsize=-1)
+     except OSError:
+          stderr.close()
+          return None
+     return gzip_chunks(gzip_process,stderr,chunk_size)
+
+def gzip_chunks(gzip_process,stderr,chunk_size):
+     try:
+          while (True):
+               chunk = gzip_process.stdout.read(chunk_size)
+               if not (chunk): break
+               yield chunk
+          if (gzip_process.wait() != 0):
+               stderr.seek(0)
+               raise IOError("gzip -dc failed: %s" % (stderr.read().strip()))
+     finally:
+          if (gzip_process.poll() is None):
+               gzip_process.kill()
+               gzip_process.wait()
+          gzip_process.stdout.close()
+          stderr.close()
+
+# Method to read a data file content by chunks,
+# decompressing it in the process if required (gzip or compress format).
+# compress files are decompressed by gzip -dc if available
+# (about 20 times faster than unlzw).
+def read_chunks(filename,chunk_size=CHUNK_SIZE):
+     with open(filename,'rb') as fr:
+          magic = fr.read(2)
+          fr.seek(0)
+          if (magic == LZW_MAGIC):
+               chunks = gunzip_lzw(filename,chunk_size=chunk_size)
+               if (chunks is None):
+                    chunks = unlzw(fr,chunk_size=chunk_size)
+               for chunk in chunks:
+                    yield chunk
+               return
+          if (magic == GZIP_MAGIC):
+               fr = gzip.GzipFile(fileobj=fr,mode='rb')
+          while (True):
+               chunk = fr.read(chunk_size)
+               if not (chunk): break
+               yield chunk
+
+# Method to read a nasa/gsfc waves data file (compressed or not) into a
+# [nt+1,nf] float32 array. Each line of the file contains the nt+1
+# values (last is the background) of one of the nf frequencies.
+def read_gsfc_array(filename,nf,chunk_size=CHUNK_SIZE):
+     array = None ; ncol = 0 ; nline = 0 ; remain = ""
+     try:
+          chunks = read_chunks(filename,chunk_size=chunk_size)
+          for chunk in chunks:
+               chunk = remain + chunk
+               iend = chunk.rfind("\n") + 1
+               remain = chunk[iend:]
+               lines = chunk[0:iend].strip()
+               if not (lines): continue
+               if (array is None):
+                    ncol = len(lines.split("\n",1)[0].split())
+                    array = np.empty((ncol,nf),dtype=np.float32)
+               values = np.fromstring(lines,dtype=np.float32,sep=" ")
+               n = values.size//ncol
+               if (values.size != n*ncol) or (nline + n > nf):
+                    LOG.error("Wrong number of values in %s!",filename)
+                    return None
+               array[:,nline:nline+n] = values.reshape(n,ncol).T
+               nline += n
+          if (remain.strip()):
+               values = np.fromstring(remain,dtype=np.float32,sep=" ")
+               if (array is None):
+                    ncol = values.size
+                    array = np.empty((ncol,nf),dtype=np.float32)
+               if (values.size != ncol) or (nline >= nf):
+                    LOG.error("Wrong number of values in %s!",filename)
+                    return None
+               array[:,nline] = values
+               nline += 1
+     except (IOError,EOFError), why:
+          LOG.error("Can not read %s: %s",filename,why)
+          return None
+
+     if (nline != nf):
+          LOG.error("%s contains %i frequencies (%i expected)!",filename,nline,nf)
+          return None
+     return array
+
+# Method to benchmark the reading of a list of nasa/gsfc waves data files
+# (e.g., a month of files). Each file is read in a forked process,
+# in order to get its own wall time and peak RSS.
+def benchmark_read_gsfc(filelist):
+     import resource
+     reader = wind(provider="gsfc",verbose=False)
+     timing = []
+     for filename in filelist:
+          t0 = time.time()
+          pid = os.fork()
+          if (pid == 0):
+               data = reader.read_gsfc(filename)
+               os._exit(0 if (data is not None) else 1)
+          pid, status, rusage = os.wait4(pid,0)
+          elapsed = time.time() - t0
+          timing.append((filename,elapsed,rusage.ru_maxrss/1024.0,status == 0))
+          print "%s: %.3f sec., peak RSS %.1f MB%s" % (os.path.basename(filename),
+                                                      elapsed,rusage.ru_maxrss/1024.0,
+                                                      "" if (status == 0) else " (failed)")
+     if (timing):
+          print "Total: %i file(s) in %.3f sec." % (len(timing),sum([t[1] for t in timing]))
+     return timing
 
 # Method to convert in dB
-def to_dB(array):
+# (if inplace is True, the input array is overwritten)
+def to_dB(array,inplace=False):
+	if (inplace) and (isinstance(array,np.ndarray)):
+		np.log10(array,out=array)
+		return np.multiply(10.0,array,out=array)
 	arr = np.log10(np.array(array))
 	ylog=np.multiply(10.0,arr)
 	return ylog
@@ -767,3 +1112,10 @@ def setup_logging(filename = None, quiet = False, verbose = False, debug = False
                fh.setLevel(logging.INFO)
 		
           logging.root.addHandler(fh)
+
+if (__name__ == "__main__"):
+     if (len(sys.argv) > 1):
+          benchmark_read_gsfc(sys.argv[1:])
+     else:
+          print "Python library to get and read Wind/Waves data."
+          print "Usage: python waves.py YYYYMMDD.R2.Z [...] (benchmark of read_gsfc)"
@@ -0,0 +1,637 @@
+#! /usr/bin/env python
+# -*- coding: latin-1 -*-
+
+"""
+Python module providing a NumPy version of the RABAT3 detection methods
+(see the src/rabat3_*.pro IDL routines).
+Arrays are [nt,nf] numpy arrays, i.e. array[i,j] is the IDL array[i,j],
+and computations are done in single precision as in IDL,
+in order to return the same detections.
+@author: X.Bonnin (LESIA)
+"""
+
+__author__="Xavier Bonnin"
+__date__="18-OCT-2026"
+__version__="1.00"
+
+import numpy as np
+from scipy.ndimage import minimum_filter1d
+
+# Available detection methods
+METHODS = ["LIG","SHT"]
+
+# Maximal number of elements of the [nX,nY,nZ] arrays
+# computed at a time by compute_sht
+CHUNK_SIZE = 4194304
+
+# Number of extra samples around the local background window
+# that must not contain missing time samples
+MISS_MARGIN = 5
+
+
+# Method to round values as IDL does (half away from zero)
+def idl_round(x):
+    x = np.asarray(x,dtype=np.float64)
+    return np.where(x >= 0.0,np.floor(x + 0.5),np.ceil(x - 0.5)).astype(np.int64)
+
+# Method to compute the median as IDL does without /EVEN
+def idl_median(x):
+    x = np.sort(np.ravel(x))
+    return x[len(x)//2]
+
+# Method to compute the derivative of a regularly sampled vector
+# (3-point Lagrangian interpolation, as the IDL deriv function)
+def deriv(x):
+    x = np.asarray(x)
+    if not (np.issubdtype(x.dtype,np.floating)): x = x.astype(np.float32)
+    two = x.dtype.type(2.0)
+    d = np.empty_like(x)
+    d[1:-1] = (x[2:] - x[0:-2])/two
+    d[0] = (x.dtype.type(-3.0)*x[0] + x.dtype.type(4.0)*x[1] - x[2])/two
+    d[-1] = (x.dtype.type(3.0)*x[-1] - x.dtype.type(4.0)*x[-2] + x[-3])/two
+    return d
+
+def get_localmax(array):
+
+    """
+    Method to get the local maxima of a 2d array along its first dimension
+    (i.e., the time axis), as get_localmax.pro does.
+    Inputs:
+      array - 2d numpy array [nt,nf]
+    Outputs:
+      localmax - 2d boolean array [nt,nf], True for the local maxima,
+                 or None if the array is smaller than [3,3].
+    Author: Xavier Bonnin (LESIA)
+    """
+
+    array = np.asarray(array)
+    nx, ny = array.shape
+    if (nx < 3) or (ny < 3): return None
+
+    localmax = np.zeros((nx,ny),dtype=bool)
+    localmax[1:-1,:] = (array[1:-1,:] > array[0:-2,:]) & (array[1:-1,:] > array[2:,:])
+    localmax[0,:] = (array[0,:] > array[1,:])
+    # As in IDL, the last point flags the sample before it
+    localmax[-2,:] |= (array[-1,:] > array[-2,:])
+    return localmax
+
+def local_background(s,k,
+                     where_miss=None):
+
+    """
+    Method to remove the local background from a time series s,
+    where the local background lbg[i] is the minimum of s over [i-k,i+k].
+    Samples for which a missing time sample is found within
+    [i-k-MISS_MARGIN,i+k+MISS_MARGIN] are set to 0.
+    Inputs:
+      s          - 1d numpy array [nt]
+      k          - half width of the running window
+      where_miss - 1d boolean array [nt], True for missing time samples
+                   (first and last samples are always missing)
+    Outputs:
+      s3, lbg - s minus its local background, and the local background
+    Author: Xavier Bonnin (LESIA)
+    """
+
+    s = np.asarray(s)
+    nt = len(s)
+    k = int(k)
+
+    miss = np.zeros(nt,dtype=bool)
+    if (where_miss is not None): miss[:] = where_miss
+    miss[0] = True ; miss[-1] = True
+    cmiss = np.concatenate([[0],np.cumsum(miss)])
+    i = np.arange(nt)
+    lo = np.clip(i - k - MISS_MARGIN,0,nt-1)
+    hi = np.clip(i + k + MISS_MARGIN,0,nt-1)
+    valid = (cmiss[hi+1] - cmiss[lo] == 0)
+
+    lbg = np.zeros(nt,dtype=s.dtype) ; s3 = np.zeros(nt,dtype=s.dtype)
+    if (valid.any()):
+        # Clipped windows give the same minimum as edge-repeated ones
+        lbg[valid] = minimum_filter1d(s,2*k+1,mode="nearest")[valid]
+        s3[valid] = s[valid] - lbg[valid]
+    return s3, lbg
+
+def rabat3_thresholding(x,threshold,
+                        get_max=False,
+                        get_mid=False):
+
+    """
+    Method to get the samples of x above the threshold,
+    as rabat3_thresholding.pro does.
+    If get_max or get_mid is True, consecutive samples are regrouped
+    and only the maximum (or the middle sample) of each group is returned.
+    Inputs:
+      x         - 1d numpy array
+      threshold - threshold value
+    Outputs:
+      indices - 1d array of indices (empty if no sample is found)
+    Author: Xavier Bonnin (LESIA)
+    """
+
+    x = np.asarray(x)
+    w = np.flatnonzero(x > threshold)
+    if not (get_max or get_mid) or (len(w) == 0): return w
+
+    # Groups of consecutive samples
+    start = np.flatnonzero(np.concatenate([[True],np.diff(w) != 1]))
+    count = np.diff(np.concatenate([start,[len(w)]]))
+    if (get_max):
+        xw = x[w]
+        group = np.repeat(np.arange(len(start)),count)
+        xmax = np.maximum.reduceat(xw,start)
+        # First maximum of each group
+        first = np.flatnonzero(xw == xmax[group])
+        group_first, ifirst = np.unique(group[first],return_index=True)
+        return w[first[ifirst]]
+    else:
+        return w[start + (count - 1)//2]
+
+def compute_sht(array,X=None,Y=None,Z=None,
+                chunk_size=CHUNK_SIZE):
+
+    """
+    Method to compute the sweeping Hough transform of a 2d array
+    (see Lobzin et al., SW, 2009), as compute_sht.pro does
+    (without time window, i.e. sigma=0).
+    The transform is computed chunk by chunk over the Z axis,
+    so that the full [nX,nY,nZ] cube is never stored.
+    Inputs:
+      array - 2d numpy array [nX,nY]
+      X     - Vector of the first dimension coordinates (i.e., time)
+      Y     - Vector of the second dimension coordinates (i.e., frequency)
+      Z     - Vector of the delays
+    Outputs:
+      sht - 2d array [nX,nZ] containing the sweeping Hough transform
+    Author: Xavier Bonnin (LESIA)
+    """
+
+    array = np.asarray(array)
+    nX, nY = array.shape
+    if (X is None): X = np.arange(nX,dtype=np.float32)
+    if (Y is None): Y = np.arange(nY,dtype=np.float32)
+    if (Z is None): Z = np.arange(nX,dtype=np.float32)
+    nZ = len(Z)
+
+    dX = np.float32(idl_median(deriv(X)))
+    dZ = np.float32(idl_median(deriv(Z))) if (nZ > 2) else dX
+    dk = np.arange(nZ,dtype=np.float32)*np.float32(dZ/dX)
+    dj = np.arange(nY,dtype=np.float32)/np.float32(nY - 1.0)
+    Zoffset = np.float32(long(np.min(Z)/dX))
+
+    # Array = 0 at time edges
+    arr = np.array(array,dtype=np.float32)
+    arr[0,:] = 0 ; arr[-1,:] = 0
+    arr = arr.ravel()
+
+    i = np.arange(nX,dtype=np.float32)[:,np.newaxis,np.newaxis]
+    j = np.arange(nY)[np.newaxis,:,np.newaxis]
+    sht = np.empty((nX,nZ),dtype=np.float32)
+    nk = max(chunk_size//(nX*nY),1)
+    for k0 in range(0,nZ,nk):
+        k1 = min(k0 + nk,nZ)
+        di = i + dj[np.newaxis,:,np.newaxis]*(dk[np.newaxis,np.newaxis,k0:k1] + Zoffset)
+        ldi = np.clip(idl_round(di),0,nX-1)
+        sht[:,k0:k1] = arr[ldi*nY + j].sum(axis=1)
+    return sht
+
+def detect_sht(intensity,time,freq,threshold,
+               sweep_step=0,
+               missing_pix=None,
+               k=None):
+
+    """
+    Method to detect type III bursts using a sweeping Hough transform,
+    as rabat3_detect_sht.pro does.
+    Inputs:
+      intensity   - 2d numpy array [nt,nf] (dynamical spectrum)
+      time        - Vector of times (seconds)
+      freq        - Vector of frequencies (MHz)
+      threshold   - Scalar providing the threshold value
+      sweep_step  - Number of steps of the sweeping (default is 0)
+      missing_pix - Indices of the missing pixels in the IDL [nt,nf] array
+                    (i.e., i + nt*j) ; as in IDL, out of range indices are clipped.
+      k           - Local background is computed over [i-k,i+k]
+                    (default is sweep_step)
+    Outputs:
+      iburst, lvl_trust, delay_at_max - Indices of the bursts along the time axis,
+                                        the level of trust of the detections,
+                                        and the delay at the maximum of the
+                                        transform for each time sample.
+    Author: Xavier Bonnin (LESIA)
+    """
+
+    empty = np.zeros(0,dtype=np.int64)
+    time = np.asarray(time,dtype=np.float32)
+    threshold = np.float32(threshold)
+    nt = len(time) ; nf = len(freq)
+    sstep = long(sweep_step)
+    if not (k): k = sstep
+
+    imax = get_localmax(intensity)
+    if (imax is None) or not (imax.any()):
+        return empty, np.zeros(0,dtype=np.float32), np.zeros(nt,dtype=np.float32)
+    mask = imax.astype(np.float32)
+
+    if (sstep == 0):
+        s = mask.sum(axis=1,dtype=np.float32)
+        delay_at_max = np.zeros(nt,dtype=np.float32)
+    else:
+        dt = abs(idl_round(idl_median(deriv(time))))
+        delay = np.float32(dt)*np.arange(sstep,dtype=np.float32)
+        sht = compute_sht(mask,X=time,Y=np.asarray(freq,dtype=np.float32),Z=delay)
+        jmax = sht.argmax(axis=1)
+        s = sht[np.arange(nt),jmax]
+        delay_at_max = delay[jmax]
+
+    where_miss = None
+    if (missing_pix is not None) and (len(missing_pix) > 0):
+        amiss = np.ones(nt*nf,dtype=bool)
+        amiss[np.clip(missing_pix,0,nt*nf-1)] = False
+        where_miss = ~amiss.reshape(nf,nt).any(axis=0)
+
+    # Remove local background from s
+    s3, lbg = local_background(s,k,where_miss=where_miss)
+
+    iburst = rabat3_thresholding(s3,threshold,get_max=True)
+    if (len(iburst) == 0):
+        return empty, np.zeros(0,dtype=np.float32), delay_at_max
+    lvl_trust = ((np.float32(-0.5)/threshold)*s3[iburst] + np.float32(1.0))*np.float32(100.0)
+    lvl_trust = np.maximum(lvl_trust,np.float32(0.0))
+    return iburst, lvl_trust, delay_at_max
+
+def pixel_gradient(array):
+
+    """
+    Method to compute the Sobel gradients of a zero-padded array,
+    as pixel_gradient.pro does.
+    Inputs:
+      array - numpy array [...,nt,nf] ; the gradients are computed
+              over the last two dimensions.
+    Outputs:
+      xgrad, ygrad - the gradients along the second (frequency)
+                     and the first (time) dimension of the 2d arrays.
+    Author: Xavier Bonnin (LESIA)
+    """
+
+    array = np.asarray(array,dtype=np.float32)
+    nt, nf = array.shape[-2:]
+    pad = [(0,0)]*(array.ndim - 2) + [(1,1),(1,1)]
+    img = np.pad(array,pad,mode="constant")
+    two = np.float32(2.0)
+
+    # Neighbours of each pixel (same order as in IDL)
+    def p(di,dj):
+        return img[...,1+di:1+di+nt,1+dj:1+dj+nf]
+
+    xgrad = ((p(-1,1) + two*p(0,1)) + p(1,1)) - ((p(-1,-1) + two*p(0,-1)) + p(1,-1))
+    ygrad = ((p(1,-1) + two*p(1,0)) + p(1,1)) - ((p(-1,-1) + two*p(-1,0)) + p(-1,1))
+    return xgrad, ygrad
+
+# Method to interpolate linearly a vector as the IDL interpol function does
+# (i.e., linear extrapolation outside of the x range)
+def interpol(v,x,u):
+    v = np.asarray(v) ; x = np.asarray(x,dtype=np.float64) ; u = np.asarray(u,dtype=np.float64)
+    i = np.clip(np.searchsorted(x,u,side="right") - 1,0,len(x)-2)
+    w = ((u - x[i])/(x[i+1] - x[i])).astype(v.dtype)
+    return v[...,i] + w*(v[...,i+1] - v[...,i])
+
+def detect_lig(intensity,time,freq,threshold,
+               model_param=None):
+
+    """
+    Method to detect type III bursts using the local intensity gradient,
+    as rabat3_detect_lig.pro does.
+    Several frequency bands can be processed in one call.
+    Inputs:
+      intensity   - numpy array [nt,nf] (dynamical spectrum), or
+                    [nband,nt,nf] for several frequency bands
+      time        - Vector of times (seconds)
+      freq        - Vector of frequencies (MHz) of the band(s)
+      threshold   - Scalar providing the threshold value
+      model_param - [time_resolution,time_window,amplitude] of the
+                    sinusoidal model (default is [1.0,180.0,90.0])
+    Outputs:
+      iburst, lvl_trust - Indices of the bursts along the time axis,
+                          and the level of trust of the detections
+                          (concatenated band after band).
+    Author: Xavier Bonnin (LESIA)
+    """
+
+    intensity = np.asarray(intensity,dtype=np.float32)
+    if (intensity.ndim == 2): intensity = intensity[np.newaxis,:,:]
+    nband, nt, nf = intensity.shape
+    time = np.asarray(time,dtype=np.float32)
+    threshold = np.float32(threshold)
+    if (model_param is None) or not (np.any(model_param)):
+        mparam = np.array([1.0,180.0,90.0],dtype=np.float32)
+    else:
+        mparam = np.asarray(model_param[0:3],dtype=np.float32)
+    dt = np.float32(idl_median(deriv(time)))
+    dx = mparam[0]
+
+    # Gradient direction angle in degrees, averaged over each band
+    xgrad, ygrad = pixel_gradient(intensity)
+    theta = np.arctan2(ygrad,xgrad)*np.float32(180.0/np.pi)
+    mth = (theta.sum(axis=2,dtype=np.float64)/nf).astype(np.float32)
+
+    if (dx != dt):
+        nx = long((time.max() - time.min())/dx) + 1
+        x = dx*np.arange(nx,dtype=np.float32) + time.min()
+        mth = interpol(mth,time,x)
+    else:
+        nx = nt
+
+    # Least squares root between mth and the model over a sliding window
+    nx_mod = long(mparam[1]/dx)
+    ymodel = np.float32(90.0)*np.cos(np.float32(np.pi)*np.arange(nx_mod)/np.float32(nx_mod - 1))
+    ix2 = nx_mod//2
+    nxm = nx - nx_mod
+    window = np.lib.stride_tricks.as_strided(mth,
+                                             shape=(nband,nxm,nx_mod),
+                                             strides=mth.strides + mth.strides[-1:])
+    lsr = np.sqrt(np.nansum((window - ymodel)**2,axis=2)).astype(np.float32)
+    lsr = interpol(lsr,np.arange(nxm),np.arange(nt))
+
+    # Bands are separated by a -inf sample, so that the groups
+    # of consecutive samples do not overlap two bands
+    xlsr = np.empty((nband,nt+1),dtype=np.float32)
+    xlsr[:,0:nt] = lsr ; xlsr[:,nt] = -np.inf
+    iburst = rabat3_thresholding(xlsr.ravel(),threshold,get_max=True)
+    if (len(iburst) == 0):
+        return np.zeros(0,dtype=np.int64), np.zeros(0,dtype=np.float32)
+    lsr = xlsr.ravel()[iburst]
+    lvl_trust = ((np.float32(-0.5)/threshold)*lsr + np.float32(1.0))*np.float32(100.0)
+    lvl_trust = np.maximum(lvl_trust,np.float32(0.0))
+    # Shift to the window centers, dropping those beyond the last sample
+    iburst = iburst % (nt + 1) + ix2
+    inside = (iburst < nt)
+    return iburst[inside], lvl_trust[inside]
+
+# Method to compute the type III time drift as a function of the frequency
+# (see type3_driftrate_func.pro)
+def type3_driftrate_func(frequency,A):
+    frequency = np.asarray(frequency,dtype=np.float32)
+    A = np.asarray(A,dtype=np.float32)
+    a1 = np.float32(1.0) - A[1]
+    time = (frequency**a1)/(a1*A[0]) - (np.nanmax(frequency)**a1)/(a1*A[0])
+    return time + A[2]
+
+def shift_drift(array,time,freq,drift_param):
+
+    """
+    Method to shift the time axis of each frequency channel
+    in order to compensate the type III drift.
+    Outputs:
+      array, tdrift - the shifted [nt,nf] array, and the time drift
+                      of each frequency channel.
+    """
+
+    nt, nf = array.shape
+    dt = abs(idl_median(deriv(np.asarray(time,dtype=np.float32))))
+    tdrift = type3_driftrate_func(freq,list(drift_param) + [0.0])
+    idrift = np.trunc(-tdrift/dt).astype(np.int64)
+    rows = (np.arange(nt)[:,np.newaxis] - idrift[np.newaxis,:]) % nt
+    return array[rows,np.arange(nf)[np.newaxis,:]], tdrift
+
+def get_config(args,nf=None):
+
+    """
+    Method to convert the arguments read from a rabat3 configuration file
+    (see frc_toolkit.parse_configfile) into typed values.
+    If the number of frequencies nf is given, NF_BAND must not exceed it.
+    Raises ValueError if an argument is not valid.
+    """
+
+    def get_values(name,n):
+        values = str(args.get(name) or "").split(",")
+        values = [float(val) for val in values if val.strip()]
+        return (values + [0.0]*n)[0:n]
+
+    config = {}
+    config["METHOD"] = str(args.get("METHOD","")).strip().upper()
+    nf_band = str(args.get("NF_BAND") or "").strip()
+    if not (nf_band):
+        raise ValueError("NF_BAND is not defined in the configuration!")
+    config["NF_BAND"] = int(float(nf_band))
+    if (config["NF_BAND"] < 2):
+        raise ValueError("NF_BAND must be at least 2 (%i given)!" % (config["NF_BAND"]))
+    if (nf is not None) and (config["NF_BAND"] > nf):
+        raise ValueError("NF_BAND (%i) exceeds the number of frequencies (%i)!" %
+                         (config["NF_BAND"],nf))
+    config["THRESHOLD"] = np.float32(args.get("THRESHOLD",0.0))
+    config["DRIFT_PARAM"] = get_values("DRIFT_PARAM",2)
+    config["MODEL_PARAM"] = get_values("MODEL_PARAM",3)
+    config["SWEEP_STEP"] = long(float(args.get("SWEEP_STEP") or 0.0))
+    return config
+
+def rabat3_detection(array,time,freq,args,
+                     missing=None):
+
+    """
+    Method to run the rabat3 detection on a dynamical spectrum,
+    using the sliding frequency band loop of rabat3_processing.pro.
+    Inputs:
+      array   - 2d numpy array [nt,nf] (dynamical spectrum)
+      time    - Vector of times (seconds)
+      freq    - Vector of frequencies (MHz)
+      args    - Dictionary of the configuration arguments
+                (as returned by frc_toolkit.parse_configfile)
+      missing - 2d boolean array [nt,nf], True for the missing pixels
+    Outputs:
+      burst_indices, lvl_trust, burst_delay - Indices of the bursts along the time axis,
+                                              the level of trust and the delay
+                                              of each detection (sorted by indices).
+    Author: Xavier Bonnin (LESIA)
+    """
+
+    array = np.asarray(array,dtype=np.float32)
+    time = np.asarray(time,dtype=np.float32)
+    freq = np.asarray(freq,dtype=np.float32)
+    nt, nf = array.shape
+
+    config = get_config(args,nf=nf)
+    method = config["METHOD"]
+    if (method not in METHODS):
+        raise ValueError("Unknown detection method %s, available methods are: %s" %
+                         (method,", ".join(METHODS)))
+
+    missing_pix = None
+    if (missing is not None): missing_pix = np.flatnonzero(np.asarray(missing).T)
+
+    if (config["DRIFT_PARAM"][0] != 0.0) or (config["DRIFT_PARAM"][1] != 0.0):
+        array, tdrift = shift_drift(array,time,freq,config["DRIFT_PARAM"])
+
+    # Overlapping frequency bands [n_band,nt,nf_band] (no copy)
+    nf_band = config["NF_BAND"]
+    df_band = nf_band//2
+    n_band = (nf - nf_band)//df_band + 1
+    bands = np.lib.stride_tricks.as_strided(array,
+                                            shape=(n_band,nt,nf_band),
+                                            strides=(df_band*array.strides[1],) + array.strides)
+
+    burst_indices = [] ; lvl_trust = [] ; burst_delay = []
+    if (method == "LIG"):
+        # All of the bands are processed at once
+        it, lvl = detect_lig(bands,time,freq[0:nf_band],
+                             config["THRESHOLD"],
+                             model_param=config["MODEL_PARAM"])
+        burst_indices.append(it)
+        lvl_trust.append(lvl)
+        burst_delay.append(np.zeros(len(it),dtype=np.float32))
+    else:
+        for j in range(n_band):
+            band = slice(j*df_band,j*df_band + nf_band)
+            it_j, lvl_j, delay_at_max = detect_sht(bands[j],time,freq[band],
+                                                   config["THRESHOLD"],
+                                                   sweep_step=config["SWEEP_STEP"],
+                                                   missing_pix=missing_pix)
+            burst_indices.append(it_j)
+            lvl_trust.append(lvl_j)
+            burst_delay.append(delay_at_max[it_j])
+
+    burst_indices = np.concatenate(burst_indices)
+    lvl_trust = np.concatenate(lvl_trust)
+    burst_delay = np.concatenate(burst_delay)
+    if (len(burst_indices) == 0):
+        return burst_indices, lvl_trust, burst_delay
+
+    # Same as IDL uniq(x,sort(x)): last of the duplicated indices
+    isort = np.argsort(burst_indices,kind="mergesort")
+    sorted_indices = burst_indices[isort]
+    isort = isort[np.concatenate([sorted_indices[1:] != sorted_indices[0:-1],[True]])]
+    return burst_indices[isort], lvl_trust[isort], burst_delay[isort]
+
+# Class to run the rabat3 detection on a stream of contiguous days.
+# Days are concatenated into a rolling buffer with overlap margins,
+# so that bursts close to midnight are seen in one piece, and each day
+# is processed with the end of the previous day and the beginning of
+# the next day. Detections are kept only in the core of each day,
+# so that each burst is returned once, at the index found by a single
+# run over the concatenated days (except in the last margin of the
+# stream, where the drift shift wraps around the buffer, and for LIG
+# if MODEL_PARAM[0] is not the sampling step, since the model grid
+# is then mapped on the time indices from the buffer start).
+class rabat3_stream():
+
+    def __init__(self,args,
+                 margin=None):
+
+        self.args = args
+        self.config = get_config(args)
+        self.margin = margin
+        self.reset()
+
+    def reset(self):
+        # Day waiting for the beginning of the next day
+        self.current = None
+        # End of the day before the current one
+        self.tail = None
+
+    def get_margin(self,time,freq):
+
+        """
+        Return the number of overlap samples on each side of a day,
+        i.e. the time extent used around a sample by the drift shift,
+        the local background, the sweeping and the model fit.
+        """
+
+        if (self.margin is not None): return int(self.margin)
+        config = self.config
+        dt = abs(idl_median(deriv(np.asarray(time,dtype=np.float32))))
+        margin = 2*config["SWEEP_STEP"] + MISS_MARGIN + 10
+        if (config["DRIFT_PARAM"][0] != 0.0) or (config["DRIFT_PARAM"][1] != 0.0):
+            tdrift = type3_driftrate_func(freq,list(config["DRIFT_PARAM"]) + [0.0])
+            margin += int(np.ceil(np.nanmax(np.abs(tdrift))/dt))
+        if (config["METHOD"] == "LIG"):
+            margin += int(np.ceil((config["MODEL_PARAM"][1] or 180.0)/dt))
+        return margin
+
+    def is_contiguous(self,time,freq):
+        if (self.current is None): return True
+        ctime = self.current["time"]
+        if (len(freq) != len(self.current["freq"])) or \
+                (np.any(freq != self.current["freq"])):
+            return False
+        dt = ctime[1] - ctime[0]
+        return (0.0 < time[0] - ctime[-1] <= 1.5*dt)
+
+    def push(self,key,array,time,freq,
+             missing=None):
+
+        """
+        Add a day to the stream.
+        Inputs:
+          key     - Identifier of the day (returned with its detections)
+          array   - 2d numpy array [nt,nf] (dynamical spectrum)
+          time    - Vector of times (seconds from a common origin, e.g.
+                    the first day of the stream)
+          freq    - Vector of frequencies (MHz)
+          missing - 2d boolean array [nt,nf], True for the missing pixels
+        Outputs:
+          days - List of (key, burst_indices, lvl_trust, burst_delay)
+                 for the days that are completed, where burst_indices
+                 are the indices along the time axis of each day.
+        """
+
+        time = np.asarray(time,dtype=np.float64)
+        freq = np.asarray(freq,dtype=np.float32)
+        days = []
+        if not (self.is_contiguous(time,freq)):
+            days.extend(self.flush())
+
+        day = {"key":key,"array":np.asarray(array,dtype=np.float32),
+               "time":time,"freq":freq,"missing":missing}
+        if (self.current is not None):
+            days.append(self.process(self.current,next_day=day))
+        self.current = day
+        return days
+
+    def flush(self):
+
+        """
+        Process the last day of the stream and reset it.
+        """
+
+        days = []
+        if (self.current is not None):
+            days.append(self.process(self.current))
+        self.reset()
+        return days
+
+    def process(self,day,next_day=None):
+
+        nt = len(day["time"])
+        margin = self.get_margin(day["time"],day["freq"])
+        parts = []
+        if (self.tail is not None): parts.append(self.tail)
+        parts.append(day)
+        if (next_day is not None):
+            parts.append(dict((name,(value[0:margin] if (name in ("array","time","missing")) and
+                                     (value is not None) else value))
+                              for name,value in next_day.items()))
+        i0 = (len(self.tail["time"]) if (self.tail is not None) else 0)
+
+        array = np.concatenate([part["array"] for part in parts])
+        time = np.concatenate([part["time"] for part in parts])
+        missing = None
+        if any([part["missing"] is not None for part in parts]):
+            missing = np.concatenate([(part["missing"] if (part["missing"] is not None)
+                                       else np.zeros(part["array"].shape,dtype=bool))
+                                      for part in parts])
+
+        # Times relative to the buffer start keep the single precision
+        burst_indices, lvl_trust, burst_delay = \
+            rabat3_detection(array,time - time[0],day["freq"],self.args,
+                             missing=missing)
+
+        # Keep the detections of the core of the day
+        core = (burst_indices >= i0) & (burst_indices < i0 + nt)
+        burst_indices = burst_indices[core] - i0
+        lvl_trust = lvl_trust[core] ; burst_delay = burst_delay[core]
+
+        self.tail = dict((name,(value[-margin:] if (name in ("array","time","missing")) and
+                                (value is not None) else value))
+                         for name,value in day.items())
+        return day["key"], burst_indices, lvl_trust, burst_delay
@@ -0,0 +1,118 @@
+FUNCTION rabat3_worker_job, data_file, config_file, output_file, QUIET=QUIET
+
+; Run rabat3_processing for a job of rabat3_worker,
+; and return 0 if it succeeded, 1 otherwise.
+
+lun = -1l
+catch,error_status
+if (error_status ne 0) then begin
+    catch,/CANCEL
+    print,'Error running rabat3_processing: '+!ERROR_STATE.MSG
+    ; Release the output file unit, the session being reused for next jobs
+    if (lun gt 0) then free_lun,lun
+    return,1
+endif
+
+rabat3_processing,strsplit(data_file,',',/EXTRACT),config_file,results, $
+                  output_dir=file_dirname(output_file), $
+                  nburst=nburst,QUIET=QUIET
+
+openw,lun,output_file,/GET_LUN
+if (nburst gt 0) then begin
+    rows = struct2csv(results,header=header,separator=';')
+    printf,lun,header
+    for i=0l,n_elements(rows)-1l do printf,lun,rows[i]
+endif
+close,lun
+free_lun,lun
+
+return,0
+END
+
+PRO rabat3_worker, QUIET=QUIET
+
+;+
+; NAME:
+;       rabat3_worker
+;
+; PURPOSE:
+;       Long-lived RABAT3 session, which reads processing jobs
+;       on the standard input and runs rabat3_processing for each of them,
+;       in order to avoid paying the IDL start-up cost for every data file.
+;
+;       The protocol is line-based. Each command line contains fields
+;       separated by a tab character:
+;           RUN<tab>data_file<tab>config_file<tab>output_file
+;           QUIT
+;       The session writes the following tagged lines on the standard output:
+;           @RABAT3@ READY          - when ready to accept a new job
+;           @RABAT3@ DONE status    - at the end of a job (0 if success)
+;       Any other output line is log information about the current job.
+;
+; CATEGORY:
+;       Feature recognition
+;
+; GROUP:
+;       RABAT3
+;
+; CALLING SEQUENCE:
+;       IDL>rabat3_worker
+;
+; INPUTS:
+;       None.
+;
+; OPTIONAL INPUTS:
+;       None.
+;
+; KEYWORD PARAMETERS:
+;       /QUIET - Quiet mode for rabat3_processing.
+;
+; OUTPUTS:
+;       None.
+;
+; OPTIONAL OUTPUTS:
+;       None.
+;
+; COMMON BLOCKS:
+;       None.
+;
+; SIDE EFFECTS:
+;       Feature files are written in the output_file of each job.
+;
+; RESTRICTIONS/COMMENTS:
+;       None.
+;
+; CALL:
+;       rabat3_processing
+;       struct2csv
+;
+; EXAMPLE:
+;       None.
+;
+; MODIFICATION HISTORY:
+;       Written by X.Bonnin,  18-OCT-2026.
+;
+;-
+
+tag = '@RABAT3@ '
+tab = string(9b)
+QUIET = keyword_set(QUIET)
+
+print,tag+'READY' & flush,-1
+line = ''
+while (not eof(0)) do begin
+    readf,0,line
+    fields = strsplit(line,tab,/EXTRACT,/PRESERVE_NULL)
+    command = strupcase(strtrim(fields[0],2))
+    if (command eq 'QUIT') then break
+    if (command ne 'RUN') or (n_elements(fields) lt 4) then begin
+        print,'Unknown command: '+line
+        print,tag+'DONE 1' & flush,-1
+        continue
+    endif
+
+    status = rabat3_worker_job(fields[1],fields[2],fields[3],QUIET=QUIET)
+    print,tag+'DONE '+strtrim(status,2) & flush,-1
+endwhile
+
+END
@@ -0,0 +1,27 @@
+#! /usr/bin/env python
+# -*- coding: latin-1 -*-
+
+"""
+Python module to set the path of the RABAT3 python modules
+for the unit tests, which are run from the root directory with:
+python -m unittest discover -s tests
+@author: X.Bonnin (LESIA)
+"""
+
+__author__="Xavier Bonnin"
+__date__="18-OCT-2026"
+__version__="1.00"
+
+import os, sys
+
+ROOT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Directories of the RABAT3 python modules
+MODULE_DIRECTORIES = [os.path.join(ROOT_DIRECTORY,"lib","python","aux"),
+                      os.path.join(ROOT_DIRECTORY,"lib","python","data"),
+                      os.path.join(ROOT_DIRECTORY,"lib","python","detection"),
+                      os.path.join(ROOT_DIRECTORY,"hfc","prod","wrapper"),
+                      os.path.join(ROOT_DIRECTORY,"hfc","prod","scripts")]
+
+for directory in MODULE_DIRECTORIES:
+    if (directory not in sys.path): sys.path.insert(0,directory)
@@ -0,0 +1,183 @@
+#! /usr/bin/env python
+# -*- coding: latin-1 -*-
+
+"""
+Unit tests of the download_manager module,
+against the local ftp/http servers of hfc/prod/scripts/fake_archive_server.py.
+@author: X.Bonnin (LESIA)
+"""
+
+__author__="Xavier Bonnin"
+__date__="18-OCT-2026"
+__version__="1.00"
+
+import os
+import shutil, tempfile
+import unittest
+import logging
+
+import context
+from download_manager import fetch_url, safe_filename, connection_pool, \
+    get_manifest, DOWNLOAD_LOGGER, PART_EXT
+from fake_archive_server import ftp_archive_server, http_archive_server
+
+logging.getLogger(DOWNLOAD_LOGGER).addHandler(logging.NullHandler())
+
+FILENAME = "20010101.R2.Z"
+FILE_PATH = "/wind_rad2/rad2a/" + FILENAME
+FILE_SIZE = 200000
+
+class safe_filename_test(unittest.TestCase):
+
+    def test_safe_filename(self):
+        self.assertEqual(safe_filename("20010101.R2"),"20010101.R2")
+        self.assertEqual(safe_filename("../../etc/passwd"),"passwd")
+        self.assertEqual(safe_filename("/tmp/x.Z"),"x.Z")
+        self.assertEqual(safe_filename("..\\..\\x.Z"),"x.Z")
+        for filename in [None,"",".","..","../","data/..","  "]:
+            self.assertIsNone(safe_filename(filename))
+
+# Base class of the tests, which serves a random file
+# from a temporary archive directory
+class server_test():
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.archive = os.path.join(self.directory,"archive")
+        self.target_directory = os.path.join(self.directory,"data")
+        os.makedirs(os.path.dirname(self.archive + FILE_PATH))
+        os.makedirs(self.target_directory)
+        self.content = os.urandom(FILE_SIZE)
+        with open(self.archive + FILE_PATH,'wb') as fw:
+            fw.write(self.content)
+        self.server = self.server_class(self.archive).start()
+        self.pool = connection_pool()
+
+    def tearDown(self):
+        self.pool.close()
+        self.server.stop()
+        shutil.rmtree(self.directory)
+
+    def fetch(self,path=FILE_PATH,**kwargs):
+        kwargs.setdefault("tries",1)
+        kwargs.setdefault("timesleep",0)
+        return fetch_url(self.server.url + path,
+                         target_directory=self.target_directory,
+                         pool=self.pool,**kwargs)
+
+    def read(self,filepath):
+        with open(filepath,'rb') as fr:
+            return fr.read()
+
+    def test_fetch(self):
+        target = self.fetch()
+        self.assertEqual(target,os.path.join(self.target_directory,FILENAME))
+        self.assertEqual(self.read(target),self.content)
+        self.assertEqual(get_manifest(self.target_directory).get(target)["SIZE"],FILE_SIZE)
+
+        # The file is not downloaded again
+        ntransfer = self.server.ntransfer
+        self.assertEqual(self.fetch(),target)
+        self.assertEqual(self.server.ntransfer,ntransfer)
+
+    def test_resume(self):
+        self.server.cut = 50000
+        self.assertIsNone(self.fetch())
+        part = os.path.join(self.target_directory,FILENAME + PART_EXT)
+        self.assertEqual(os.path.getsize(part),50000)
+        self.assertFalse(os.path.isfile(os.path.join(self.target_directory,FILENAME)))
+
+        self.server.cut = 0
+        nbytes = self.server.nbytes
+        target = self.fetch()
+        self.assertEqual(self.read(target),self.content)
+        self.assertEqual(self.server.nbytes - nbytes,FILE_SIZE - 50000)
+        self.assertFalse(os.path.isfile(part))
+
+    def test_not_found(self):
+        stats = {}
+        self.assertIsNone(self.fetch(path="/wind_rad2/rad2a/20010102.R2.Z",stats=stats))
+        self.assertTrue(stats["permanent"])
+
+    def test_unknown_size(self):
+        # A transfer of unknown size which ends cleanly is saved and recorded
+        self.server.hide_size = True
+        target = self.fetch()
+        self.assertEqual(self.read(target),self.content)
+        self.assertEqual(get_manifest(self.target_directory).get(target)["SIZE"],FILE_SIZE)
+        self.assertFalse(os.path.isfile(target + PART_EXT))
+
+    def write_local_file(self,nbytes):
+        filepath = os.path.join(self.target_directory,FILENAME)
+        with open(filepath,'wb') as fw:
+            fw.write(self.content[0:nbytes])
+        return filepath
+
+    def test_unverified_local_file(self):
+        # A local file which is not in the manifest is used as it is if it
+        # can not be checked against the remote file, but it is not recorded
+        filepath = self.write_local_file(50000)
+        self.server.hide_size = True
+        ntransfer = self.server.ntransfer
+        self.assertEqual(self.fetch(),filepath)
+        self.assertEqual(self.server.ntransfer,ntransfer)
+        self.assertEqual(self.read(filepath),self.content[0:50000])
+        self.assertIsNone(get_manifest(self.target_directory).get(filepath))
+
+        # It is completed once the remote size is known
+        self.server.hide_size = False
+        target = self.fetch()
+        self.assertEqual(self.read(target),self.content)
+        self.assertEqual(get_manifest(self.target_directory).get(target)["SIZE"],FILE_SIZE)
+
+    def test_server_down(self):
+        # Data already on disk can be processed offline
+        filepath = self.write_local_file(FILE_SIZE)
+        self.server.stop()
+        self.assertEqual(self.fetch(),filepath)
+        self.assertIsNone(get_manifest(self.target_directory).get(filepath))
+
+    def test_local_file(self):
+        # A complete local file which is not in the manifest is recorded
+        filepath = self.write_local_file(FILE_SIZE)
+        ntransfer = self.server.ntransfer
+        self.assertEqual(self.fetch(),filepath)
+        self.assertEqual(self.server.ntransfer,ntransfer)
+        self.assertEqual(get_manifest(self.target_directory).get(filepath)["SIZE"],FILE_SIZE)
+
+class ftp_test(server_test,unittest.TestCase):
+    server_class = ftp_archive_server
+
+    def test_unknown_size_cut(self):
+        # The server reports an aborted transfer
+        self.server.hide_size = True
+        self.server.cut = 50000
+        self.assertIsNone(self.fetch())
+        self.assertFalse(os.path.isfile(os.path.join(self.target_directory,FILENAME)))
+
+class http_test(server_test,unittest.TestCase):
+    server_class = http_archive_server
+
+    def test_server_filename(self):
+        self.server.disposition = "20010101_server.R2.Z"
+        target = self.fetch()
+        self.assertEqual(target,os.path.join(self.target_directory,"20010101_server.R2.Z"))
+        self.assertEqual(self.read(target),self.content)
+
+    def test_unsafe_server_filename(self):
+        # The path given by the server is ignored
+        self.server.disposition = "../../" + FILENAME + ".evil"
+        target = self.fetch()
+        self.assertEqual(target,os.path.join(self.target_directory,FILENAME + ".evil"))
+        self.assertEqual(sorted(os.listdir(self.directory)),["archive","data"])
+
+        # The url filename is used if the server one is not valid
+        for disposition in ["..","."]:
+            os.remove(target)
+            self.server.disposition = disposition
+            target = self.fetch(overwrite=True)
+            self.assertEqual(target,os.path.join(self.target_directory,FILENAME))
+            self.assertEqual(self.read(target),self.content)
+
+if __name__ == "__main__":
+    unittest.main()
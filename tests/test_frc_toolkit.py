@@ -0,0 +1,109 @@
+#! /usr/bin/env python
+# -*- coding: latin-1 -*-
+
+"""
+Unit tests of the frc_toolkit module.
+@author: X.Bonnin (LESIA)
+"""
+
+__author__="Xavier Bonnin"
+__date__="18-OCT-2026"
+__version__="1.00"
+
+import os
+import csv, gzip
+import shutil, tempfile
+import threading
+import unittest
+
+import context
+import frc_toolkit
+from frc_toolkit import csv_writer
+
+FIELDNAMES = ["THREAD","CALL","ROW"]
+
+class csv_writer_test(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def read(self,output_file):
+        opener = gzip.open if (output_file.endswith(".gz")) else open
+        with opener(output_file,"rb") as fr:
+            return list(csv.reader(fr,delimiter=';'))
+
+    def test_rename(self):
+        output_file = os.path.join(self.directory,"rows.csv")
+        writer = csv_writer(output_file,fieldnames=FIELDNAMES,flush_size=2)
+        writer.writerows([{"THREAD":0,"CALL":0,"ROW":i} for i in range(5)])
+        writer.flush()
+        # Nothing is written to output_file before the writer is closed
+        self.assertFalse(os.path.exists(output_file))
+        self.assertEqual(os.listdir(self.directory),[os.path.basename(writer.temp_file)])
+        self.assertTrue(writer.close())
+        self.assertEqual(os.listdir(self.directory),["rows.csv"])
+        self.assertEqual(self.read(output_file),
+                         [FIELDNAMES] + [["0","0",str(i)] for i in range(5)])
+        self.assertRaises(ValueError,writer.writerow,["0","0","5"])
+
+    def test_abort(self):
+        output_file = os.path.join(self.directory,"rows.csv")
+        try:
+            with csv_writer(output_file,fieldnames=FIELDNAMES) as writer:
+                writer.writerow(["0","0","0"])
+                raise RuntimeError("interrupted")
+        except RuntimeError:
+            pass
+        self.assertEqual(os.listdir(self.directory),[])
+
+    def test_gzip(self):
+        output_file = os.path.join(self.directory,"rows.csv.gz")
+        rows = [["%i" % (i),"a;b",'"c"'] for i in range(2500)]
+
+        # The raw file is synced once the gzip trailer is written
+        fsync = frc_toolkit.os.fsync
+        synced = []
+        def check_fsync(fd):
+            synced.append(writer.file.fileobj is None)
+            return fsync(fd)
+        frc_toolkit.os.fsync = check_fsync
+        try:
+            with csv_writer(output_file,fieldnames=FIELDNAMES) as writer:
+                writer.writerows(rows)
+        finally:
+            frc_toolkit.os.fsync = fsync
+        self.assertEqual(synced,[True])
+        self.assertEqual(os.listdir(self.directory),["rows.csv.gz"])
+        self.assertEqual(self.read(output_file),[FIELDNAMES] + rows)
+
+    def test_threads(self):
+        # The rows of one call are written together
+        output_file = os.path.join(self.directory,"rows.csv")
+        nthread = 8 ; ncall = 50 ; nrow = 10
+        writer = csv_writer(output_file,fieldnames=FIELDNAMES,flush_size=7)
+        def write(thread):
+            for call in range(ncall):
+                writer.writerows([[thread,call,i] for i in range(nrow)])
+        threads = [threading.Thread(target=write,args=(i,)) for i in range(nthread)]
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+        writer.close()
+
+        rows = self.read(output_file)
+        self.assertEqual(rows[0],FIELDNAMES)
+        rows = rows[1:]
+        self.assertEqual(len(rows),nthread*ncall*nrow)
+        calls = {}
+        for i in range(0,len(rows),nrow):
+            block = rows[i:i+nrow]
+            self.assertEqual([row[0:2] for row in block],[block[0][0:2]]*nrow)
+            self.assertEqual([row[2] for row in block],[str(j) for j in range(nrow)])
+            calls.setdefault(block[0][0],[]).append(int(block[0][1]))
+        # and the calls of a thread are written in order
+        self.assertEqual(calls,dict([(str(i),range(ncall)) for i in range(nthread)]))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,223 @@
+#! /usr/bin/env python
+# -*- coding: latin-1 -*-
+
+"""
+Unit tests of the improlib module,
+against the previous versions of the functions.
+@author: X.Bonnin (LESIA)
+"""
+
+__author__="Xavier Bonnin"
+__date__="18-OCT-2026"
+__version__="1.00"
+
+import unittest
+
+import numpy as np
+from scipy import ndimage
+
+import context
+from improlib import closerec, closerec_labels, image2chains, image2chain, \
+    decode_chains, chain2image
+
+S4 = ndimage.generate_binary_structure(2,1)
+S8 = ndimage.generate_binary_structure(2,2)
+
+# Erosion loop of closerec before the erosions were computed
+# with a distance transform, used as reference.
+def closerec_loop(image,open_structure=None,close_structure=None):
+    binary_image = image > 0
+    current_image1 = binary_image.copy()
+    while (True in current_image1):
+        current_image0 = current_image1.copy()
+        current_image1 = ndimage.morphology.binary_erosion(current_image0,
+                                                           structure=open_structure)
+    return ndimage.morphology.binary_propagation(
+        current_image0,structure=close_structure,mask=binary_image)
+
+# Method to apply closerec_loop on each label of a label image
+def closerec_labels_loop(label_image,index,**kwargs):
+    cleaned_image = label_image.copy()
+    for label in index:
+        mask = (label_image == label)
+        cleaned_image[mask & ~closerec_loop(mask,**kwargs)] = 0
+    return cleaned_image
+
+# Pixel by pixel tracing of image2chain before image2chains,
+# used as reference.
+def image2chain_loop(image,pixel_value):
+    ardir = np.array([[-1,0],[-1,1],[0,1],[1,1],[1,0],[1,-1],[0,-1],[-1,-1]])
+    ccdir = np.array([0,7,6,5,4,3,2,1])
+
+    nX = image.shape[0] ; nY = image.shape[1]
+    n = nX*nY
+    mask = (image == pixel_value)
+
+    indices = np.where(mask)
+    cc_x_pix = min(indices[0])
+    cc_y_pix = max(indices[1][np.where(indices[0] == cc_x_pix)])
+
+    chaincode="" ; locations = []
+    xpix = int(cc_x_pix) ; ypix = int(cc_y_pix)
+    loop = True ; niter=0
+    while (loop):
+        for i,direction in enumerate(ardir):
+            x = xpix + direction[0] ; y = ypix + direction[1]
+            current_ccdir = ccdir[i]
+            if (mask[x,y]): break
+        chaincode += str(current_ccdir)
+        locations.append([xpix,ypix])
+        if ([x,y] == [cc_x_pix,cc_y_pix]):
+            locations.append([x,y])
+            loop=False
+        xpix = x ; ypix = y
+        ishift = int(np.where(ccdir == (int(current_ccdir)+4)%8)[0])
+        ardir = np.roll(ardir,7-ishift,axis=0) ; ccdir = np.roll(ccdir,7-ishift)
+        niter+=1
+        if (niter > n): return "",[]
+    return chaincode, locations
+
+# Pixel by pixel decoding of chain2image before decode_chains,
+# used as reference.
+def chain2image_loop(chaincode,start_pix):
+    ardir = np.array([[-1,0],[-1,1],[0,1],[1,1],[1,0],[1,-1],[0,-1],[-1,-1]])
+    ccdir = np.array([0,7,6,5,4,3,2,1])
+
+    X=[start_pix[0]]
+    Y=[start_pix[1]]
+    for c in chaincode:
+        wc = np.where(np.int8(c) == np.int8(ccdir))[0]
+        X.append(X[-1] + np.int(ardir[wc,0]))
+        Y.append(Y[-1] + np.int(ardir[wc,1]))
+    return X,Y
+
+# Method to build a random image of blobs, with a background
+# border of one pixel (the reference tracing can not reach the border).
+def make_image(random,shape,percentile=80.0,sigma=2.0):
+    noise = ndimage.gaussian_filter(random.rand(shape[0]-2,shape[1]-2),sigma)
+    image = np.zeros(shape,dtype=bool)
+    image[1:-1,1:-1] = noise > np.percentile(noise,percentile)
+    return image
+
+class closerec_test(unittest.TestCase):
+
+    def test_closerec(self):
+        random = np.random.RandomState(5)
+        line = np.array([[0,1,0],[0,1,0],[0,1,0]],dtype=bool)
+        corner = np.array([[1,1,0],[1,1,0],[0,0,0]],dtype=bool)
+        for i in range(40):
+            shape = (random.randint(5,40),random.randint(5,40))
+            image = make_image(random,shape,percentile=random.uniform(30,90),
+                               sigma=random.uniform(0.5,3.0))
+            for open_structure in [None,S4,S8,line]:
+                for close_structure in [None,S8,corner]:
+                    np.testing.assert_array_equal(
+                        closerec(image,open_structure=open_structure,
+                                 close_structure=close_structure),
+                        closerec_loop(image,open_structure=open_structure,
+                                      close_structure=close_structure))
+        self.assertFalse(closerec(np.zeros((4,4),dtype=bool)).any())
+
+    def test_closerec_labels(self):
+        random = np.random.RandomState(6)
+        image = make_image(random,(200,120))
+        # Features which do not touch (one pass), then touching ones
+        for structure in [S8,S4]:
+            label_image, nlabel = ndimage.label(image,structure=structure)
+            index = range(1,nlabel+1)
+            np.testing.assert_array_equal(closerec_labels(label_image),
+                                          closerec_labels_loop(label_image,index))
+            # Only the given labels are cleaned
+            expected = closerec_labels_loop(label_image,[3,5])
+            np.testing.assert_array_equal(closerec_labels(label_image,[3,5]),expected)
+            for open_structure in [S8,np.array([[0,1,0],[0,1,0],[0,1,0]],dtype=bool)]:
+                np.testing.assert_array_equal(
+                    closerec_labels(label_image,open_structure=open_structure),
+                    closerec_labels_loop(label_image,index,open_structure=open_structure))
+
+    def test_shared_label(self):
+        # Disjoint parts of one feature: only the thickest one is kept,
+        # parts of the same thickness are all kept
+        label_image = np.zeros((30,30),dtype=np.int32)
+        label_image[2:10,2:10] = 1
+        label_image[2:5,20:23] = 1
+        label_image[15:18,2:5] = 2
+        label_image[15:18,20:23] = 2
+        label_image[22:28,10:14] = 3
+        expected = closerec_labels_loop(label_image,[1,2,3])
+        result = closerec_labels(label_image)
+        np.testing.assert_array_equal(result,expected)
+        self.assertFalse((result[2:5,20:23] == 1).any())
+        self.assertEqual((result == 2).sum(),18)
+
+class image2chains_test(unittest.TestCase):
+
+    def test_image2chains(self):
+        random = np.random.RandomState(1)
+        for i in range(10):
+            image = make_image(random,(80,60))
+            label_image, nlabel = ndimage.label(image,structure=S8)
+            chaincodes, start_pix = image2chains(label_image)
+            self.assertEqual(len(chaincodes),nlabel)
+            for label in range(1,nlabel+1):
+                if ((label_image == label).sum() < 2): continue
+                chaincode, locations = image2chain_loop(label_image,label)
+                self.assertEqual(chaincodes[label-1],chaincode)
+                self.assertEqual(start_pix[label-1].tolist(),locations[0])
+                self.assertEqual(image2chain(label_image,label),(chaincode,locations))
+
+    def test_single_pixel(self):
+        # A single pixel has an empty chain code,
+        # and a missing label a starting pixel [-1,-1]
+        label_image = np.zeros((10,10),dtype=np.int32)
+        label_image[4,6] = 1
+        label_image[2:4,2:4] = 3
+        chaincodes, start_pix = image2chains(label_image,index=[1,2,3])
+        self.assertEqual(chaincodes[0:2],["",""])
+        self.assertEqual(start_pix.tolist(),[[4,6],[-1,-1],[2,3]])
+        self.assertEqual(chaincodes[2],image2chain_loop(label_image,3)[0])
+        self.assertEqual(image2chain(label_image,1),("",[[4,6]]))
+
+    def test_border(self):
+        # Features touching the border of the image are traced
+        label_image = np.zeros((6,6),dtype=np.int32)
+        label_image[0:3,3:6] = 1
+        chaincodes, start_pix = image2chains(label_image)
+        X, Y, offsets = decode_chains(chaincodes,start_pix)
+        self.assertEqual(len(chaincodes[0]),8)
+        self.assertTrue((label_image[X,Y] == 1).all())
+        self.assertEqual((X[-1],Y[-1]),(0,5))
+
+class decode_chains_test(unittest.TestCase):
+
+    def test_decode_chains(self):
+        random = np.random.RandomState(3)
+        chaincodes = ["".join(random.choice(list("01234567"),random.randint(0,50)))
+                      for i in range(100)]
+        start_pix = random.randint(-20,20,(100,2))
+        X, Y, offsets = decode_chains(chaincodes,start_pix)
+        self.assertEqual(len(offsets),101)
+        for i,(chaincode,pix) in enumerate(zip(chaincodes,start_pix.tolist())):
+            expected = chain2image_loop(chaincode,pix)
+            self.assertEqual((X[offsets[i]:offsets[i+1]].tolist(),
+                              Y[offsets[i]:offsets[i+1]].tolist()),expected)
+            self.assertEqual(chain2image(chaincode,pix),expected)
+
+    def test_traced_contours(self):
+        image = make_image(np.random.RandomState(4),(100,80))
+        label_image, nlabel = ndimage.label(image,structure=S8)
+        chaincodes, start_pix = image2chains(label_image)
+        X, Y, offsets = decode_chains(chaincodes,start_pix)
+        for i in range(nlabel):
+            if not (chaincodes[i]): continue
+            locations = image2chain_loop(label_image,i+1)[1]
+            self.assertEqual(zip(X[offsets[i]:offsets[i+1]].tolist(),
+                                 Y[offsets[i]:offsets[i+1]].tolist()),
+                             [tuple(location) for location in locations])
+
+    def test_wrong_chain_code(self):
+        self.assertRaises(ValueError,decode_chains,["0128"],[[0,0]])
+        self.assertRaises(ValueError,decode_chains,["01"],[[0,0],[1,1]])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,171 @@
+#! /usr/bin/env python
+# -*- coding: latin-1 -*-
+
+"""
+Unit tests of the provider_router module,
+against two local http servers of hfc/prod/scripts/fake_archive_server.py.
+@author: X.Bonnin (LESIA)
+"""
+
+__author__="Xavier Bonnin"
+__date__="18-OCT-2026"
+__version__="1.00"
+
+import os
+import time
+import shutil, tempfile
+import unittest
+import logging
+
+import context
+from download_manager import connection_pool, get_manifest, DOWNLOAD_LOGGER
+from provider_router import provider_router
+from fake_archive_server import http_archive_server
+from waves import wind
+
+logging.getLogger(DOWNLOAD_LOGGER).addHandler(logging.NullHandler())
+
+DIRECTORY = "/wind_rad2/rad2a/"
+FILENAMES = ["200101%02i.R2.Z" % (day) for day in range(1,7)]
+FILE_SIZE = 20000
+COOLDOWN = 0.5
+
+class provider_router_test(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.target_directory = os.path.join(self.directory,"data")
+        os.makedirs(self.target_directory)
+        self.content = os.urandom(FILE_SIZE)
+        self.servers = []
+        for name in ["a","b"]:
+            archive = os.path.join(self.directory,name)
+            os.makedirs(archive + DIRECTORY)
+            for filename in FILENAMES:
+                with open(archive + DIRECTORY + filename,'wb') as fw:
+                    fw.write(self.content)
+            self.servers.append(http_archive_server(archive).start())
+        self.pool = connection_pool()
+        self.router = provider_router(tries=2,backoff_base=0.0,
+                                      failure_threshold=2,cooldown=COOLDOWN,
+                                      pool=self.pool)
+
+    def tearDown(self):
+        self.pool.close()
+        for server in self.servers: server.stop()
+        shutil.rmtree(self.directory)
+
+    def get_candidates(self,filename):
+        return [(server.url + DIRECTORY + filename,filename)
+                for server in self.servers]
+
+    def fetch(self,filename,**kwargs):
+        return self.router.fetch(self.get_candidates(filename),
+                                 target_directory=self.target_directory,
+                                 size=FILE_SIZE,**kwargs)
+
+    def get_host(self,server):
+        return self.router.get_stats(server.url)
+
+    def test_rank(self):
+        slow, fast = self.servers
+        slow.delay = 0.3
+
+        # Hosts which have not been measured yet are tried first
+        self.assertIsNotNone(self.fetch(FILENAMES[0]))
+        self.assertIsNotNone(self.fetch(FILENAMES[1]))
+        self.assertEqual([slow.ntransfer,fast.ntransfer],[1,1])
+
+        # Then the fastest one
+        candidates = self.get_candidates(FILENAMES[2])
+        self.assertEqual(self.router.rank(candidates,size=FILE_SIZE),
+                         candidates[::-1])
+        for filename in FILENAMES[2:]:
+            self.assertIsNotNone(self.fetch(filename))
+        self.assertEqual([slow.ntransfer,fast.ntransfer],[1,len(FILENAMES)-1])
+
+    def test_failover(self):
+        failing, server = self.servers
+        failing.fail_rate = 1.0
+        target = self.fetch(FILENAMES[0])
+        with open(target,'rb') as fr:
+            self.assertEqual(fr.read(),self.content)
+        self.assertEqual(failing.nfailure,1)
+        self.assertEqual(self.get_host(failing).nfailure,1)
+        self.assertEqual(self.get_host(server).nsuccess,1)
+
+    def test_not_found(self):
+        # A file missing from a mirror does not count against its host
+        missing, server = self.servers
+        os.remove(os.path.join(self.directory,"a") + DIRECTORY + FILENAMES[0])
+        self.assertIsNotNone(self.fetch(FILENAMES[0]))
+        self.assertEqual(self.get_host(missing).nfailure,0)
+        self.assertEqual(self.get_host(missing).get_state(),"closed")
+
+        # A file missing from every mirror is not retried
+        os.remove(os.path.join(self.directory,"b") + DIRECTORY + FILENAMES[1])
+        os.remove(os.path.join(self.directory,"a") + DIRECTORY + FILENAMES[1])
+        self.router.backoff_base = 10.0
+        start = time.time()
+        self.assertIsNone(self.fetch(FILENAMES[1]))
+        self.assertLess(time.time() - start,5.0)
+        self.assertEqual(self.get_host(missing).nfailure,0)
+        self.assertEqual(self.get_host(server).nfailure,0)
+
+    def test_circuit_breaker(self):
+        failing, server = self.servers
+        failing.fail_rate = 1.0
+        for filename in FILENAMES[0:2]:
+            self.assertIsNotNone(self.fetch(filename))
+        host = self.get_host(failing)
+        self.assertEqual(host.get_state(),"open")
+
+        # The host is put aside
+        self.assertIsNotNone(self.fetch(FILENAMES[2]))
+        self.assertEqual(failing.nfailure,2)
+
+        # One try is allowed after the cooldown, a failure opens it again
+        time.sleep(COOLDOWN)
+        self.assertEqual(host.get_state(),"half-open")
+        self.assertIsNotNone(self.fetch(FILENAMES[3]))
+        self.assertEqual(failing.nfailure,3)
+        self.assertEqual(host.get_state(),"open")
+
+        # A success closes it
+        time.sleep(COOLDOWN)
+        failing.fail_rate = 0.0
+        server.fail_rate = 1.0
+        self.assertIsNotNone(self.fetch(FILENAMES[4]))
+        self.assertEqual(host.get_state(),"closed")
+        self.assertEqual(host.nsuccess,1)
+
+    def test_local_file_failover(self):
+        # A local file of one mirror which must be downloaded again
+        # does not keep the other mirrors from being tried
+        failing, server = self.servers
+        candidates = [(failing.url + DIRECTORY + FILENAMES[0],"local_" + FILENAMES[0]),
+                      (server.url + DIRECTORY + FILENAMES[0],FILENAMES[0])]
+        with open(os.path.join(self.target_directory,candidates[0][1]),'wb') as fw:
+            fw.write(self.content[0:100] + "x")
+        failing.fail_rate = 1.0
+        target = self.router.fetch(candidates,target_directory=self.target_directory,
+                                   size=FILE_SIZE,overwrite=False)
+        self.assertEqual(target,os.path.join(self.target_directory,FILENAMES[0]))
+        self.assertEqual(failing.nfailure,1)
+        self.assertEqual(get_manifest(self.target_directory).get(target)["SIZE"],FILE_SIZE)
+
+class mirror_filename_test(unittest.TestCase):
+
+    def test_mirror_filename(self):
+        reader = wind(provider="gsfc",verbose=False)
+        self.assertEqual(reader.get_mirror_filename("20010101.R2.Z","lesia"),
+                         "WIN_RAD2_60S_20010101.B3E")
+        self.assertEqual(reader.get_mirror_filename("WIN_RAD2_60S_20010101.B3E","gsfc"),
+                         "20010101.R2.Z")
+        self.assertEqual(reader.get_mirror_filename("19991231.R1","lesia"),
+                         "WIN_RAD1_60S_19991231.B3E")
+        # The high resolution data have no gsfc counterpart
+        self.assertIsNone(reader.get_mirror_filename("WIN_RAD2_HRES_20010101.B3E","gsfc"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+#! /usr/bin/env python
+# -*- coding: latin-1 -*-
+
+"""
+Unit tests of the quantile module.
+@author: X.Bonnin (LESIA)
+"""
+
+__author__="Xavier Bonnin"
+__date__="18-OCT-2026"
+__version__="1.00"
+
+import unittest
+
+import numpy as np
+
+import context
+from quantile import histogram_quantile, exact_quantile, binned_quantile, \
+    get_quantile, get_background
+
+# Histogram loop of waves.get_quantile before the quantile module,
+# used as reference.
+def histogram_loop(h,xh,Q):
+    threshold=Q*sum(h)
+    i=0 ; hsum=0.0 ; nh = len(h)
+    while (hsum < threshold):
+        hsum+=h[i]
+        i+=1
+        if (i == (nh)): break
+    return xh[i-1]
+
+def get_quantile_loop(X,Q,nbins):
+    h, xh = np.histogram(X,bins=nbins)
+    return histogram_loop(h,xh,Q)
+
+# Method to return the q quantile of the finite values of X
+# (smallest value such as at least q of the values are lower or equal)
+def sorted_quantile(X,q):
+    X = np.sort(X[np.isfinite(X)])
+    if (len(X) == 0): return np.nan
+    return X[max(int(np.ceil(q*len(X))) - 1,0)]
+
+class histogram_quantile_test(unittest.TestCase):
+
+    def test_histogram_quantile(self):
+        random = np.random.RandomState(0)
+        for i in range(200):
+            histo = random.randint(0,5,random.randint(1,50))
+            if (histo.sum() == 0): continue
+            bins = np.cumsum(random.rand(len(histo)))
+            for q in [0.01,0.05,0.5,0.95,1.0]:
+                self.assertEqual(histogram_quantile(histo,bins,q),
+                                 histogram_loop(histo,bins,q))
+
+    def test_columns(self):
+        random = np.random.RandomState(1)
+        histo = random.randint(0,5,(30,8))
+        bins = np.cumsum(random.rand(30,8),axis=0)
+        for q in [0.05,0.5,0.99]:
+            expected = [histogram_loop(histo[:,j],bins[:,j],q) for j in range(8)]
+            np.testing.assert_array_equal(histogram_quantile(histo,bins,q),expected)
+            # Bins shared by all of the columns
+            expected = [histogram_loop(histo[:,j],bins[:,0],q) for j in range(8)]
+            np.testing.assert_array_equal(histogram_quantile(histo,bins[:,0],q),expected)
+
+class exact_quantile_test(unittest.TestCase):
+
+    def test_exact_quantile(self):
+        random = np.random.RandomState(2)
+        array = random.normal(0.0,1.0,(101,6))
+        for q in [0.0,0.05,0.5,0.95,1.0]:
+            expected = [sorted_quantile(array[:,j],q) for j in range(6)]
+            np.testing.assert_array_equal(exact_quantile(array,q),expected)
+            self.assertEqual(exact_quantile(array,q,axis=None),sorted_quantile(array.ravel(),q))
+            np.testing.assert_array_equal(exact_quantile(array.T,q,axis=1),expected)
+
+    def test_not_finite(self):
+        random = np.random.RandomState(3)
+        array = random.normal(0.0,1.0,(50,5))
+        array[random.rand(50,5) < 0.2] = np.nan
+        array[0:3,1] = np.inf ; array[3,1] = -np.inf
+        array[:,4] = np.nan
+        for q in [0.05,0.5,0.95]:
+            quantile = exact_quantile(array,q)
+            expected = [sorted_quantile(array[:,j],q) for j in range(5)]
+            np.testing.assert_array_equal(quantile,expected)
+            self.assertTrue(np.isnan(quantile[4]))
+        self.assertTrue(np.isnan(exact_quantile([np.nan,np.inf],0.5)))
+        self.assertTrue(np.isnan(exact_quantile([],0.5)))
+
+    def test_range(self):
+        X = np.arange(100,dtype=np.float64)
+        self.assertEqual(exact_quantile(X,0.5,min_value=20,max_value=59),39.0)
+        self.assertEqual(exact_quantile(X,0.0,min_value=20),20.0)
+
+class binned_quantile_test(unittest.TestCase):
+
+    def test_binned_quantile(self):
+        random = np.random.RandomState(4)
+        for i in range(300):
+            X = random.normal(0.0,1.0,random.randint(2,200))
+            if (i % 3 == 0):
+                # Values on the bin edges
+                X = np.round(X*4.0)/4.0
+            nbins = random.randint(1,300)
+            for q in [0.01,0.05,0.5,0.95,1.0]:
+                self.assertEqual(binned_quantile(X,q,nbins=nbins,axis=None),
+                                 get_quantile_loop(X,q,nbins))
+                self.assertEqual(get_quantile(X,q,nbins=nbins),
+                                 get_quantile_loop(X,q,nbins))
+
+    def test_columns(self):
+        # Background of a spectrum, with the 100000 bins of get_background.pro
+        random = np.random.RandomState(5)
+        intensity = random.lognormal(0.0,1.0,(1440,4))
+        for q in [0.01,0.05]:
+            expected = [get_quantile_loop(intensity[:,j],q,100000) for j in range(4)]
+            np.testing.assert_array_equal(get_background(intensity,q=q,nbins=100000),expected)
+            np.testing.assert_array_equal(get_background(intensity,q=q),
+                                          exact_quantile(intensity,q))
+
+    def test_range(self):
+        X = np.linspace(0.0,10.0,101)
+        h, xh = np.histogram(X,bins=20,range=(2.0,8.0))
+        for q in [0.05,0.5,0.95]:
+            self.assertEqual(binned_quantile(X,q,nbins=20,min_value=2.0,max_value=8.0),
+                             histogram_loop(h,xh,q))
+
+    def test_zero_quantile(self):
+        # The previous loop returned the last bin edge for Q=0,
+        # the lower edge of the first bin is returned instead
+        X = np.arange(10,dtype=np.float64)
+        self.assertEqual(get_quantile_loop(X,0.0,5),9.0)
+        self.assertEqual(binned_quantile(X,0.0,nbins=5,axis=None),0.0)
+        np.testing.assert_array_equal(binned_quantile(np.array([X,X+1]).T,0.0,nbins=5),
+                                      [0.0,1.0])
+
+    def test_constant(self):
+        X = np.zeros(10) + 3.0
+        self.assertEqual(binned_quantile(X,0.5,nbins=10,axis=None),3.0)
+        self.assertTrue(np.isnan(binned_quantile([np.nan,np.nan],0.5,axis=None)))
+
+if __name__ == "__main__":
+    unittest.main()
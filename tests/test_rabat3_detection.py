@@ -0,0 +1,124 @@
+#! /usr/bin/env python
+# -*- coding: latin-1 -*-
+
+"""
+Unit tests of the rabat3_detection module.
+@author: X.Bonnin (LESIA)
+"""
+
+__author__="Xavier Bonnin"
+__date__="18-OCT-2026"
+__version__="1.00"
+
+import unittest
+
+import numpy as np
+
+import context
+from rabat3_detection import detect_lig, get_config, rabat3_detection, rabat3_stream
+
+LIG_ARGS = {"METHOD":"LIG","NF_BAND":"256","THRESHOLD":"150",
+            "DRIFT_PARAM":"-0.01, 1.8","MODEL_PARAM":"60, 360, 90"}
+SHT_ARGS = {"METHOD":"SHT","NF_BAND":"256","THRESHOLD":"20",
+            "DRIFT_PARAM":"-0.01, 1.8","SWEEP_STEP":"10"}
+
+NT = 1440 ; NDAY = 3
+# Bursts close to the day boundaries
+BURSTS = [98,475,608,1437,1439,1441,2879,2880,2885,3871]
+
+# Method to build NDAY contiguous days of a wind/waves-like spectrum
+# (one minute sampling, RAD1 and RAD2 frequencies in MHz).
+def make_days(seed=0):
+    random = np.random.RandomState(seed)
+    freq = np.concatenate([0.02 + 0.004*np.arange(256),
+                           1.075 + 0.05*np.arange(256)]).astype(np.float32)
+    array = random.rand(NT*NDAY,len(freq)).astype(np.float32)
+    array[BURSTS,:] += 6.0
+    time = 60.0*np.arange(NT*NDAY,dtype=np.float64)
+    return array, time, freq
+
+class detect_lig_test(unittest.TestCase):
+
+    def test_indices_in_range(self):
+        # The last window centers are beyond the last sample for this spectrum
+        nt = 200
+        intensity = np.random.RandomState(0).rand(nt,16).astype(np.float32)
+        time = 60.0*np.arange(nt,dtype=np.float32)
+        iburst, lvl_trust = detect_lig(intensity,time,None,150.0,
+                                       model_param=[60,360,90])
+        self.assertGreater(len(iburst),0)
+        self.assertEqual(len(iburst),len(lvl_trust))
+        self.assertTrue((iburst >= 0).all() and (iburst < nt).all())
+
+class get_config_test(unittest.TestCase):
+
+    def test_config(self):
+        config = get_config(LIG_ARGS,nf=512)
+        self.assertEqual(config["METHOD"],"LIG")
+        self.assertEqual(config["NF_BAND"],256)
+        self.assertEqual(config["MODEL_PARAM"],[60.0,360.0,90.0])
+
+    def test_wrong_nf_band(self):
+        for nf_band in [None,"","0","1","-4","abc"]:
+            args = dict(LIG_ARGS,NF_BAND=nf_band)
+            self.assertRaises(ValueError,get_config,args)
+        args = dict(LIG_ARGS) ; del args["NF_BAND"]
+        self.assertRaises(ValueError,get_config,args)
+        self.assertRaises(ValueError,get_config,LIG_ARGS,nf=128)
+
+    def test_detection_wrong_nf_band(self):
+        array = np.ones((100,128),dtype=np.float32)
+        time = 60.0*np.arange(100) ; freq = 0.02 + 0.004*np.arange(128)
+        for nf_band in ["1","256"]:
+            self.assertRaises(ValueError,rabat3_detection,array,time,freq,
+                              dict(LIG_ARGS,NF_BAND=nf_band))
+
+    def test_odd_nf_band(self):
+        # Bands must not go beyond the last frequency
+        nt = 120 ; nf = 12
+        array = np.random.RandomState(1).rand(nt,nf).astype(np.float32)
+        time = 60.0*np.arange(nt) ; freq = 0.02 + 0.004*np.arange(nf)
+        args = dict(LIG_ARGS,NF_BAND="5",DRIFT_PARAM="")
+        expected = rabat3_detection(array,time,freq,args)
+        padded = np.concatenate([array,np.zeros((nt,1),dtype=np.float32) + np.nan],axis=1)
+        result = rabat3_detection(padded[:,0:nf],time,freq,args)
+        for values, expected_values in zip(result,expected):
+            np.testing.assert_array_equal(values,expected_values)
+
+class rabat3_stream_test(unittest.TestCase):
+
+    def check(self,args):
+        array, time, freq = make_days()
+        expected = rabat3_detection(array,time,freq,args)
+
+        stream = rabat3_stream(args)
+        days = []
+        for i in range(NDAY):
+            day = slice(i*NT,(i+1)*NT)
+            days.extend(stream.push(i,array[day],time[day],freq))
+        days.extend(stream.flush())
+        self.assertEqual([day[0] for day in days],range(NDAY))
+        result = [np.concatenate([day[1] + day[0]*NT for day in days])]
+        result += [np.concatenate([day[i] for day in days]) for i in [2,3]]
+
+        # In the last margin, the drift shift wraps around the first day
+        # for the single run, and around the buffer start for the stream
+        end = NT*NDAY - stream.get_margin(time[0:NT],freq)
+        for values, expected_values in zip(result,expected):
+            np.testing.assert_array_equal(values[result[0] < end],
+                                          expected_values[expected[0] < end])
+        return expected[0]
+
+    # Detections closer than 2 samples on each side of midnight are kept
+    def test_sht(self):
+        burst_indices = self.check(SHT_ARGS)
+        for index in [1439,1441,2877,2880,2882]:
+            self.assertIn(index,burst_indices)
+
+    def test_lig(self):
+        burst_indices = self.check(LIG_ARGS)
+        for index in [1438,1442,2877,2881,2882]:
+            self.assertIn(index,burst_indices)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+#! /usr/bin/env python
+# -*- coding: latin-1 -*-
+
+"""
+Unit tests of the rabat3_idl_worker module,
+IDL sessions being simulated by hfc/prod/scripts/fake_idl.py.
+@author: X.Bonnin (LESIA)
+"""
+
+__author__="Xavier Bonnin"
+__date__="18-OCT-2026"
+__version__="1.00"
+
+import os, sys
+import shutil, tempfile
+import threading
+import unittest
+import logging
+
+import context
+from rabat3_idl_worker import idl_worker_pool, RABAT3_HFC_LOGGER
+from fake_idl import FEAT_HEADER
+
+FAKE_IDL = [sys.executable,os.path.join(context.ROOT_DIRECTORY,
+                                        "hfc","prod","scripts","fake_idl.py")]
+
+logging.getLogger(RABAT3_HFC_LOGGER).addHandler(logging.NullHandler())
+
+class idl_worker_pool_test(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.pool = None
+
+    def tearDown(self):
+        if (self.pool is not None): self.pool.stop()
+        shutil.rmtree(self.directory)
+
+    def get_pool(self,nworker=1,retries=1):
+        self.pool = idl_worker_pool("rabat3_worker.sav",nworker=nworker,
+                                    idl_exe=FAKE_IDL,retries=retries)
+        return self.pool
+
+    def output_file(self,name):
+        return os.path.join(self.directory,name + "_feat.csv")
+
+    def test_run(self):
+        pool = self.get_pool()
+        output_file = self.output_file("20010101")
+        status, output = pool.run("20010101.R2","wind.config",output_file)
+        self.assertEqual(status,0)
+        self.assertIn("Processing 20010101.R2 with wind.config",output)
+        with open(output_file) as fr:
+            self.assertEqual(fr.read().strip(),";".join(FEAT_HEADER))
+
+        # The session is reused for the next job
+        process = pool.workers[0].process
+        status, output = pool.run("20010102.R2","wind.config",self.output_file("20010102"))
+        self.assertEqual(status,0)
+        self.assertIs(pool.workers[0].process,process)
+        self.assertEqual(pool.workers[0].njob,2)
+
+    def test_failed_job(self):
+        pool = self.get_pool()
+        status, output = pool.run("FAIL.R2","wind.config",self.output_file("FAIL"))
+        self.assertEqual(status,1)
+        self.assertTrue(pool.workers[0].is_alive())
+        status, output = pool.run("20010101.R2","wind.config",self.output_file("20010101"))
+        self.assertEqual(status,0)
+
+    def test_crashed_session(self):
+        pool = self.get_pool(retries=1)
+        status, output = pool.run("CRASH.R2","wind.config",self.output_file("CRASH"))
+        self.assertEqual(status,1)
+        self.assertIn("has died 2 time(s)",output[0])
+
+        # A new session is started for the next job
+        status, output = pool.run("20010101.R2","wind.config",self.output_file("20010101"))
+        self.assertEqual(status,0)
+        self.assertTrue(pool.workers[0].is_alive())
+
+    def test_concurrent_jobs(self):
+        pool = self.get_pool(nworker=2)
+        dates = ["200101%02i" % (day) for day in range(1,9)]
+        status = {}
+        def run(date):
+            status[date] = pool.run(date + ".R2","wind.config",self.output_file(date))[0]
+        threads = [threading.Thread(target=run,args=(date,)) for date in dates]
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+        self.assertEqual(status,dict([(date,0) for date in dates]))
+        for date in dates:
+            self.assertTrue(os.path.isfile(self.output_file(date)))
+        self.assertEqual(sum([worker.njob for worker in pool.workers]),len(dates))
+
+    def test_stop(self):
+        pool = self.get_pool(nworker=2)
+        pool.run("20010101.R2","wind.config",self.output_file("20010101"))
+        process = pool.workers[0].process
+        pool.stop()
+        self.assertIsNotNone(process.poll())
+        for worker in pool.workers:
+            self.assertFalse(worker.is_alive())
+
+if __name__ == "__main__":
+    unittest.main()
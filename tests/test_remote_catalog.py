@@ -0,0 +1,97 @@
+#! /usr/bin/env python
+# -*- coding: latin-1 -*-
+
+"""
+Unit tests of the remote_catalog module,
+against the local ftp/http servers of hfc/prod/scripts/fake_archive_server.py.
+@author: X.Bonnin (LESIA)
+"""
+
+__author__="Xavier Bonnin"
+__date__="18-OCT-2026"
+__version__="1.00"
+
+import os
+import shutil, tempfile
+import unittest
+import logging
+
+import context
+from download_manager import connection_pool, DOWNLOAD_LOGGER
+from remote_catalog import remote_catalog
+from fake_archive_server import ftp_archive_server, http_archive_server
+
+logging.getLogger(DOWNLOAD_LOGGER).addHandler(logging.NullHandler())
+
+DIRECTORY = "/wind_rad2/rad2a"
+FILENAMES = ["20010101.R2.Z","20010102.R2.Z"]
+
+# Connection pool counting the connection attempts
+class counting_pool(connection_pool):
+
+    def __init__(self,*args,**kwargs):
+        connection_pool.__init__(self,*args,**kwargs)
+        self.nconnect = 0
+
+    def connect(self,key,timeout=None):
+        self.nconnect += 1
+        return connection_pool.connect(self,key,timeout=timeout)
+
+class server_test():
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.archive = os.path.join(self.directory,"archive")
+        os.makedirs(self.archive + DIRECTORY)
+        for i, filename in enumerate(FILENAMES):
+            with open(os.path.join(self.archive + DIRECTORY,filename),'wb') as fw:
+                fw.write("x"*(1000*(i+1)))
+        self.server = self.server_class(self.archive).start()
+        self.pool = counting_pool(timeout=5)
+        self.catalog = remote_catalog(pool=self.pool)
+
+    def tearDown(self):
+        self.catalog.close()
+        self.server.stop()
+        shutil.rmtree(self.directory)
+
+    def test_exists(self):
+        url = self.server.url + DIRECTORY + "/"
+        for filename in FILENAMES:
+            self.assertTrue(self.catalog.exists(url + filename))
+        self.assertFalse(self.catalog.exists(url + "20010103.R2.Z"))
+        # The directory is listed once
+        self.assertEqual(self.server.nconnection,1)
+
+    def test_server_down(self):
+        url = self.server.url + DIRECTORY + "/"
+        self.server.stop()
+        for i in range(20):
+            self.assertIsNone(self.catalog.exists(url + FILENAMES[0]))
+            self.assertIsNone(self.catalog.get_size(url + FILENAMES[0]))
+        self.assertEqual(self.pool.nconnect,1)
+
+    def test_failure_ttl(self):
+        url = self.server.url + DIRECTORY + "/"
+        port = self.server.port
+        self.server.stop()
+        self.catalog.failure_ttl = 0.0
+        self.assertIsNone(self.catalog.exists(url + FILENAMES[0]))
+
+        # The directory is listed again once the failure has expired
+        self.server = self.server_class(self.archive,port=port).start()
+        self.assertTrue(self.catalog.exists(url + FILENAMES[0]))
+        self.assertEqual(self.pool.nconnect,2)
+
+class ftp_test(server_test,unittest.TestCase):
+    server_class = ftp_archive_server
+
+    def test_get_size(self):
+        url = self.server.url + DIRECTORY + "/"
+        self.assertEqual(self.catalog.get_size(url + FILENAMES[1]),2000)
+
+class http_test(server_test,unittest.TestCase):
+    server_class = http_archive_server
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+#! /usr/bin/env python
+# -*- coding: latin-1 -*-
+
+"""
+Unit tests of the spectrum_cache module.
+@author: X.Bonnin (LESIA)
+"""
+
+__author__="Xavier Bonnin"
+__date__="18-OCT-2026"
+__version__="1.00"
+
+import os
+import shutil, tempfile
+import unittest
+import logging
+from datetime import datetime
+
+import numpy as np
+
+import context
+from waves import wind, spectrum, WAVES_LOGGER
+from spectrum_cache import spectrum_cache
+
+logging.getLogger(WAVES_LOGGER).addHandler(logging.NullHandler())
+
+DATA_DIRECTORY = os.path.join(context.ROOT_DIRECTORY,"tests","data")
+GSFC_FILENAME = "20010101.R2.Z"
+
+# Method to build a spectrum with all of its parameters set
+def make_spectrum(nt=60,nf=16,seed=0):
+    random = np.random.RandomState(seed)
+    return spectrum(observatory="Wind",instrument="Waves",receiver="rad2",
+                    intensity=random.rand(nt,nf).astype(np.float32),
+                    background=random.rand(nf).astype(np.float32),
+                    snr=random.rand(nt,nf).astype(np.float32),
+                    time=60.0*np.arange(nt,dtype=np.float32),
+                    frequency=1075.0 + 50.0*np.arange(nf,dtype=np.float32),
+                    date_obs=datetime(2001,1,1,0,0,0),
+                    date_end=datetime(2001,1,1,0,59,0),
+                    naxis=[nt,nf],cdelt=[60.0,np.float32(50.0)],
+                    bandwidth=3.0e3,integration_time=0.154,
+                    intensity_units="Intensity above background (dB)",
+                    comment="60 sec. average data produced by GSFC (NASA).")
+
+class spectrum_cache_test(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = spectrum_cache(os.path.join(self.directory,"cache"))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def get_entries(self):
+        return sorted([filename[0:-4] for filename in os.listdir(self.cache.cache_directory)
+                       if (filename.endswith(".npz"))])
+
+    def test_key(self):
+        filepath = os.path.join(DATA_DIRECTORY,GSFC_FILENAME)
+        options = {"provider":"gsfc","dB":True,"interpolate":True}
+        key = self.cache.get_key(filepath,receiver="rad2",**options)
+        self.assertEqual(self.cache.get_key(filepath,receiver="RAD2",**options),key)
+        keys = set([key])
+        for name, value in [("dB",False),("interpolate",False),("provider","lesia")]:
+            keys.add(self.cache.get_key(filepath,receiver="rad2",**dict(options,**{name:value})))
+        keys.add(self.cache.get_key(filepath,receiver="rad1",**options))
+        self.assertEqual(len(keys),5)
+
+        # The key also depends on the content of the file
+        copy_path = os.path.join(self.directory,GSFC_FILENAME)
+        shutil.copy(filepath,copy_path)
+        self.assertEqual(self.cache.get_key(copy_path,receiver="rad2",**options),key)
+        with open(copy_path,'ab') as fw:
+            fw.write("\x00")
+        self.assertNotEqual(self.cache.get_key(copy_path,receiver="rad2",**options),key)
+
+    def test_get_data(self):
+        reader = wind(provider="gsfc",verbose=False)
+        nread = [0]
+        read_file = reader.read_file
+        def count_read_file(*args,**kwargs):
+            nread[0] += 1
+            return read_file(*args,**kwargs)
+        reader.read_file = count_read_file
+
+        results = []
+        for dB in [False,True,False,True]:
+            results.append(reader.get_data(filename=GSFC_FILENAME,
+                                           data_directory=DATA_DIRECTORY,
+                                           prep=True,dB=dB,interpolate=False,
+                                           cache=self.cache,verbose=False))
+        # One entry per set of options
+        self.assertEqual(nread[0],2)
+        self.assertEqual(len(self.get_entries()),2)
+        for parameter in ["intensity","background","snr","intensity_units"]:
+            for i in range(2):
+                np.testing.assert_array_equal(results[i+2].get_parameter(parameter),
+                                              results[i].get_parameter(parameter))
+        self.assertNotEqual(results[0].intensity_units,results[1].intensity_units)
+
+    def test_round_trip(self):
+        data = make_spectrum()
+        self.assertTrue(self.cache.save("entry",data,filename=GSFC_FILENAME))
+        cached = self.cache.load("entry")
+        self.assertIsInstance(cached,spectrum)
+        for parameter in spectrum().__dict__:
+            value = data.get_parameter(parameter)
+            cached_value = cached.get_parameter(parameter)
+            if (isinstance(value,np.ndarray)):
+                self.assertEqual(cached_value.dtype,value.dtype,msg=parameter)
+                np.testing.assert_array_equal(cached_value,value,err_msg=parameter)
+            else:
+                self.assertEqual(cached_value,value,msg=parameter)
+        self.assertIsNone(self.cache.load("missing"))
+
+    def test_evict(self):
+        keys = ["entry%i" % (i) for i in range(4)]
+        for i,key in enumerate(keys[0:3]):
+            self.cache.save(key,make_spectrum(seed=i))
+            # Entries saved in order, one minute apart
+            path = self.cache.get_path(key)
+            os.utime(path,(1.0e9 + 60.0*i,1.0e9 + 60.0*i))
+        entry_size = os.path.getsize(self.cache.get_path(keys[0])) + \
+            os.path.getsize(self.cache.get_path(keys[0],ext=".json"))
+
+        # The first entry is used again, the second one is then the least recently used
+        self.assertIsNotNone(self.cache.load(keys[0]))
+        self.cache.max_size = int(3.5*entry_size)
+        self.cache.save(keys[3],make_spectrum(seed=3))
+        self.assertEqual(self.get_entries(),[keys[0],keys[2],keys[3]])
+        self.assertFalse(os.path.isfile(self.cache.get_path(keys[1],ext=".json")))
+
+        total_size = self.cache.evict(max_size=int(1.5*entry_size))
+        self.assertLessEqual(total_size,int(1.5*entry_size))
+        self.assertEqual(self.get_entries(),[keys[3]])
+        self.assertEqual(sorted(os.listdir(self.cache.cache_directory)),
+                         [keys[3] + ".json",keys[3] + ".npz"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,176 @@
+#! /usr/bin/env python
+# -*- coding: latin-1 -*-
+
+"""
+Unit tests of the waves module.
+@author: X.Bonnin (LESIA)
+"""
+
+__author__="Xavier Bonnin"
+__date__="18-OCT-2026"
+__version__="1.00"
+
+import os
+import subprocess
+import shutil, tempfile
+import unittest
+import logging
+from copy import deepcopy
+
+import numpy as np
+
+import context
+import waves
+from waves import wind, spectrum, to_dB, MIN_VAL, WAVES_LOGGER, \
+    RAD2_FREQ_NUM, read_gsfc_array, gunzip_lzw, unlzw
+
+logging.getLogger(WAVES_LOGGER).addHandler(logging.NullHandler())
+
+NT = 120 ; NF = 16
+
+# Compressed (.Z) gsfc-like RAD2 file of 24 minutes
+GSFC_FILE = os.path.join(context.ROOT_DIRECTORY,"tests","data","20010101.R2.Z")
+
+# Per-channel loop of wind.prep_data before it was vectorized,
+# used as reference.
+def prep_data_loop(data,dB=False,substract_background=False):
+    prep_data = deepcopy(data)
+    array = data.get_parameter("intensity").copy()
+    nt = data.naxis[0] ; nf = data.naxis[1]
+    background = data.get_parameter("background")
+    rms = 1./np.sqrt(data.get_parameter("integration_time")*data.get_parameter("bandwidth"))
+    intensity_units = data.get_parameter("intensity_units")
+
+    snr = np.zeros((nt,nf),dtype=np.float32)
+    for j in range(nf):
+        array_j = array[:,j]*background[j]
+        if (sum(array_j) == 0.0): continue
+        array_j = array_j - background[j]
+        snr[:,j] = array_j/(background[j]*rms)
+        if (substract_background):
+            array[:,j]=array_j
+
+    if (dB):
+        array = to_dB(array.clip(MIN_VAL,array.max()))
+        snr = to_dB(snr.clip(MIN_VAL,snr.max()))
+        background = to_dB(background.clip(MIN_VAL,background.max()))
+        if (substract_background):
+            intensity_units = "Intensity (dB)"
+        else:
+            intensity_units = "Intensity above background (dB)"
+    elif (substract_background):
+        intensity_units = "Intensity"
+
+    prep_data.set_parameter("intensity_units",intensity_units)
+    prep_data.set_parameter("intensity",array)
+    prep_data.set_parameter("background",background)
+    prep_data.set_parameter("snr",snr)
+    return prep_data
+
+# Method to build a fixed gsfc-like spectrum (intensity normalized
+# to the background), with an empty frequency channel.
+def make_spectrum():
+    random = np.random.RandomState(3)
+    intensity = (1.0 + np.abs(random.normal(0.0,0.5,(NT,NF)))).astype(np.float32)
+    intensity[40:50,3:9] += 20.0
+    intensity[:,5] = 0.0
+    background = (1.0e-12*(1.0 + np.arange(NF))).astype(np.float32)
+    return spectrum(observatory="Wind",instrument="Waves",receiver="rad2",
+                    intensity=intensity,background=background,
+                    frequency=20.0 + 50.0*np.arange(NF),
+                    time=np.arange(NT)/60.0,naxis=[NT,NF],
+                    bandwidth=3.0e3,integration_time=0.154,
+                    intensity_units="Intensity normalized to background")
+
+class prep_data_test(unittest.TestCase):
+
+    def setUp(self):
+        self.reader = wind(provider="gsfc",verbose=False)
+
+    def check(self,dB,substract_background,inplace):
+        data = make_spectrum()
+        expected = prep_data_loop(data,dB=dB,substract_background=substract_background)
+        intensity = data.intensity.copy()
+        result = self.reader.prep_data(data,dB=dB,
+                                       substract_background=substract_background,
+                                       inplace=inplace)
+        for parameter in ["intensity","snr","background"]:
+            np.testing.assert_allclose(result.get_parameter(parameter),
+                                       expected.get_parameter(parameter),
+                                       rtol=1.0e-6,err_msg=parameter)
+        self.assertEqual(result.intensity_units,expected.intensity_units)
+        if (inplace):
+            self.assertIs(result,data)
+        else:
+            self.assertIsNot(result,data)
+            np.testing.assert_array_equal(data.intensity,intensity)
+
+    def test_prep_data(self):
+        for inplace in [False,True]:
+            self.check(False,False,inplace)
+
+    def test_prep_data_substract_background(self):
+        for inplace in [False,True]:
+            self.check(False,True,inplace)
+
+    def test_prep_data_dB(self):
+        for inplace in [False,True]:
+            self.check(True,False,inplace)
+            self.check(True,True,inplace)
+
+# Per-line reading of wind.read_gsfc before it was done by chunks,
+# used as reference.
+def read_gsfc_loop(filename):
+    gzip_process = subprocess.Popen(["gzip","-dc",filename],stdin=subprocess.PIPE,
+                                    stdout=subprocess.PIPE)
+    output, error = gzip_process.communicate()
+    file_content = output.split("\n")[0:-1]
+    nf = len(file_content)
+    nt = len(file_content[0].split())
+    array = np.zeros((nt,nf),dtype=np.float32)
+    for i,line in enumerate(file_content):
+        array[:,i] = np.float32(line.split())
+    return array
+
+class read_gsfc_test(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.gunzip_lzw = waves.gunzip_lzw
+
+    def tearDown(self):
+        waves.gunzip_lzw = self.gunzip_lzw
+        shutil.rmtree(self.directory)
+
+    def read_unlzw(self,filename,**kwargs):
+        # The file is decoded in python if gzip can not be run
+        waves.gunzip_lzw = lambda filename,chunk_size: None
+        try:
+            return read_gsfc_array(filename,RAD2_FREQ_NUM,**kwargs)
+        finally:
+            waves.gunzip_lzw = self.gunzip_lzw
+
+    def test_decoders(self):
+        with open(GSFC_FILE,'rb') as fr:
+            content = "".join(unlzw(fr,chunk_size=1000))
+        self.assertEqual("".join(gunzip_lzw(GSFC_FILE,chunk_size=1000)),content)
+
+        expected = read_gsfc_loop(GSFC_FILE)
+        self.assertEqual(expected.shape,(25,RAD2_FREQ_NUM))
+        for chunk_size in [1000,waves.CHUNK_SIZE]:
+            np.testing.assert_array_equal(read_gsfc_array(GSFC_FILE,RAD2_FREQ_NUM,
+                                                          chunk_size=chunk_size),expected)
+            np.testing.assert_array_equal(self.read_unlzw(GSFC_FILE,chunk_size=chunk_size),
+                                          expected)
+
+    def test_truncated_file(self):
+        filename = os.path.join(self.directory,os.path.basename(GSFC_FILE))
+        with open(GSFC_FILE,'rb') as fr:
+            content = fr.read()
+        with open(filename,'wb') as fw:
+            fw.write(content[0:len(content)//2])
+        self.assertIsNone(read_gsfc_array(filename,RAD2_FREQ_NUM))
+        self.assertIsNone(self.read_unlzw(filename))
+
+if __name__ == "__main__":
+    unittest.main()